@@ -16,9 +16,13 @@ class RabbitMQEventHandler:
 
     async def run(self) -> None:
         while not self.shutdown_event.is_set():
-            msg = await self.event_queue.get()
-            self._handle_event(msg)
-            self.event_queue.task_done()
+            # Consumers hand over whole batches; handle everything already queued
+            batch = [await self.event_queue.get()]
+            while not self.event_queue.empty():
+                batch.append(self.event_queue.get_nowait())
+            for msg in batch:
+                self._handle_event(msg)
+                self.event_queue.task_done()
 
     def _handle_event(self, msg):
         self.sse_service.send_event("event",asdict(msg))
@@ -7,7 +7,7 @@ from .core.services.sse.i_server_side_events_service import IServerSideEventsSer
 from .core.use_cases.sse_connection import ServerSideEventsUseCase
 from .core.services.sse.server_side_events import ServerSideEventsService
 from .core.services.rabbitmqconsumer.rabbitmq_consumer import RabbitMQEventHandler
-from rabbitMQ.consumer.connection_manager import ConnectionManager, Consumer, Producer
+from rabbitMQ.consumer.asyncio_connection_manager import ConnectionManager, Consumer, Producer
 from rabbitMQ.dtos.dto import SuspicionFrameMessage, RecordingStatusMessage, ResponseMessage
 from asyncio import Queue
 ui_thresholds = UIThresholds(suspicion_score_threshold=70)
@@ -56,7 +56,7 @@ def init_dependencies(shutdown_event: asyncio.Event):
     for producer in producers:
         _connection_manager.add_producer(producer)
 
-    # 4) Start RabbitMQ connection in its own thread
+    # 4) Start RabbitMQ connection on this loop
     _connection_manager.run_in_background()
 
     # 5) Start async RabbitMQ → SSE bridge in the event loop
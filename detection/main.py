@@ -1,30 +1,27 @@
 import asyncio
 from detection.processing.detection_manager import DetectionManager
-import threading
 
 async def main():
     loop = asyncio.get_running_loop()
     manager = DetectionManager(model="yolo11n.pt")
     manager.connection_manager.asyncio_loop = loop
 
-    # Start RabbitMQ in background thread
+    # Start the RabbitMQ connection on this loop
     manager.connection_manager.run_in_background()
 
     # Wait for RabbitMQ connection to be established
     while not manager.connection_manager.is_ready():
         await asyncio.sleep(0.1)
 
-    # Start event listener (async)
-    asyncio.create_task(manager.event_listener())
+    # Ingest, cloud client, event listener and publishing all share this loop.
+    # Model inference is pushed onto the manager's inference executor.
+    listener = asyncio.create_task(manager.event_listener())
+    video = asyncio.create_task(manager.run())
 
-    # Start video processing in a thread (async coroutine!)
-    threading.Thread(
-        target=lambda: asyncio.run(manager.run()),
-        daemon=True
-    ).start()
-
-    # Keep the main loop alive forever
-    await asyncio.Event().wait()
+    try:
+        await asyncio.gather(listener, video)
+    finally:
+        manager.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
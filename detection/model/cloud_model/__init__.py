@@ -0,0 +1,6 @@
+# Header carrying a task's deadline as epoch milliseconds; workers only drop tasks
+# past it when told their clock is NTP-synced with the producer's
+DEADLINE_HEADER = "x-deadline"
+# Header carrying the milliseconds left on a task when it was published; workers
+# count it from delivery, so it needs no clock agreement between hosts
+DEADLINE_BUDGET_HEADER = "x-deadline-budget-ms"
@@ -1,9 +1,12 @@
 import pika
 import json
+import time
 import logging
 from dataclasses import asdict
 from detection.dto.detection_types import DetectionResult
+from detection.model.cloud_model import DEADLINE_BUDGET_HEADER, DEADLINE_HEADER
 from detection.model.detection_service import DetectionService
+from rabbitMQ.consumer.memory_broker import blocking_connection
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,10 +15,40 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Deliveries per stale-rate check
+STALE_WINDOW = 100
+
 class CloudModelConsumer:
     """
     Base class for consuming model-related tasks from RabbitMQ and producing results.
     Subclasses must implement `on_message` to define custom message handling logic.
+
+    Tasks are micro-batched: up to `prefetch` are delivered ahead, and they
+    are gathered until `max_batch_size` have arrived or `max_wait_ms` passed
+    since the first, then run through one `detect_batch` call. Each reply
+    goes to its task's reply_to with its correlation_id, and the whole batch
+    is acked with a single multiple ack. If the batch call fails, its tasks
+    are run one at a time and only the ones that fail again are rejected.
+
+    Tasks whose deadline has passed are acked and dropped without inference,
+    both on delivery and again just before the batch runs, so a backlogged
+    worker skips frames nobody is waiting for any more. The deadline is
+    DEADLINE_BUDGET_HEADER counted from delivery on this host's monotonic
+    clock, which needs no clock agreement with the publisher but does not
+    see the time before delivery. The broker's TTL only applies while the
+    task is queued, so a task handed out just before it expired gets its
+    whole budget again here: the worker may still run it up to one budget
+    after the producer gave up, plus the time it waited in the client-side
+    prefetch buffer, up to `max_wait_ms` for its batch and the inference
+    itself. With `clock_skew_ms` set, the absolute DEADLINE_HEADER is
+    enforced as well, `clock_skew_ms` late, which closes that gap; only set
+    it when the publisher's clock is synced with this host's (NTP), or
+    every task looks stale or none does. When at
+    least `stale_warn_ratio` of a window of tasks is dropped, a warning is
+    logged.
+
+    `amqp_url`, when given, replaces user/password/host/vhost; a memory://
+    URL uses the in-process broker.
     """
 
     def __init__(self: str, 
@@ -24,7 +57,13 @@ class CloudModelConsumer:
                  host: str, 
                  vhost: str, 
                  detection_service: DetectionService,
-                 model_name: str):
+                 model_name: str,
+                 amqp_url: str = None,
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 5,
+                 prefetch: int = None,
+                 clock_skew_ms: float = None,
+                 stale_warn_ratio: float = 0.5):
         self.user = user
         self.password = password
         self.host = host
@@ -34,6 +73,21 @@ class CloudModelConsumer:
         self.produce_channel = None
         self.detection_service = detection_service
         self.model_name = model_name
+        self.amqp_url = amqp_url
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Enough in flight to fill the next batch while this one runs
+        self.prefetch = prefetch or 2 * max_batch_size
+        self._batch = []
+        self._flush_timer = None
+        self._last_tag = None
+        self.batches = 0
+        self.frames = 0
+        self.stale = 0
+        self.clock_skew_ms = clock_skew_ms
+        self.stale_warn_ratio = stale_warn_ratio
+        self._window_seen = 0
+        self._window_stale = 0
 
     def connect(self):
         """
@@ -41,10 +95,13 @@ class CloudModelConsumer:
         production queues. Queue names are derived from the model name.
         """
 
-        self.connection = pika.BlockingConnection(pika.ConnectionParameters(
-            host=self.host, port=5672, virtual_host=self.vhost,
-            credentials=pika.PlainCredentials(self.user, self.password)
-        ))
+        if self.amqp_url:
+            self.connection = blocking_connection(self.amqp_url)
+        else:
+            self.connection = pika.BlockingConnection(pika.ConnectionParameters(
+                host=self.host, port=5672, virtual_host=self.vhost,
+                credentials=pika.PlainCredentials(self.user, self.password)
+            ))
         self.consume_channel = self.connection.channel()
         self.consume_channel.queue_declare(queue=f"{self.model_name.lower().replace(' ','-')}-suspicion-task", durable=True)
         self.produce_channel = self.connection.channel()
@@ -54,34 +111,172 @@ class CloudModelConsumer:
     def on_message(self, channel, method, properties, body):
         """
         Handle incoming messages from the suspicion-task queue.
-        Must be implemented by subclasses depending on the model behavior.
+        Collects the task into the current batch; inference runs on flush.
+        """
+        self._last_tag = method.delivery_tag
+        if self._window_seen >= STALE_WINDOW:
+            self._check_stale_rate()
+        self._window_seen += 1
+        deadline = self._deadline(properties)
+        if self._is_stale(deadline, time.monotonic()):
+            self._drop_stale(1)
+            if not self._batch:
+                # Nothing older is waiting, so it can be acked right away
+                self._ack()
+            return
+        self._batch.append((method, properties, body, deadline))
+        if len(self._batch) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = self.connection.call_later(self.max_wait, self._on_flush_timer)
+
+    def _deadline(self, properties):
+        """
+        The task's deadline on this host's monotonic clock, or None if it
+        carries none.
+        """
+        headers = properties.headers or {}
+        now = time.monotonic()
+        deadlines = []
+        budget_ms = headers.get(DEADLINE_BUDGET_HEADER)
+        if budget_ms is not None:
+            deadlines.append(now + budget_ms / 1000)
+        deadline_ms = headers.get(DEADLINE_HEADER)
+        if deadline_ms is not None and self.clock_skew_ms is not None:
+            deadlines.append(now + (deadline_ms + self.clock_skew_ms - time.time() * 1000) / 1000)
+        return min(deadlines, default=None)
+
+    @staticmethod
+    def _is_stale(deadline, now):
+        # Tasks from producers that send no deadline never go stale
+        return deadline is not None and now > deadline
+
+    def _drop_stale(self, count):
+        self.stale += count
+        self._window_stale += count
+
+    def _check_stale_rate(self):
+        if self._window_stale >= self.stale_warn_ratio * self._window_seen:
+            logger.warning(
+                f"Dropped {self._window_stale} of the last {self._window_seen} tasks as past their deadline; "
+                "the worker is falling behind, or clock_skew_ms is set and the producer's clock disagrees with this host's"
+            )
+        self._window_seen = 0
+        self._window_stale = 0
+
+    def _ack(self):
+        # Acknowledge everything delivered so far, dropped tasks included
+        if self._last_tag is not None:
+            self.consume_channel.basic_ack(delivery_tag=self._last_tag, multiple=True)
+            self._last_tag = None
+
+    def _on_flush_timer(self):
+        self._flush_timer = None
+        self._flush()
+
+    def _flush(self):
+        """
+        Run inference on the collected batch, reply to each task and ack
+        them all at once.
         """
-        # Run inference on incoming frame bytes
-        result = self.detection_service.detect(body)
-        
-        if not isinstance(result, DetectionResult):
-            raise TypeError("Expected DetectionResult from detection_service.detect()")
+        if self._flush_timer is not None:
+            self.connection.remove_timeout(self._flush_timer)
+            self._flush_timer = None
+        batch, self._batch = self._batch, []
+        now = time.monotonic()
+        fresh = [task for task in batch if not self._is_stale(task[3], now)]
+        if len(fresh) < len(batch):
+            self._drop_stale(len(batch) - len(fresh))
+        batch = fresh
+        if not batch:
+            self._ack()
+            return
+
+        try:
+            # Run inference on all frames of the batch at once
+            results = self._infer(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Inference failed for a frame: {e}")
+                results = [None]
+            else:
+                # One producer's bad frame must not fail the other producers' frames
+                logger.warning(f"Batched inference failed for {len(batch)} frames ({e}), retrying one by one")
+                results = self._infer_singly(batch)
+
+        failed = []
+        for (method, properties, _, _), result in zip(batch, results):
+            if result is None or not self._reply(properties, result):
+                failed.append(method.delivery_tag)
 
-        # Serialize dataclass → dict → json
-        json_body = json.dumps(asdict(result)).encode("utf-8")
+        # Rejected first, so the multiple ack only covers the tasks that were answered
+        for delivery_tag in failed:
+            self.consume_channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
+        self._ack()
+        self.batches += 1
+        self.frames += len(batch) - len(failed)
+
+    def _infer(self, batch):
+        results = self.detection_service.detect_batch([body for _, _, body, _ in batch])
+        if len(results) != len(batch):
+            raise ValueError(f"detect_batch returned {len(results)} results for {len(batch)} frames")
+        for result in results:
+            if not isinstance(result, DetectionResult):
+                raise TypeError("Expected DetectionResult from detection_service.detect_batch()")
+        return results
+
+    def _infer_singly(self, batch):
+        """Run a failed batch task by task; None marks the tasks that fail again."""
+        results = []
+        for task in batch:
+            try:
+                results.append(self._infer([task])[0])
+            except Exception as e:
+                logger.error(f"Inference failed for a frame: {e}")
+                results.append(None)
+        return results
+
+    def _reply(self, properties, result) -> bool:
+        """
+        Send one result back to its requester. Returns False if it could not
+        be encoded or published, so the task is rejected instead of acked.
+        """
+        try:
+            # Serialize dataclass → dict → json
+            json_body = json.dumps(asdict(result)).encode("utf-8")
 
-        # Send reply back to requester
-        self.produce_channel.basic_publish(
-            exchange="",
-            routing_key=properties.reply_to,
-            properties=pika.BasicProperties(correlation_id=properties.correlation_id),
-            body=json_body
-        )
+            # Send reply back to requester
+            self.produce_channel.basic_publish(
+                exchange="",
+                routing_key=properties.reply_to,
+                properties=pika.BasicProperties(correlation_id=properties.correlation_id),
+                body=json_body
+            )
+        except Exception as e:
+            logger.error(f"Could not reply to {properties.correlation_id}: {e}")
+            return False
+        return True
 
-        channel.basic_ack(delivery_tag=method.delivery_tag)
+    def stats(self, reset: bool = True) -> dict:
+        stats = {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch": self.frames / self.batches if self.batches else 0.0,
+            "stale": self.stale,
+        }
+        if reset:
+            self.batches = 0
+            self.frames = 0
+            self.stale = 0
+        return stats
 
     def start(self):
         """
         Begin consuming messages from RabbitMQ. The consumer uses manual acknowledgements
-        and limits unacknowledged messages with prefetch_count=1.
+        and limits unacknowledged messages with prefetch_count=self.prefetch.
         """
 
-        self.consume_channel.basic_qos(prefetch_count=1)
+        self.consume_channel.basic_qos(prefetch_count=self.prefetch)
         self.consume_channel.basic_consume(
                                             queue=f"{self.model_name.lower().replace(' ', '-')}-suspicion-task", 
                                             on_message_callback=self.on_message, 
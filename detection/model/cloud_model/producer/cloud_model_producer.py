@@ -1,7 +1,14 @@
+import heapq
 import pika
 import uuid
 import time
 import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from detection.model.cloud_model import DEADLINE_BUDGET_HEADER, DEADLINE_HEADER
+from rabbitMQ.consumer.memory_broker import blocking_connection
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,92 +19,198 @@ logger = logging.getLogger(__name__)
 
 class CloudModelProducer:
     """
-    Sends frames to a model-specific RabbitMQ task queue and waits for a
-    response using RPC-style correlation IDs and a temporary callback queue.
-    Handles reconnection logic when RabbitMQ becomes unavailable.
+    Sends frames to a model-specific RabbitMQ task queue and collects the
+    responses using RPC-style correlation IDs and a temporary callback queue.
+
+    Requests are pipelined: `submit` returns a Future right away and up to
+    `window` requests may be outstanding at once. A single I/O thread owns
+    the connection; it publishes submitted frames, resolves futures by
+    correlation id, fails requests whose deadline passed with TimeoutError
+    and discards replies that arrive after that. `send_frame` is the blocking
+    one-frame form. The I/O thread reconnects when RabbitMQ becomes
+    unavailable; requests in flight at that moment fail with ConnectionError.
+
+    Each task carries what is left of its timeout, as an AMQP expiration so
+    the broker drops it unread and as DEADLINE_BUDGET_HEADER so a worker that
+    already holds it skips it. Both are relative, so the Pi's clock need not
+    agree with the workers'. The epoch-millisecond DEADLINE_HEADER goes along
+    for workers on NTP-synced hosts.
+
+    `amqp_url`, when given, replaces user/password/host/vhost; a memory://
+    URL uses the in-process broker.
     """
 
-    def __init__(self, user, password,host, vhost, model_name):
+    def __init__(self, user, password,host, vhost, model_name, amqp_url=None,
+                 window=8, reconnect_delay=1.0):
         self.user = user
         self.password = password
         self.host = host
         self.vhost = vhost
         self.model_name = model_name
-        self.response = None
-        self.correlation_id = None
+        self.amqp_url = amqp_url
+        self.task_queue = f"{self.model_name.lower().replace(' ','-')}-suspicion-task"
+        self.window = window
+        self.reconnect_delay = reconnect_delay
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(window)
+        self._pending = {}
+        self._deadlines = []
+        self._outbound = deque()
+        self._stopped = threading.Event()
+
+        self.completed = 0
+        self.timed_out = 0
+        self.late = 0
 
         self._connect()
+        self._io_thread = threading.Thread(target=self._run, name=f"{model_name}-rpc", daemon=True)
+        self._io_thread.start()
 
-    def _on_response(self, ch, method, props, body):
+    def submit(self, frame_bytes, timeout=.5) -> Future:
         """
-        Callback triggered whenever the model sends back a result.
-        Only accept the message if the correlation_id matches the one we sent.
+        Queues a frame for the suspicion-task queue and returns a Future for
+        the raw response body. Waits for a free slot in the window, counted
+        against `timeout` like the response itself.
         """
 
-        # Only process the response that matches the original request ID
-        if props.correlation_id == self.correlation_id:
-            self.response = body
-        
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            self.timed_out += 1
+            raise TimeoutError(f"{self.model_name}: {self.window} requests already outstanding.")
+
+        future = Future()
+        correlation_id = str(uuid.uuid4())
+        with self._lock:
+            self._pending[correlation_id] = future
+            heapq.heappush(self._deadlines, (deadline, correlation_id))
+            self._outbound.append((correlation_id, frame_bytes, deadline))
+        self._wake()
+        return future
+
     def send_frame(self, frame_bytes, timeout=.5):
         """
-        Sends a frame to the suspicion-task queue and waits synchronously
-        for a response. Includes automatic reconnection if RabbitMQ dropped.
+        Sends a frame to the suspicion-task queue and waits for its response.
+        Raises TimeoutError if it does not come back within `timeout`.
+        """
+
+        # The I/O thread fails the future at the deadline; the margin only covers its poll
+        return self.submit(frame_bytes, timeout).result(timeout + 1.0)
+
+    def _wake(self):
+        """
+        Asks the I/O thread to publish now instead of at its next poll.
         """
 
         try:
-            return self._rpc_frame_internal(frame_bytes, timeout)
-        except (pika.exceptions.AMQPError, ConnectionError, OSError):
-            logger.error(f"[{self.model_name}] Lost RabbitMQ connection. Reconnecting...")
-            try:
-                if not self._is_connected():
-                    self._connect()
-                    if not self._is_connected():
-                        raise Exception("Failed to reconnect to RabbitMQ")
-                return self._rpc_frame_internal(frame_bytes, timeout)
-            except Exception as e:
-                logger.error(f"[{self.model_name}] Reconnect failed.")
-                raise e
+            self.connection.add_callback_threadsafe(self._flush_outbound)
+        except Exception:
+            # Connection is being replaced; the I/O thread flushes after reconnecting
+            pass
 
-    def _rpc_frame_internal(self, frame_bytes, timeout):
+    def _on_response(self, ch, method, props, body):
         """
-        Internal implementation of the RPC frame send.
-        Publishes the frame with correlation_id and waits for a matching response.
+        Callback triggered whenever the model sends back a result.
+        Resolves the request with that correlation_id; replies for requests
+        that already timed out are dropped.
         """
 
-        self.response = None
+        with self._lock:
+            future = self._pending.pop(props.correlation_id, None)
+        if future is None:
+            self.late += 1
+            return
+        self._slots.release()
+        self.completed += 1
+        future.set_result(body)
+
+    def _fail(self, correlation_id, error):
+        with self._lock:
+            future = self._pending.pop(correlation_id, None)
+        if future is not None:
+            self._slots.release()
+            future.set_exception(error)
+        return future is not None
 
-        self._send_rpc_frame(frame_bytes=frame_bytes)
+    def _expire(self):
+        """
+        Fails requests past their deadline; returns seconds until the next one.
+        """
 
-        self._receive_frame(timeout=timeout)
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._deadlines:
+                    return None
+                deadline, correlation_id = self._deadlines[0]
+                if deadline > now:
+                    return deadline - now
+                heapq.heappop(self._deadlines)
+            if self._fail(correlation_id, TimeoutError(f"{self.model_name} server did not respond in time.")):
+                self.timed_out += 1
 
-        return self.response
+    def _flush_outbound(self):
+        while True:
+            with self._lock:
+                if not self._outbound:
+                    return
+                correlation_id, frame_bytes, deadline = self._outbound.popleft()
+                if correlation_id not in self._pending:
+                    # Timed out before it was sent
+                    continue
+            self._send_rpc_frame(correlation_id, frame_bytes, deadline)
 
-    def _send_rpc_frame(self, frame_bytes):
+    def _send_rpc_frame(self, correlation_id, frame_bytes, deadline):
         """
         Internal helper to send the frame
         """
-        self.correlation_id = str(uuid.uuid4())
 
+        # TTL is what is left of the request's timeout, so the broker never hands out a stale task
+        remaining_ms = max(1, int((deadline - time.monotonic()) * 1000))
         self.channel.basic_publish(
             exchange="",
-            routing_key=f"{self.model_name.lower().replace(' ','-')}-suspicion-task",
+            routing_key=self.task_queue,
             properties=pika.BasicProperties(
                 reply_to=self.callback_queue,
-                correlation_id=self.correlation_id,
+                correlation_id=correlation_id,
+                expiration=str(remaining_ms),
+                headers={
+                    DEADLINE_BUDGET_HEADER: remaining_ms,
+                    DEADLINE_HEADER: int(time.time() * 1000) + remaining_ms,
+                },
             ),
             body=frame_bytes
         )
 
-    def _receive_frame(self, timeout):
+    def _fail_all(self, error):
+        with self._lock:
+            correlation_ids = list(self._pending)
+            self._outbound.clear()
+            self._deadlines.clear()
+        for correlation_id in correlation_ids:
+            self._fail(correlation_id, error)
+
+    def _run(self):
         """
-        Internal helper to receive the frame
+        I/O thread: publishes, dispatches replies, expires deadlines and
+        reconnects.
         """
 
-        start = time.time()
-        while self.response is None:
-            self.connection.process_data_events(time_limit=.5)
-            if time.time() - start > timeout:
-                raise TimeoutError(f"{self.model_name} server did not respond in time.")
+        while not self._stopped.is_set():
+            try:
+                if not self._is_connected():
+                    self._connect()
+                self._flush_outbound()
+                next_deadline = self._expire()
+                wait = .5 if next_deadline is None else min(next_deadline, .5)
+                self.connection.process_data_events(time_limit=wait)
+            except (pika.exceptions.AMQPError, ConnectionError, OSError) as e:
+                if self._stopped.is_set():
+                    return
+                logger.error(f"[{self.model_name}] Lost RabbitMQ connection ({e}). Reconnecting...")
+                # The exclusive callback queue went with the connection
+                self._fail_all(ConnectionError(f"{self.model_name}: RabbitMQ connection lost"))
+                self._stopped.wait(self.reconnect_delay)
 
     def _connect(self):
         """
@@ -105,21 +218,24 @@ class CloudModelProducer:
         a private exclusive callback queue used for RPC responses.
         """
 
-        credentials = pika.PlainCredentials(self.user, self.password)
-        params = pika.ConnectionParameters(
-            host=self.host,
-            port=5672,
-            virtual_host=self.vhost,
-            credentials=credentials,
-            heartbeat=30, 
-            blocked_connection_timeout=60
-        )
+        if self.amqp_url:
+            self.connection = blocking_connection(self.amqp_url)
+        else:
+            credentials = pika.PlainCredentials(self.user, self.password)
+            params = pika.ConnectionParameters(
+                host=self.host,
+                port=5672,
+                virtual_host=self.vhost,
+                credentials=credentials,
+                heartbeat=30,
+                blocked_connection_timeout=60
+            )
 
-        self.connection = pika.BlockingConnection(params)
+            self.connection = pika.BlockingConnection(params)
         self.channel = self.connection.channel()
 
         # Declare the queues again because new channel != old channel
-        self.channel.queue_declare(queue=f"{self.model_name.lower().replace(' ','-')}-suspicion-task", durable=True)
+        self.channel.queue_declare(queue=self.task_queue, durable=True)
 
         result = self.channel.queue_declare(queue="", exclusive=True)
         self.callback_queue = result.method.queue
@@ -129,10 +245,32 @@ class CloudModelProducer:
             on_message_callback=self._on_response,
             auto_ack=True
         )
-    
+
     def _is_connected(self):
         """
         Returns True if the connection exists and is still open.
         """
-        
-        return self.connection and not self.connection.is_closed
\ No newline at end of file
+
+        return self.connection and not self.connection.is_closed
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._pending)
+        return {
+            "in_flight": in_flight,
+            "completed": self.completed,
+            "timed_out": self.timed_out,
+            "late": self.late,
+        }
+
+    def close(self):
+        """
+        Stops the I/O thread, fails outstanding requests and closes the connection.
+        """
+
+        self._stopped.set()
+        self._wake()
+        self._io_thread.join(timeout=2)
+        self._fail_all(ConnectionError(f"{self.model_name}: producer closed"))
+        if self._is_connected():
+            self.connection.close()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional
 
 from detection.dto.detection_types import DetectionResult
 
@@ -17,6 +17,10 @@ class DetectionService(ABC):
         """Perform object detection on an image."""
         pass
 
+    def detect_batch(self, frames) -> List[DetectionResult]:
+        """Perform object detection on several images. Override to batch on the model."""
+        return [self.detect(frame) for frame in frames]
+
     def get_classes(self):
         """Get the classes name to id"""
         return None
\ No newline at end of file
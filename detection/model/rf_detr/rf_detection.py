@@ -1,7 +1,7 @@
 from detection.dto.detection_types import Detection, DetectionResult
 from ..detection_service import DetectionService
 from inference.models.utils import get_model
-from typing import Optional
+from typing import List, Optional
 import torch
 
 class RFDETRDetectionService(DetectionService):
@@ -22,7 +22,14 @@ class RFDETRDetectionService(DetectionService):
         The Processor expects DetectionResult(detections=[Detection...]).
         """
         inference_result = self.model.infer(frame, confidence=0.5)[0]
+        return self._to_detection_result(inference_result)
 
+    def detect_batch(self, frames) -> List[DetectionResult]:
+        # infer() accepts a list of images and runs them as one batch
+        inference_results = self.model.infer(list(frames), confidence=0.5)
+        return [self._to_detection_result(result) for result in inference_results]
+
+    def _to_detection_result(self, inference_result) -> DetectionResult:
         detections = []
 
         for pred in inference_result.predictions:
@@ -1,6 +1,6 @@
 from detection.dto.detection_types import Detection, DetectionResult
 from ultralytics import YOLO
-from typing import Optional
+from typing import List, Optional
 from detection.model.detection_service import DetectionService
 import cv2
 import numpy as np
@@ -31,13 +31,22 @@ class YOLODetectionService(DetectionService):
         return {name.lower(): idx for idx, name in self.model.names.items()}
 
     def detect(self, frame) -> DetectionResult:
+        # Run YOLO inference
+        result = self.model.predict(self._decode(frame), verbose=False)[0]
+        return self._to_detection_result(result)
+
+    def detect_batch(self, frames) -> List[DetectionResult]:
+        # One forward pass over the whole batch
+        results = self.model.predict([self._decode(frame) for frame in frames], verbose=False)
+        return [self._to_detection_result(result) for result in results]
+
+    def _decode(self, frame):
         # Decode JPEG bytes if needed
         if isinstance(frame, (bytes, bytearray)):
             frame = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+        return frame
 
-        # Run YOLO inference
-        result = self.model.predict(frame, verbose=False)[0]
-        
+    def _to_detection_result(self, result) -> DetectionResult:
         detections = []
         names = self.model.names
 
@@ -1,8 +1,10 @@
 import os
+import time
 from asyncio import Queue
-import socket
+from functools import partial
 from detection.model.yolo.yolo_detection import YOLODetectionService
 from detection.processing.config_manager import ConfigManager
+from detection.processing.inference_executor import InferenceExecutor
 from detection.processing.processor_provider import ProcessorProvider
 import logging
 import requests
@@ -11,14 +13,18 @@ import numpy as np
 import struct
 import httpx
 import json
-import threading
+from detection.processing.processors.cascade_processor import CascadeProcessor
 from detection.processing.processors.local_processor import LocalProcessor
 from detection.processing.processors.rpc_processor import RPCProcessor
 from detection.tracking.tracking_service import TrackingDetectionService
+from gRPC.cloud_client_pool import CloudClientPool
+from gRPC.encoding_profile import AdaptiveProfilePolicy
+from gRPC.transport import TransportProfile
 from gRPC.grpc_client import CloudClient
-from rabbitMQ.consumer.connection_manager import ConnectionManager, Consumer, Producer
+from rabbitMQ.consumer.asyncio_connection_manager import ConnectionManager, Consumer, Producer
+from rabbitMQ.consumer.telemetry_publisher import CoalescingPublisher
 from rabbitMQ.dtos.dto import CloudProviderConfigMessage, SuspicionConfigMessage, RecordingStatusMessage, \
-    SuspicionFrameMessage, ResponseMessage
+    ResponseMessage
 import asyncio
 logging.basicConfig(
     level=logging.INFO,
@@ -33,6 +39,10 @@ class DetectionManager:
         self.yolo_detection_service = None
         self.tracking_service = TrackingDetectionService()
         self.config = ConfigManager()
+        self.inference_executor = None
+        self.stats_interval = self.config.get("STATS_INTERVAL_SECONDS", 30)
+        self._last_stats = time.monotonic()
+        self.cloud_pool = CloudClientPool.from_config(self.config.get("CLOUD_POOL", {}))
         if self.config.get("CLASS_K"):
             raw_k = self.config.get("CLASS_K", {})
 
@@ -52,17 +62,21 @@ class DetectionManager:
         recording_status_producer_queue_name = self.config.get("RECORDING_STATUS_QUEUE_NAME", "RECORDING_STATUS_QUEUE")
         response_queue_name = self.config.get("RESPONSE_QUEUE_NAME", "RESPONSE_QUEUE")
         self.response_producer = Producer(response_queue_name)
-        self.recording_producer = Producer(recording_status_producer_queue_name)
-        self.suspicion_producer = Producer(suspicion_frame_producer_queue_name)
+        # High-rate telemetry may use a compact codec once every consumer of these queues reads the content type
+        telemetry_codec = self.config.get("TELEMETRY_CODEC", "json")
+        self.recording_producer = Producer(recording_status_producer_queue_name, codec=telemetry_codec)
+        self.suspicion_producer = Producer(suspicion_frame_producer_queue_name, codec=telemetry_codec)
+        self.suspicion_telemetry = CoalescingPublisher.from_config(self.suspicion_producer,
+                                                                   self.suspicion_score,
+                                                                   self.config.get("SUSPICION_TELEMETRY", {}))
         self._register_queues()
         self.recording = False
 
     async def run(self):
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         logger.info(f"Connecting to {self.video_ip}:{self.video_port} ...")
 
         try:
-            s.connect((self.video_ip, self.video_port))
+            reader, writer = await asyncio.open_connection(self.video_ip, self.video_port)
             logger.info("Connected! Receiving stream...")
         except Exception as e:
             logger.error(f"Connection failed: {e}")
@@ -72,7 +86,7 @@ class DetectionManager:
         try:
             while True:
                 # 1. Read frame header
-                header = self._receive_all(s, 4)
+                header = await self._receive_all(reader, 4)
                 if not header:
                     logger.warning("Stream ended.")
                     break
@@ -80,7 +94,7 @@ class DetectionManager:
                 frame_len = struct.unpack("!I", header)[0]
 
                 # 2. Read JPEG payload
-                jpg_bytes = self._receive_all(s, frame_len)
+                jpg_bytes = await self._receive_all(reader, frame_len)
                 if jpg_bytes is None:
                     logger.warning("Lost frame.")
                     break
@@ -90,23 +104,13 @@ class DetectionManager:
                 if img is None:
                     continue
 
-                result = self.processor_provider.selected_provider.process(
+                score, tracked = await self.processor_provider.selected_provider.process(
                     resized_frame=img,
-                    frame_id=frame_id
+                    frame_id=frame_id,
+                    encoded_frame=jpg_bytes
                 )
 
-                if asyncio.iscoroutine(result):
-                    score, tracked = await result
-                else:
-                    score, tracked = result
-
-                self.suspicion_producer.publish(
-                    message_obj=SuspicionFrameMessage(
-                        suspicion_score=score
-                    )
-                    ,
-                    expire_time="100" # expire after 100ms
-                )
+                self.suspicion_telemetry.publish(score)
                 if score >= self.suspicion_score and not self.recording:
                     async with httpx.AsyncClient() as client:
                         await client.post(f"http://{self.video_ip}:{self.api_port}/start")
@@ -116,11 +120,12 @@ class DetectionManager:
                         await client.post(f"http://{self.video_ip}:{self.api_port}/stop")
                     self.recording_producer.publish(RecordingStatusMessage(False))
                 frame_id += 1
-                await asyncio.sleep(0)
+                self._maybe_log_stats()
         except Exception as e:
-            s.close()
-            cv2.destroyAllWindows()
             logger.info(f"Stream ended: {e}")
+        finally:
+            writer.close()
+            cv2.destroyAllWindows()
 
     async def event_listener(self):
         while True:
@@ -137,6 +142,10 @@ class DetectionManager:
 
             if isinstance(msg, SuspicionConfigMessage):
                 self.suspicion_score = msg.threshold
+                self.suspicion_telemetry.threshold = msg.threshold
+                cloud_processor = self.processor_provider.providers.get("cloud")
+                if isinstance(cloud_processor, CascadeProcessor):
+                    cloud_processor.suspicion_score = msg.threshold
 
                 # Save permanently
                 self.config.set("suspicion_score", msg.threshold)
@@ -184,9 +193,15 @@ class DetectionManager:
         """Ensures YOLO model exists, downloads if missing."""
         self._download_yolo(model_path)
         self.yolo_detection_service = YOLODetectionService(model_path)
+        self.inference_executor = InferenceExecutor.from_config(
+            self.config.get("INFERENCE_EXECUTOR", {}),
+            detection_service=self.yolo_detection_service,
+            service_factory=partial(YOLODetectionService, model_path)
+        )
         self.tracking_service = TrackingDetectionService()
         local_processor = LocalProcessor(detection_service=self.yolo_detection_service,
-                                         tracking_service=self.tracking_service)
+                                         tracking_service=self.tracking_service,
+                                         inference_executor=self.inference_executor)
         self.processor_provider.register(name="local",provider=local_processor)
 
     def _download_yolo(self,model_path):
@@ -224,22 +239,31 @@ class DetectionManager:
         )
 
 
-    def _receive_all(self, sock, length):
-        """Receive exactly `length` bytes from socket."""
-        data = b''
-        while len(data) < length:
-            packet = sock.recv(length - len(data))
-            if not packet:
-                return None
-            data += packet
-        return data
-
-    def start_video_thread(self):
-        def wrapper():
-            asyncio.run(self.run())  # THIS runs the async function properly
+    async def _receive_all(self, reader, length):
+        """Receive exactly `length` bytes from the stream."""
+        try:
+            return await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
 
-        thread = threading.Thread(target=wrapper, daemon=True)
-        thread.start()
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        if now - self._last_stats < self.stats_interval:
+            return
+        self._last_stats = now
+        if self.inference_executor is not None:
+            logger.info(f"Inference executor: {self.inference_executor.stats()}")
+        if len(self.cloud_pool):
+            logger.info(f"Cloud pool: {self.cloud_pool.stats()}")
+        selected = self.processor_provider.get_selected_provider()
+        if isinstance(selected, CascadeProcessor):
+            logger.info(f"Cascade: {selected.stats()}")
+        logger.info(f"Suspicion telemetry: {self.suspicion_telemetry.stats()}")
+
+    def shutdown(self):
+        self.suspicion_telemetry.close()
+        if self.inference_executor is not None:
+            self.inference_executor.shutdown(wait=False)
 
     async def _handle_cloud_message(self, msg: CloudProviderConfigMessage):
         if msg.delete:
@@ -259,21 +283,26 @@ class DetectionManager:
                 expire_time="1000"
             )
             return
+        encoding = self.config.get("CLOUD_ENCODING", {})
+        load = self.config.get("CLOUD_LOAD", {})
+        cloud = CloudClient(server=msg.connection_ip,
+                            cert_path=msg.server_certification,
+                            profile=encoding.get("profile", "full"),
+                            policy=AdaptiveProfilePolicy.from_config(encoding),
+                            load_interval=float(load.get("poll_interval", 1.0)),
+                            max_queue_per_replica=int(load.get("max_queue_per_replica", 16)),
+                            max_latency_ms=float(load.get("max_latency_ms", 500)),
+                            transport=TransportProfile.from_config(self.config.get("CLOUD_TRANSPORT")))
         try:
-            cloud = CloudClient(server=msg.connection_ip, cert_path=msg.server_certification,
-                                loop=asyncio.get_running_loop())
             asyncio.create_task(cloud.start())
             await asyncio.wait_for(cloud.connected.wait(), timeout=5)
             logger.info("Cloud gRPC connected.")
-            rpc_processor = RPCProcessor(local_detection_service=self.yolo_detection_service,
-                                         cloud_client=cloud,
-                                         tracking_service=self.tracking_service)
-            self.processor_provider.register(name="cloud", provider=rpc_processor)
-            self.processor_provider.change_main_provider(name="cloud")
+            await self._add_cloud_member(msg.provider_name, cloud, msg.weight)
             self.config.add_provider(msg.provider_name, {
                 "type": "cloud",
                 "connection_ip": msg.connection_ip,
                 "server_certification": msg.server_certification,
+                "weight": msg.weight,
                 "active": True
             })
             self.response_producer.publish(
@@ -286,14 +315,41 @@ class DetectionManager:
             )
         except asyncio.TimeoutError:
             logger.warning("Cloud gRPC timeout — continuing without cloud.")
+            await cloud.stop()
             await self._delete_provider(msg.provider_name)
             self.config.remove_provider(msg.provider_name)
 
+    async def _add_cloud_member(self, provider_name, cloud, weight):
+        # Every cloud provider joins one pool behind a single "cloud" processor
+        if provider_name in self.cloud_pool:
+            await self.cloud_pool.remove(provider_name)
+        self.cloud_pool.add(provider_name, cloud, weight=weight)
+        if "cloud" not in self.processor_provider.providers:
+            self.processor_provider.register(name="cloud", provider=self._create_cloud_processor())
+        self.processor_provider.change_main_provider(name="cloud")
+
+    def _create_cloud_processor(self):
+        # "full" sends every frame to the cloud, "cascade" only ambiguous ones
+        if self.config.get("CLOUD_MODE", "full") == "cascade":
+            return CascadeProcessor.from_config(
+                self.config.get("CASCADE", {}),
+                suspicion_score=self.suspicion_score,
+                local_detection_service=self.yolo_detection_service,
+                cloud_client=self.cloud_pool,
+                tracking_service=self.tracking_service,
+                inference_executor=self.inference_executor
+            )
+        return RPCProcessor(local_detection_service=self.yolo_detection_service,
+                            cloud_client=self.cloud_pool,
+                            tracking_service=self.tracking_service,
+                            inference_executor=self.inference_executor)
 
     async def _delete_provider(self,provider_name):
-        next_provider = self.processor_provider.find_next_cloud_provider(provider_name)
-        logger.info(f"Switching to next provider: {next_provider}")
-        self.processor_provider.change_main_provider(name=next_provider)
-
-        # THEN remove (and stop) the old one
-        await self.processor_provider.remove_provider(name=provider_name)
+        if provider_name in self.cloud_pool:
+            await self.cloud_pool.remove(provider_name)
+
+        # Fall back to local once the last cloud member is gone
+        if len(self.cloud_pool) == 0 and "cloud" in self.processor_provider.providers:
+            logger.info("No cloud providers left, switching to local")
+            self.processor_provider.change_main_provider(name="local")
+            await self.processor_provider.remove_provider(name="cloud")
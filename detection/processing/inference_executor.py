@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from detection.dto.detection_types import DetectionResult
+from detection.model.detection_service import DetectionService
+
+logger = logging.getLogger(__name__)
+
+# Detection service owned by a process-pool worker (set by _init_process_worker)
+_worker_service: Optional[DetectionService] = None
+
+
+def _pin_torch_threads(torch_threads: Optional[int]):
+    """Limit torch intra-op threads so inference does not oversubscribe the CPU."""
+    if not torch_threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        logger.warning("torch not available, cannot pin intra-op threads")
+
+
+def _init_process_worker(service_factory: Callable[[], DetectionService], torch_threads: Optional[int]):
+    global _worker_service
+    _pin_torch_threads(torch_threads)
+    _worker_service = service_factory()
+
+
+def _timed_detect(detect, frame):
+    start = time.perf_counter()
+    result = detect(frame)
+    return result, time.perf_counter() - start
+
+
+def _process_worker_detect(frame):
+    return _timed_detect(_worker_service.detect, frame)
+
+
+# Detection service owned by a thread-pool worker (set by _init_thread_worker)
+_thread_worker = threading.local()
+
+
+def _init_thread_worker(service_factory: Callable[[], DetectionService]):
+    _thread_worker.service = service_factory()
+
+
+def _thread_worker_detect(frame):
+    return _timed_detect(_thread_worker.service.detect, frame)
+
+
+class InferenceExecutor:
+    """
+    Runs local model inference off the asyncio loop.
+
+    kind="thread" runs on a thread pool and pins torch intra-op threads. With
+    one worker it uses `detection_service`; models are not thread-safe, so
+    more workers need `service_factory` to load one model per thread.
+    kind="process" loads a separate model in every worker process from
+    `service_factory` (must be picklable).
+    """
+
+    def __init__(self,
+                 detection_service: Optional[DetectionService] = None,
+                 kind: str = "thread",
+                 workers: int = 1,
+                 torch_threads: Optional[int] = None,
+                 service_factory: Optional[Callable[[], DetectionService]] = None):
+        self.kind = kind
+        self.workers = workers
+        self.detection_service = detection_service
+
+        if kind == "thread":
+            _pin_torch_threads(torch_threads)
+            if workers > 1:
+                if service_factory is None:
+                    raise ValueError("Thread inference executor with more than one worker needs a service_factory")
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix="inference",
+                    initializer=_init_thread_worker,
+                    initargs=(service_factory,)
+                )
+            else:
+                if detection_service is None:
+                    raise ValueError("Thread inference executor needs a detection_service")
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        elif kind == "process":
+            if service_factory is None:
+                raise ValueError("Process inference executor needs a service_factory")
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_process_worker,
+                initargs=(service_factory, torch_threads)
+            )
+        else:
+            raise ValueError(f"Unknown inference executor type: {kind}")
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._busy_seconds = 0.0
+        self._window_start = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config: dict, detection_service: DetectionService,
+                    service_factory: Optional[Callable[[], DetectionService]] = None):
+        config = config or {}
+        return cls(
+            detection_service=detection_service,
+            kind=config.get("type", "thread"),
+            workers=int(config.get("workers", 1)),
+            torch_threads=config.get("torch_threads"),
+            service_factory=service_factory
+        )
+
+    async def detect(self, frame) -> DetectionResult:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            if self.kind == "process":
+                result, busy = await loop.run_in_executor(self._executor, _process_worker_detect, frame)
+            elif self.workers > 1:
+                result, busy = await loop.run_in_executor(self._executor, _thread_worker_detect, frame)
+            else:
+                result, busy = await loop.run_in_executor(
+                    self._executor, _timed_detect, self.detection_service.detect, frame
+                )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self._completed += 1
+            self._busy_seconds += busy
+        return result
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a free worker."""
+        return max(self._in_flight - self.workers, 0)
+
+    def stats(self, reset: bool = True) -> dict:
+        """
+        Snapshot of executor load. Utilisation is busy worker time over
+        available worker time since the previous reset.
+        """
+        now = time.monotonic()
+        with self._lock:
+            elapsed = max(now - self._window_start, 1e-9)
+            stats = {
+                "kind": self.kind,
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "queue_depth": self.queue_depth,
+                "completed": self._completed,
+                "utilisation": min(self._busy_seconds / (elapsed * self.workers), 1.0),
+            }
+            if reset:
+                self._completed = 0
+                self._busy_seconds = 0.0
+                self._window_start = now
+        return stats
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
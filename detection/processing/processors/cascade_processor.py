@@ -0,0 +1,177 @@
+import logging
+from collections import Counter
+
+import numpy as np
+
+from detection.dto.detection_types import DetectionResult
+from detection.processing.processors.rpc_processor import RPCProcessor
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+UNCERTAIN_CONFIDENCE = "uncertain_confidence"
+NEAR_THRESHOLD = "near_threshold"
+NEW_TRACK = "new_track"
+
+
+def _local_recall(local: DetectionResult, cloud: DetectionResult, iou_threshold=0.5) -> float:
+    """Share of cloud detections the local model also found (same class, IoU >= threshold)."""
+    if not cloud.detections:
+        return 1.0
+    if not local.detections:
+        return 0.0
+
+    local_boxes = np.array([d.bbox for d in local.detections], dtype=float)
+    local_cls = np.array([d.class_id for d in local.detections])
+    cloud_boxes = np.array([d.bbox for d in cloud.detections], dtype=float)
+    cloud_cls = np.array([d.class_id for d in cloud.detections])
+
+    # Pairwise IoU, cloud x local
+    x1 = np.maximum(cloud_boxes[:, None, 0], local_boxes[None, :, 0])
+    y1 = np.maximum(cloud_boxes[:, None, 1], local_boxes[None, :, 1])
+    x2 = np.minimum(cloud_boxes[:, None, 2], local_boxes[None, :, 2])
+    y2 = np.minimum(cloud_boxes[:, None, 3], local_boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_c = (cloud_boxes[:, 2] - cloud_boxes[:, 0]) * (cloud_boxes[:, 3] - cloud_boxes[:, 1])
+    area_l = (local_boxes[:, 2] - local_boxes[:, 0]) * (local_boxes[:, 3] - local_boxes[:, 1])
+    iou = inter / np.maximum(area_c[:, None] + area_l[None, :] - inter, 1e-9)
+
+    same_class = cloud_cls[:, None] == local_cls[None, :]
+    matched = ((iou >= iou_threshold) & same_class).any(axis=1)
+    return float(matched.mean())
+
+
+class CascadeProcessor(RPCProcessor):
+    """
+    Runs the local model on every frame and only offloads ambiguous frames to
+    the cloud model. A frame is offloaded when:
+        - a local confidence falls inside [uncertain_low, uncertain_high]
+        - the previous score is within score_margin of the suspicion threshold
+        - the previous frame started a track that had not been seen before
+
+    Every `audit_interval`-th frame that no rule selected is sent as well, so
+    the local model's recall on frames it keeps can be measured against the
+    cloud model. Nothing is offloaded while the cloud reports itself
+    overloaded.
+    """
+
+    def __init__(self,
+                 local_detection_service,
+                 cloud_client,
+                 tracking_service,
+                 inference_executor=None,
+                 suspicion_score=75,
+                 uncertain_low=0.3,
+                 uncertain_high=0.6,
+                 score_margin=10,
+                 audit_interval=30):
+        super().__init__(local_detection_service=local_detection_service,
+                         cloud_client=cloud_client,
+                         tracking_service=tracking_service,
+                         inference_executor=inference_executor)
+        self.suspicion_score = suspicion_score
+        self.uncertain_low = uncertain_low
+        self.uncertain_high = uncertain_high
+        self.score_margin = score_margin
+        self.audit_interval = audit_interval
+
+        self._last_score = 0.0
+        self._new_track_seen = False
+        self._known_tracks = set()
+        self._reset_stats()
+
+    @classmethod
+    def from_config(cls, config: dict, suspicion_score, **kwargs):
+        config = config or {}
+        return cls(
+            suspicion_score=suspicion_score,
+            uncertain_low=float(config.get("uncertain_low", 0.3)),
+            uncertain_high=float(config.get("uncertain_high", 0.6)),
+            score_margin=float(config.get("score_margin", 10)),
+            audit_interval=int(config.get("audit_interval", 30)),
+            **kwargs
+        )
+
+    def _reset_stats(self):
+        self.frames = 0
+        self.offloaded = 0
+        self.reasons = Counter()
+        self.cloud_failures = 0
+        self.shed = 0
+        self._offload_recall = []
+        self._audit_recall = []
+
+    async def process(self, resized_frame, frame_id, encoded_frame=None):
+        self.frames += 1
+        local = await self._detect_local(resized_frame)
+        detections = local
+
+        reason = self._offload_reason(local)
+        audit = reason is None and self.audit_interval and self.frames % self.audit_interval == 0
+        if (reason is not None or audit) and self._cloud_overloaded():
+            self.shed += 1
+        elif reason is not None or audit:
+            try:
+                rois = [d.bbox for d in local.detections]
+                cloud = await self._cloud_detections(resized_frame, frame_id, encoded_frame, rois)
+            except Exception as e:
+                # Local result is already in hand, so a cloud miss costs nothing extra
+                logger.warning(f"Cascade offload failed, keeping local result: {e}")
+                self.cloud_failures += 1
+                await self._clear_failed_cloud()
+            else:
+                self.offloaded += 1
+                recall = _local_recall(local, cloud)
+                if reason is not None:
+                    self.reasons[reason] += 1
+                    self._offload_recall.append(recall)
+                else:
+                    self.reasons["audit"] += 1
+                    self._audit_recall.append(recall)
+                detections = cloud
+
+        score, tracked = self.tracking_service.process_detections(
+            detections.detections,
+            resized_frame.shape[:2]
+        )
+        self._update_state(score, tracked)
+        return score, tracked
+
+    def _offload_reason(self, local: DetectionResult):
+        if any(self.uncertain_low <= d.confidence <= self.uncertain_high for d in local.detections):
+            return UNCERTAIN_CONFIDENCE
+        if abs(self._last_score - self.suspicion_score) <= self.score_margin:
+            return NEAR_THRESHOLD
+        if self._new_track_seen:
+            return NEW_TRACK
+        return None
+
+    def _update_state(self, score, tracked):
+        self._last_score = score
+        track_ids = set() if tracked.tracker_id is None else {int(t) for t in tracked.tracker_id}
+        self._new_track_seen = bool(track_ids - self._known_tracks)
+        # Forget tracks the tracking service has already dropped
+        self._known_tracks = (self._known_tracks | track_ids) & set(self.tracking_service.last_seen)
+
+    def stats(self, reset: bool = True) -> dict:
+        """
+        Offload ratio, per-rule counts and the local model's recall against
+        the cloud model on offloaded and audited frames.
+        """
+        stats = {
+            "frames": self.frames,
+            "offloaded": self.offloaded,
+            "offload_ratio": self.offloaded / self.frames if self.frames else 0.0,
+            "reasons": dict(self.reasons),
+            "cloud_failures": self.cloud_failures,
+            "shed_overloaded": self.shed,
+            "local_recall_offloaded": float(np.mean(self._offload_recall)) if self._offload_recall else None,
+            "local_recall_kept": float(np.mean(self._audit_recall)) if self._audit_recall else None,
+        }
+        if reset:
+            self._reset_stats()
+        return stats
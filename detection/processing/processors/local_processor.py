@@ -13,11 +13,11 @@ logger = logging.getLogger(__name__)
 
 class LocalProcessor(Processor):
 
-    def __init__(self,detection_service: DetectionService, tracking_service):
-        super().__init__(detection_service, tracking_service)
+    def __init__(self,detection_service: DetectionService, tracking_service, inference_executor=None):
+        super().__init__(detection_service, tracking_service, inference_executor)
 
-    def process(self, resized_frame, frame_id):
-        detections = self.local_detection_service.detect(resized_frame)
+    async def process(self, resized_frame, frame_id, encoded_frame=None):
+        detections = await self._detect_local(resized_frame)
         return self.tracking_service.process_detections(
             detections.detections,
             resized_frame.shape[:2]
@@ -1,6 +1,9 @@
 from detection.model.detection_service import DetectionService
+import asyncio
 import logging
 from abc import ABC, abstractmethod
+from typing import Optional
+from detection.processing.inference_executor import InferenceExecutor
 
 logging.basicConfig(
     level=logging.INFO,
@@ -10,17 +13,33 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class Processor(ABC):
-    def __init__(self, local_detection_service: DetectionService, tracking_service):
+    def __init__(self,
+                 local_detection_service: DetectionService,
+                 tracking_service,
+                 inference_executor: Optional[InferenceExecutor] = None):
         self.local_detection_service = local_detection_service
         self.tracking_service = tracking_service
+        # Where the local model runs; None falls back to the loop's default executor
+        self.inference_executor = inference_executor
 
         # YOLO class -> id map
         self.class_map = self.local_detection_service.get_classes()
         self.id_to_name = {v: k for k, v in self.class_map.items()}
 
     @abstractmethod
-    def process(self, resized_frame, frame_id):
+    async def process(self, resized_frame, frame_id, encoded_frame: Optional[bytes] = None):
+        """
+        Detect, track and score one frame. `encoded_frame` is the JPEG the
+        frame was decoded from, when available, so it can be forwarded as is.
+        """
         pass
 
+    async def _detect_local(self, resized_frame):
+        """Run the local model off the event loop."""
+        if self.inference_executor is not None:
+            return await self.inference_executor.detect(resized_frame)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.local_detection_service.detect, resized_frame)
+
     def get_classification(self, cls_id):
-        return self.id_to_name.get(cls_id, "obj")
\ No newline at end of file
+        return self.id_to_name.get(cls_id, "obj")
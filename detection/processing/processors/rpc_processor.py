@@ -5,8 +5,11 @@ import logging
 from detection.processing.processors.processor import Processor
 from detection.tracking.tracking_service import TrackingDetectionService
 from gRPC.grpc_client import CloudClient
+from gRPC.cloud_client_pool import CloudClientPool
+from typing import Union
 from detection.dto.detection_types import DetectionResult, Detection
 from time import monotonic
+import numpy as np
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
@@ -14,7 +17,11 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def _convert_rpc_dr_to_internal_dr(rpc_detection_result) -> DetectionResult:
+RESULT_V2 = 2
+
+def _convert_rpc_dr_to_internal_dr(rpc_detection_result, class_table=()) -> DetectionResult:
+    if rpc_detection_result.result_version == RESULT_V2:
+        return _convert_packed_rpc_dr_to_internal_dr(rpc_detection_result, class_table)
     detections = []
     for detection in rpc_detection_result.detections:
         new_detection = Detection(
@@ -26,85 +33,108 @@ def _convert_rpc_dr_to_internal_dr(rpc_detection_result) -> DetectionResult:
         detections.append(new_detection)
     return DetectionResult(detections=detections)
 
+def _convert_packed_rpc_dr_to_internal_dr(rpc_detection_result, class_table) -> DetectionResult:
+    # Packed repeated fields convert straight to arrays, no per-message parsing
+    boxes = np.asarray(rpc_detection_result.boxes, dtype=np.float32).reshape(-1, 4)
+    confidences = np.asarray(rpc_detection_result.confidences, dtype=np.float32)
+    class_ids = np.asarray(rpc_detection_result.class_ids, dtype=np.int32)
+    detections = []
+    for box, conf, cls in zip(boxes.tolist(), confidences.tolist(), class_ids.tolist()):
+        # The server's class id, as in v1; the processor maps names it knows to local ids
+        class_name, class_id = class_table[cls] if cls < len(class_table) else ("obj", -1)
+        detections.append(Detection(class_id=class_id, class_name=class_name, confidence=conf, bbox=box))
+    return DetectionResult(detections=detections)
+
 class RPCProcessor(Processor):
     def __init__(self,
                  local_detection_service: DetectionService,
-                 cloud_client: CloudClient,
-                 tracking_service: TrackingDetectionService):
+                 cloud_client: Union[CloudClient, CloudClientPool],
+                 tracking_service: TrackingDetectionService,
+                 inference_executor=None):
         super().__init__(local_detection_service=local_detection_service,
-                         tracking_service=tracking_service)
+                         tracking_service=tracking_service,
+                         inference_executor=inference_executor)
         self.cloud_client = cloud_client
+        # Boxes tracked on the previous frame, used as upload regions for ROI profiles
+        self._last_boxes = None
+        self._shedding = False
 
-    async def process(self, resized_frame, frame_id):
-        try:
-            # Protected (breaker-wrapped) cloud calls
-            if CircuitBreakerMonitor.get("RPCProcessor._cloud_result").state == "half_open":
-                await self._cloud_reconnect()
-            cloud_result = await self._cloud_result(resized_frame,frame_id)
-
-            if cloud_result is None:
-                raise Exception("Cloud Model timed out")
+    def _cloud_overloaded(self) -> bool:
+        """Server-reported overload; frames go local instead of timing out."""
+        overloaded = self.cloud_client.overloaded
+        if overloaded != self._shedding:
+            self._shedding = overloaded
+            if overloaded:
+                logger.warning("Cloud reports overload, using Local Model until it recovers")
+            else:
+                logger.info("Cloud load back to normal")
+        return overloaded
 
-            cloud_result = _convert_rpc_dr_to_internal_dr(cloud_result[0])
+    async def process(self, resized_frame, frame_id, encoded_frame=None):
+        if self._cloud_overloaded():
+            detections = await self._detect_local(resized_frame)
+        else:
+            detections = await self._detect_with_fallback(resized_frame, frame_id, encoded_frame)
 
-            # Map class ids
-            for detection in cloud_result.detections:
-                class_name = detection.class_name.lower()
-                cls_id = self.class_map.get(class_name)
-                if cls_id is not None:
-                    detection.class_id = cls_id
-
-            detections = cloud_result
+        # Run tracking
+        score, tracked = self.tracking_service.process_detections(
+            detections.detections,
+            resized_frame.shape[:2]
+        )
+        self._last_boxes = tracked.xyxy
+        return score, tracked
 
+    async def _detect_with_fallback(self, resized_frame, frame_id, encoded_frame=None) -> DetectionResult:
+        try:
+            return await self._cloud_detections(resized_frame, frame_id, encoded_frame, self._last_boxes)
         except CircuitBreakerError:
             # Cloud died or breaker is open → fallback
             logger.warning(f"Cloud unavailable, falling back to Local Model")
-            future = asyncio.run_coroutine_threadsafe(
-                self.cloud_client.clear_queue(),
-                self.cloud_client.loop
-            )
-            await asyncio.wrap_future(future)
-            detections = self.local_detection_service.detect(resized_frame)
+            await self._clear_failed_cloud()
+            return await self._detect_local(resized_frame)
         except Exception as e:
             # Unexpected cloud error → fallback
             logger.error(f"Unexpected Cloud Model error: {e}")
-            future = asyncio.run_coroutine_threadsafe(
-                self.cloud_client.clear_queue(),
-                self.cloud_client.loop
-            )
-            await asyncio.wrap_future(future)
-            detections = self.local_detection_service.detect(resized_frame)
+            await self._clear_failed_cloud()
+            return await self._detect_local(resized_frame)
 
-        # Run tracking
-        return self.tracking_service.process_detections(
-            detections.detections,
-            resized_frame.shape[:2]
-        )
+    async def _clear_failed_cloud(self):
+        """Drop frames queued behind a failed cloud request."""
+        # A pool already cleared the member that failed; clearing here would drop every member's frames
+        if not isinstance(self.cloud_client, CloudClientPool):
+            await self.cloud_client.clear_queue()
 
-    @circuit(cls=CircuitBreaker, recovery_timeout=5)
-    async def _cloud_result(self, resized_frame, frame_id):
-        # Schedule send_frame on the main loop (where CloudClient lives)
-        future_send = asyncio.run_coroutine_threadsafe(
-            self.cloud_client.send_frame(resized_frame, frame_id),
-            self.cloud_client.loop
-        )
-        await asyncio.wrap_future(future_send)
+    async def _cloud_detections(self, resized_frame, frame_id, encoded_frame=None, rois=None) -> DetectionResult:
+        """Run the frame through the cloud model, raising if it is unavailable."""
+        # Protected (breaker-wrapped) cloud calls
+        if CircuitBreakerMonitor.get("RPCProcessor._cloud_result").state == "half_open":
+            await self._cloud_reconnect()
+        cloud_result = await self._cloud_result(resized_frame, frame_id, encoded_frame, rois)
 
-        # Schedule get_processed_frame on the main loop
-        future_get = asyncio.run_coroutine_threadsafe(
-            self.cloud_client.get_processed_frame(frame_id=frame_id, timeout=1),
-            self.cloud_client.loop
-        )
-        return await asyncio.wrap_future(future_get)
+        if cloud_result is None:
+            raise Exception("Cloud Model timed out")
+
+        response, _, class_table = cloud_result
+        cloud_result = _convert_rpc_dr_to_internal_dr(response, class_table)
+
+        # Map class ids
+        for detection in cloud_result.detections:
+            class_name = detection.class_name.lower()
+            cls_id = self.class_map.get(class_name)
+            if cls_id is not None:
+                detection.class_id = cls_id
+
+        return cloud_result
+
+    @circuit(cls=CircuitBreaker, recovery_timeout=5)
+    async def _cloud_result(self, resized_frame, frame_id, encoded_frame=None, rois=None):
+        # CloudClient lives on this loop, so its coroutines are awaited directly
+        return await self.cloud_client.request(resized_frame, frame_id, timeout=1,
+                                               encoded_frame=encoded_frame, rois=rois)
 
     async def _cloud_reconnect(self):
         try:
-            future = asyncio.run_coroutine_threadsafe(
-                self.cloud_client.connected.wait(),
-                self.cloud_client.loop
-            )
-            # wait_for needs to wrap the future
-            await asyncio.wait_for(asyncio.wrap_future(future), timeout=1.0)
+            await asyncio.wait_for(self.cloud_client.wait_connected(), timeout=1.0)
         except asyncio.TimeoutError:
             pass
 
@@ -24,19 +24,25 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x43loudRoute.proto\"R\n\x10\x44\x65tectionRequest\x12\r\n\x05\x66rame\x18\x01 \x01(\x0c\x12\r\n\x05width\x18\x02 \x01(\x05\x12\x0e\n\x06height\x18\x03 \x01(\x05\x12\x10\n\x08\x66rame_id\x18\x04 \x01(\x05\"C\n\x0f\x44\x65tectionResult\x12\x1e\n\ndetections\x18\x01 \x03(\x0b\x32\n.Detection\x12\x10\n\x08\x66rame_id\x18\x02 \x01(\x05\"u\n\tDetection\x12\x10\n\x08\x63lass_id\x18\x01 \x01(\x05\x12\x12\n\nclass_name\x18\x02 \x01(\t\x12\x12\n\nconfidence\x18\x03 \x01(\x02\x12\n\n\x02x1\x18\x04 \x01(\x02\x12\n\n\x02y1\x18\x05 \x01(\x02\x12\n\n\x02x2\x18\x06 \x01(\x02\x12\n\n\x02y2\x18\x07 \x01(\x02\x32|\n\nCloudRoute\x12\x31\n\nCloudRoute\x12\x11.DetectionRequest\x1a\x10.DetectionResult\x12;\n\x10\x43loudRouteStream\x12\x11.DetectionRequest\x1a\x10.DetectionResult(\x01\x30\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x43loudRoute.proto\"\r\n\x0bLoadRequest\"\xb8\x01\n\nLoadReport\x12\x13\n\x0bqueue_depth\x18\x01 \x01(\x05\x12\x11\n\tin_flight\x18\x02 \x01(\x05\x12\x1c\n\x14inference_latency_ms\x18\x03 \x01(\x02\x12\x1a\n\x12\x61vailable_replicas\x18\x04 \x01(\x05\x12\x16\n\x0e\x61\x63tive_streams\x18\x05 \x01(\x05\x12\x16\n\x0esupports_scale\x18\x06 \x01(\x08\x12\x18\n\x10supports_regions\x18\x07 \x01(\x08\"\x93\x01\n\x10\x44\x65tectionRequest\x12\r\n\x05\x66rame\x18\x01 \x01(\x0c\x12\r\n\x05width\x18\x02 \x01(\x05\x12\x0e\n\x06height\x18\x03 \x01(\x05\x12\x10\n\x08\x66rame_id\x18\x04 \x01(\x05\x12\x16\n\x0eresult_version\x18\x05 \x01(\x05\x12\r\n\x05scale\x18\x06 \x01(\x02\x12\x18\n\x07regions\x18\x07 \x03(\x0b\x32\x07.Region\"<\n\x06Region\x12\r\n\x05\x66rame\x18\x01 \x01(\x0c\x12\t\n\x01x\x18\x02 \x01(\x05\x12\t\n\x01y\x18\x03 \x01(\x05\x12\r\n\x05scale\x18\x04 \x01(\x02\"\xc0\x01\n\x0f\x44\x65tectionResult\x12\x1e\n\ndetections\x18\x01 \x03(\x0b\x32\n.Detection\x12\x10\n\x08\x66rame_id\x18\x02 \x01(\x05\x12\r\n\x05\x62oxes\x18\x03 \x03(\x02\x12\x13\n\x0b\x63onfidences\x18\x04 \x03(\x02\x12\x11\n\tclass_ids\x18\x05 \x03(\x05\x12\x13\n\x0b\x63lass_names\x18\x06 \x03(\t\x12\x16\n\x0eresult_version\x18\x07 \x01(\x05\x12\x17\n\x0f\x63lass_table_ids\x18\x08 \x03(\x05\"u\n\tDetection\x12\x10\n\x08\x63lass_id\x18\x01 \x01(\x05\x12\x12\n\nclass_name\x18\x02 \x01(\t\x12\x12\n\nconfidence\x18\x03 \x01(\x02\x12\n\n\x02x1\x18\x04 \x01(\x02\x12\n\n\x02y1\x18\x05 \x01(\x02\x12\n\n\x02x2\x18\x06 \x01(\x02\x12\n\n\x02y2\x18\x07 \x01(\x02\x32\xa2\x01\n\nCloudRoute\x12\x31\n\nCloudRoute\x12\x11.DetectionRequest\x1a\x10.DetectionResult\x12;\n\x10\x43loudRouteStream\x12\x11.DetectionRequest\x1a\x10.DetectionResult(\x01\x30\x01\x12$\n\x07GetLoad\x12\x0c.LoadRequest\x1a\x0b.LoadReportb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'CloudRoute_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_DETECTIONREQUEST']._serialized_start=20
-  _globals['_DETECTIONREQUEST']._serialized_end=102
-  _globals['_DETECTIONRESULT']._serialized_start=104
-  _globals['_DETECTIONRESULT']._serialized_end=171
-  _globals['_DETECTION']._serialized_start=173
-  _globals['_DETECTION']._serialized_end=290
-  _globals['_CLOUDROUTE']._serialized_start=292
-  _globals['_CLOUDROUTE']._serialized_end=416
+  _globals['_LOADREQUEST']._serialized_start=20
+  _globals['_LOADREQUEST']._serialized_end=33
+  _globals['_LOADREPORT']._serialized_start=36
+  _globals['_LOADREPORT']._serialized_end=220
+  _globals['_DETECTIONREQUEST']._serialized_start=223
+  _globals['_DETECTIONREQUEST']._serialized_end=370
+  _globals['_REGION']._serialized_start=372
+  _globals['_REGION']._serialized_end=432
+  _globals['_DETECTIONRESULT']._serialized_start=435
+  _globals['_DETECTIONRESULT']._serialized_end=627
+  _globals['_DETECTION']._serialized_start=629
+  _globals['_DETECTION']._serialized_end=746
+  _globals['_CLOUDROUTE']._serialized_start=749
+  _globals['_CLOUDROUTE']._serialized_end=911
 # @@protoc_insertion_point(module_scope)
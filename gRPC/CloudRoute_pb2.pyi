@@ -6,25 +6,77 @@ from typing import ClassVar as _ClassVar, Optional as _Optional, Union as _Union
 
 DESCRIPTOR: _descriptor.FileDescriptor
 
+class LoadRequest(_message.Message):
+    __slots__ = ()
+    def __init__(self) -> None: ...
+
+class LoadReport(_message.Message):
+    __slots__ = ("queue_depth", "in_flight", "inference_latency_ms", "available_replicas", "active_streams", "supports_scale", "supports_regions")
+    QUEUE_DEPTH_FIELD_NUMBER: _ClassVar[int]
+    IN_FLIGHT_FIELD_NUMBER: _ClassVar[int]
+    INFERENCE_LATENCY_MS_FIELD_NUMBER: _ClassVar[int]
+    AVAILABLE_REPLICAS_FIELD_NUMBER: _ClassVar[int]
+    ACTIVE_STREAMS_FIELD_NUMBER: _ClassVar[int]
+    SUPPORTS_SCALE_FIELD_NUMBER: _ClassVar[int]
+    SUPPORTS_REGIONS_FIELD_NUMBER: _ClassVar[int]
+    queue_depth: int
+    in_flight: int
+    inference_latency_ms: float
+    available_replicas: int
+    active_streams: int
+    supports_scale: bool
+    supports_regions: bool
+    def __init__(self, queue_depth: _Optional[int] = ..., in_flight: _Optional[int] = ..., inference_latency_ms: _Optional[float] = ..., available_replicas: _Optional[int] = ..., active_streams: _Optional[int] = ..., supports_scale: bool = ..., supports_regions: bool = ...) -> None: ...
+
 class DetectionRequest(_message.Message):
-    __slots__ = ("frame", "width", "height", "frame_id")
+    __slots__ = ("frame", "width", "height", "frame_id", "result_version", "scale", "regions")
     FRAME_FIELD_NUMBER: _ClassVar[int]
     WIDTH_FIELD_NUMBER: _ClassVar[int]
     HEIGHT_FIELD_NUMBER: _ClassVar[int]
     FRAME_ID_FIELD_NUMBER: _ClassVar[int]
+    RESULT_VERSION_FIELD_NUMBER: _ClassVar[int]
+    SCALE_FIELD_NUMBER: _ClassVar[int]
+    REGIONS_FIELD_NUMBER: _ClassVar[int]
     frame: bytes
     width: int
     height: int
     frame_id: int
-    def __init__(self, frame: _Optional[bytes] = ..., width: _Optional[int] = ..., height: _Optional[int] = ..., frame_id: _Optional[int] = ...) -> None: ...
+    result_version: int
+    scale: float
+    regions: _containers.RepeatedCompositeFieldContainer[Region]
+    def __init__(self, frame: _Optional[bytes] = ..., width: _Optional[int] = ..., height: _Optional[int] = ..., frame_id: _Optional[int] = ..., result_version: _Optional[int] = ..., scale: _Optional[float] = ..., regions: _Optional[_Iterable[_Union[Region, _Mapping]]] = ...) -> None: ...
+
+class Region(_message.Message):
+    __slots__ = ("frame", "x", "y", "scale")
+    FRAME_FIELD_NUMBER: _ClassVar[int]
+    X_FIELD_NUMBER: _ClassVar[int]
+    Y_FIELD_NUMBER: _ClassVar[int]
+    SCALE_FIELD_NUMBER: _ClassVar[int]
+    frame: bytes
+    x: int
+    y: int
+    scale: float
+    def __init__(self, frame: _Optional[bytes] = ..., x: _Optional[int] = ..., y: _Optional[int] = ..., scale: _Optional[float] = ...) -> None: ...
 
 class DetectionResult(_message.Message):
-    __slots__ = ("detections", "frame_id")
+    __slots__ = ("detections", "frame_id", "boxes", "confidences", "class_ids", "class_names", "result_version", "class_table_ids")
     DETECTIONS_FIELD_NUMBER: _ClassVar[int]
     FRAME_ID_FIELD_NUMBER: _ClassVar[int]
+    BOXES_FIELD_NUMBER: _ClassVar[int]
+    CONFIDENCES_FIELD_NUMBER: _ClassVar[int]
+    CLASS_IDS_FIELD_NUMBER: _ClassVar[int]
+    CLASS_NAMES_FIELD_NUMBER: _ClassVar[int]
+    RESULT_VERSION_FIELD_NUMBER: _ClassVar[int]
+    CLASS_TABLE_IDS_FIELD_NUMBER: _ClassVar[int]
     detections: _containers.RepeatedCompositeFieldContainer[Detection]
     frame_id: int
-    def __init__(self, detections: _Optional[_Iterable[_Union[Detection, _Mapping]]] = ..., frame_id: _Optional[int] = ...) -> None: ...
+    boxes: _containers.RepeatedScalarFieldContainer[float]
+    confidences: _containers.RepeatedScalarFieldContainer[float]
+    class_ids: _containers.RepeatedScalarFieldContainer[int]
+    class_names: _containers.RepeatedScalarFieldContainer[str]
+    result_version: int
+    class_table_ids: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, detections: _Optional[_Iterable[_Union[Detection, _Mapping]]] = ..., frame_id: _Optional[int] = ..., boxes: _Optional[_Iterable[float]] = ..., confidences: _Optional[_Iterable[float]] = ..., class_ids: _Optional[_Iterable[int]] = ..., class_names: _Optional[_Iterable[str]] = ..., result_version: _Optional[int] = ..., class_table_ids: _Optional[_Iterable[int]] = ...) -> None: ...
 
 class Detection(_message.Message):
     __slots__ = ("class_id", "class_name", "confidence", "x1", "y1", "x2", "y2")
@@ -48,6 +48,11 @@ class CloudRouteStub(object):
                 request_serializer=CloudRoute__pb2.DetectionRequest.SerializeToString,
                 response_deserializer=CloudRoute__pb2.DetectionResult.FromString,
                 _registered_method=True)
+        self.GetLoad = channel.unary_unary(
+                '/CloudRoute/GetLoad',
+                request_serializer=CloudRoute__pb2.LoadRequest.SerializeToString,
+                response_deserializer=CloudRoute__pb2.LoadReport.FromString,
+                _registered_method=True)
 
 
 # Server will use this class
@@ -76,6 +81,15 @@ class CloudRouteServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetLoad(self, request, context):
+        """Unary RPC:
+        Reports how loaded this server is so clients can spread frames
+        across servers or fall back to the local model before timing out.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_CloudRouteServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -89,6 +103,11 @@ def add_CloudRouteServicer_to_server(servicer, server):
                     request_deserializer=CloudRoute__pb2.DetectionRequest.FromString,
                     response_serializer=CloudRoute__pb2.DetectionResult.SerializeToString,
             ),
+            'GetLoad': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetLoad,
+                    request_deserializer=CloudRoute__pb2.LoadRequest.FromString,
+                    response_serializer=CloudRoute__pb2.LoadReport.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'CloudRoute', rpc_method_handlers)
@@ -156,3 +175,30 @@ class CloudRoute(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetLoad(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CloudRoute/GetLoad',
+            CloudRoute__pb2.LoadRequest.SerializeToString,
+            CloudRoute__pb2.LoadReport.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
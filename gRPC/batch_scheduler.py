@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Callable, List, Optional
+
+from detection.dto.detection_types import DetectionResult
+from gRPC.metrics import ServerMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """
+    Collects frames from every active stream and runs them through the model
+    as one batch. A batch is dispatched once it holds `max_batch_size` frames
+    or `max_wait_ms` has passed since its first frame arrived, so the two knobs
+    trade throughput against added latency.
+
+    `detect_batch` may be a plain function (run on `executor`) or a coroutine
+    function such as ModelWorkerPool.detect_batch; up to
+    `max_concurrent_batches` batches are in flight at once.
+
+    If a batch fails, or returns a different number of results than
+    frames, its frames are retried one at a time so only the frames that
+    fail on their own see the error.
+
+    `queue_depth`, `in_flight` and `latency` (moving average per batch, in
+    seconds) describe the current load for GetLoad.
+    """
+
+    def __init__(self,
+                 detect_batch: Callable[[list], List[DetectionResult]],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 5,
+                 executor: Optional[Executor] = None,
+                 max_concurrent_batches: int = 1,
+                 latency_alpha: float = 0.2,
+                 metrics: Optional[ServerMetrics] = None):
+        self.detect_batch = detect_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self._batch_slots = asyncio.Semaphore(max_concurrent_batches)
+        self._queue = asyncio.Queue()
+        self._getter = None
+        self._runner = None
+        self.latency_alpha = latency_alpha
+        self.metrics = metrics
+        self.latency = None
+        self.in_flight = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def submit(self, frame) -> DetectionResult:
+        """Queue a frame for the next batch and wait for its result."""
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, future, time.monotonic()))
+        return await future
+
+    async def _next(self, timeout=None):
+        # Keep one pending get() across calls so a timeout never drops a frame
+        if self._getter is None:
+            self._getter = asyncio.ensure_future(self._queue.get())
+        done, _ = await asyncio.wait({self._getter}, timeout=timeout)
+        if not done:
+            return None
+        item = self._getter.result()
+        self._getter = None
+        return item
+
+    async def _collect(self):
+        batch = [await self._next()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            item = await self._next(remaining)
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._batch_slots.acquire()
+            batch = await self._collect()
+            # Streams that went away while waiting no longer need a result
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                self._batch_slots.release()
+                continue
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _infer(self, frames):
+        if asyncio.iscoroutinefunction(self.detect_batch):
+            results = await self.detect_batch(frames)
+        else:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.executor, self.detect_batch, frames)
+        if results is None or len(results) != len(frames):
+            # zip() would leave the extra frames' futures unresolved
+            raise ValueError(f"detect_batch returned {0 if results is None else len(results)} "
+                             f"results for {len(frames)} frames")
+        return results
+
+    async def _infer_singly(self, batch):
+        """Run a failed batch frame by frame so only the bad frames fail."""
+        for frame, future, _ in batch:
+            if future.done():
+                continue
+            try:
+                result = (await self._infer([frame]))[0]
+            except Exception as e:
+                logger.error(f"Inference failed for a frame: {e}")
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_batch(self, batch):
+        frames = [frame for frame, _, _ in batch]
+        self.in_flight += len(frames)
+        started = time.monotonic()
+        if self.metrics is not None:
+            self.metrics.batch_size.observe(len(frames))
+            for _, _, enqueued in batch:
+                self.metrics.queue_wait_seconds.observe(started - enqueued)
+        try:
+            try:
+                results = await self._infer(frames)
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error(f"Inference failed for a frame: {e}")
+                    if not batch[0][1].done():
+                        batch[0][1].set_exception(e)
+                    return
+                # One stream's bad frame must not fail the other streams' frames
+                logger.warning(f"Batched inference failed for {len(frames)} frames ({e}), retrying one by one")
+                await self._infer_singly(batch)
+                return
+        finally:
+            self.in_flight -= len(frames)
+            self._batch_slots.release()
+        elapsed = time.monotonic() - started
+        self.latency = elapsed if self.latency is None else \
+            self.latency_alpha * elapsed + (1 - self.latency_alpha) * self.latency
+        if self.metrics is not None:
+            self.metrics.inference_seconds.observe(elapsed)
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def stop(self):
+        if self._getter is not None:
+            self._getter.cancel()
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from gRPC.grpc_client import CloudClient
+
+logger = logging.getLogger(__name__)
+
+LEAST_OUTSTANDING = "least_outstanding"
+WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+
+
+@dataclass
+class PoolMember:
+    name: str
+    client: CloudClient
+    weight: float = 1.0
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    current_weight: float = 0.0
+
+    def is_available(self, now):
+        return self.client.connected.is_set() and now >= self.ejected_until
+
+
+class CloudClientPool:
+    """
+    Spreads frames across several CloudClient connections, one per inference
+    server. Exposes the same request/clear_queue/stop surface as CloudClient so
+    RPCProcessor can use either.
+
+    A member whose request fails has its own queue cleared, as a single
+    CloudClient would after a failure; the other members keep theirs.
+    Members that fail `failure_threshold` requests in a row are ejected for an
+    exponentially growing period and re-admitted automatically once it passes.
+    Members whose server reports itself overloaded are skipped while any
+    other member still has headroom.
+    """
+
+    def __init__(self,
+                 strategy: str = LEAST_OUTSTANDING,
+                 failure_threshold: int = 3,
+                 ejection_seconds: float = 10,
+                 max_ejection_seconds: float = 120):
+        if strategy not in (LEAST_OUTSTANDING, WEIGHTED_ROUND_ROBIN):
+            raise ValueError(f"Unknown balancing strategy: {strategy}")
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.ejection_seconds = ejection_seconds
+        self.max_ejection_seconds = max_ejection_seconds
+        self.members = {}
+        self._rotation = 0
+
+    @classmethod
+    def from_config(cls, config: dict):
+        config = config or {}
+        return cls(
+            strategy=config.get("strategy", LEAST_OUTSTANDING),
+            failure_threshold=int(config.get("failure_threshold", 3)),
+            ejection_seconds=float(config.get("ejection_seconds", 10)),
+            max_ejection_seconds=float(config.get("max_ejection_seconds", 120))
+        )
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def add(self, name, client: CloudClient, weight: float = 1.0):
+        if name in self.members:
+            logger.warning(f"Replacing cloud pool member {name}")
+        self.members[name] = PoolMember(name=name, client=client, weight=max(weight, 0.01))
+
+    async def remove(self, name):
+        member = self.members.pop(name, None)
+        if member is None:
+            logger.error(f"No cloud pool member named {name}")
+            return
+        await member.client.stop()
+
+    def _select(self):
+        now = time.monotonic()
+        available = [m for m in self.members.values() if m.is_available(now)]
+        if not available:
+            return None
+        with_headroom = [m for m in available if not m.client.overloaded]
+        if with_headroom:
+            available = with_headroom
+
+        if self.strategy == WEIGHTED_ROUND_ROBIN:
+            # Smooth weighted round robin (same scheme as nginx)
+            total = sum(m.weight for m in available)
+            for m in available:
+                m.current_weight += m.weight
+            chosen = max(available, key=lambda m: m.current_weight)
+            chosen.current_weight -= total
+            return chosen
+
+        # Least outstanding requests per unit of weight; rotate ties
+        self._rotation = (self._rotation + 1) % len(available)
+        rotated = available[self._rotation:] + available[:self._rotation]
+        return min(rotated, key=lambda m: m.outstanding / m.weight)
+
+    def _record_success(self, member: PoolMember):
+        if member.ejections:
+            logger.info(f"Cloud pool member {member.name} re-admitted")
+        member.consecutive_failures = 0
+        member.ejections = 0
+
+    async def _record_failure(self, member: PoolMember):
+        # Frames queued behind the failed one on this member are stale now
+        await member.client.clear_queue()
+        member.consecutive_failures += 1
+        if member.consecutive_failures < self.failure_threshold:
+            return
+        backoff = min(self.ejection_seconds * (2 ** member.ejections), self.max_ejection_seconds)
+        member.ejections += 1
+        member.consecutive_failures = 0
+        member.ejected_until = time.monotonic() + backoff
+        logger.warning(f"Cloud pool member {member.name} ejected for {backoff:.1f}s")
+
+    async def request(self, frame, frame_id, timeout=1, encoded_frame=None, rois=None):
+        member = self._select()
+        if member is None:
+            raise Exception("No cloud pool members available")
+
+        member.outstanding += 1
+        try:
+            result = await member.client.request(frame, frame_id, timeout=timeout,
+                                                 encoded_frame=encoded_frame, rois=rois)
+        except Exception:
+            await self._record_failure(member)
+            raise
+        finally:
+            member.outstanding -= 1
+
+        if result is None:
+            await self._record_failure(member)
+        else:
+            self._record_success(member)
+        return result
+
+    @property
+    def overloaded(self) -> bool:
+        """True when every available member's server is overloaded."""
+        now = time.monotonic()
+        available = [m for m in self.members.values() if m.is_available(now)]
+        return bool(available) and all(m.client.overloaded for m in available)
+
+    async def wait_connected(self):
+        waiters = [asyncio.ensure_future(m.client.connected.wait()) for m in self.members.values()]
+        if not waiters:
+            return
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def clear_queue(self):
+        for member in self.members.values():
+            await member.client.clear_queue()
+
+    async def stop(self):
+        for member in list(self.members.values()):
+            await member.client.stop()
+        self.members.clear()
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            m.name: {
+                "available": m.is_available(now),
+                "outstanding": m.outstanding,
+                "weight": m.weight,
+                "ejections": m.ejections,
+                "frames": m.client.stats(),
+            }
+            for m in self.members.values()
+        }
@@ -1,30 +1,222 @@
 import asyncio
-from gRPC.CloudRoute_pb2 import DetectionRequest, DetectionResult, Detection
+import logging
+import time
+import grpc
+from gRPC.CloudRoute_pb2 import DetectionRequest, DetectionResult, Detection, LoadReport
+from gRPC.batch_scheduler import BatchScheduler
+from gRPC.model_worker_pool import ModelWorkerPool
+from gRPC.metrics import SampledLog, ServerMetrics
+from typing import Optional
 from gRPC.CloudRoute_pb2_grpc import CloudRouteServicer
 from detection.model.detection_service import DetectionService as InternalDetectionService
 from detection.dto.detection_types import DetectionResult as InternalDetectionResult
+from detection.dto.detection_types import Detection as InternalDetection
+
+logger = logging.getLogger(__name__)
+
+# DetectionResult encodings (see CloudRoute.proto)
+RESULT_V1 = 1
+RESULT_V2 = 2
+
+
+def _request_frames(request: DetectionRequest):
+    """Images the model has to run on: the ROI crops, or the whole frame."""
+    if request.regions:
+        return [region.frame for region in request.regions]
+    return [request.frame]
+
+
+def _to_frame_coordinates(request: DetectionRequest, results) -> InternalDetectionResult:
+    """Map boxes from downscaled frames or crops back onto the original frame."""
+    if not request.regions and request.scale in (0, 1):
+        return results[0]
+    placements = [(r.x, r.y, r.scale or 1.0) for r in request.regions] or [(0, 0, request.scale)]
+    detections = []
+    for (x, y, scale), result in zip(placements, results):
+        for detection in result.detections:
+            x1, y1, x2, y2 = detection.bbox[:4]
+            detections.append(InternalDetection(class_id=detection.class_id,
+                                                class_name=detection.class_name,
+                                                confidence=detection.confidence,
+                                                bbox=[x + x1 * scale, y + y1 * scale,
+                                                      x + x2 * scale, y + y2 * scale]))
+    return InternalDetectionResult(detections=detections)
+
+
+class ClassNameTable:
+    """Class-name table of one stream for v2 results, with each name's model class id."""
+
+    def __init__(self):
+        self.names = []
+        self.class_ids = []
+        self._index = {}
+        self._sent = 0
+
+    def id_for(self, class_name, class_id):
+        idx = self._index.get(class_name)
+        if idx is None:
+            idx = self._index[class_name] = len(self.names)
+            self.names.append(class_name)
+            self.class_ids.append(class_id)
+        return idx
+
+    def take_update(self):
+        """Full table (names, class ids) if it grew since it was last sent, else nothing."""
+        if len(self.names) == self._sent:
+            return [], []
+        self._sent = len(self.names)
+        return self.names, self.class_ids
+
 
 class CloudRouteService(CloudRouteServicer):
 
-    def __init__(self, cloud_model: InternalDetectionService):
+    def __init__(self,
+                 cloud_model: Optional[InternalDetectionService],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 5,
+                 worker_pool: Optional[ModelWorkerPool] = None,
+                 max_in_flight_per_stream: int = 4,
+                 metrics: Optional[ServerMetrics] = None):
         self.cloud_model = cloud_model
+        self.worker_pool = worker_pool
+        self.max_in_flight_per_stream = max_in_flight_per_stream
+        self.active_streams = 0
+        self.metrics = metrics if metrics is not None else ServerMetrics()
+        self.log = SampledLog(logger)
+        # Frames from every stream share one batching queue in front of the model,
+        # or in front of the replica pool when one is configured
+        if worker_pool is not None:
+            self.scheduler = BatchScheduler(worker_pool.detect_batch,
+                                            max_batch_size=max_batch_size,
+                                            max_wait_ms=max_wait_ms,
+                                            max_concurrent_batches=worker_pool.replicas * worker_pool.slots_per_replica,
+                                            metrics=self.metrics)
+        else:
+            self.scheduler = BatchScheduler(cloud_model.detect_batch,
+                                            max_batch_size=max_batch_size,
+                                            max_wait_ms=max_wait_ms,
+                                            metrics=self.metrics)
+        self.metrics.gauge("cloudroute_queue_depth", "Frames waiting for a batch",
+                           lambda: self.scheduler.queue_depth)
+        self.metrics.gauge("cloudroute_frames_in_flight", "Frames inside the model",
+                           lambda: self.scheduler.in_flight)
+        self.metrics.gauge("cloudroute_active_streams", "Open CloudRouteStream calls",
+                           lambda: self.active_streams)
 
-    def CloudRoute(self, request: DetectionRequest, context):
-        return self.__convert_internal_dr_to_rpc_dr(self.cloud_model.detect(request.frame), request.frame_id)
+    async def CloudRoute(self, request: DetectionRequest, context):
+        # Same batching path as the streams, so the event loop never runs the model
+        results = await asyncio.gather(*(self.scheduler.submit(frame) for frame in _request_frames(request)))
+        # Unary calls have no stream, so v2 replies always carry their own table
+        return self._convert(_to_frame_coordinates(request, results), request, ClassNameTable())
+
+    async def GetLoad(self, request, context):
+        latency = self.scheduler.latency
+        return LoadReport(
+            queue_depth=self.scheduler.queue_depth,
+            in_flight=self.scheduler.in_flight,
+            inference_latency_ms=latency * 1000 if latency is not None else 0.0,
+            available_replicas=self.worker_pool.available_replicas if self.worker_pool is not None else 1,
+            active_streams=self.active_streams,
+            supports_scale=True,
+            supports_regions=True
+        )
 
     async def CloudRouteStream(self, request_iterator, context):
-        print("SERVER: Stream started")
+        """
+        Runs up to max_in_flight_per_stream requests of one stream at a time
+        and yields each result as soon as it is ready; clients match results
+        to frames by frame_id, so order does not matter. A request holds its
+        slot until its result is yielded, so reading stops while the limit is
+        reached, whether the model or the client is the slow side, which
+        pushes back on the client.
+        """
+        opened = time.monotonic()
+        self.metrics.streams_opened.inc()
+        logger.info(f"event=stream_started peer={context.peer()}")
+
+        completed = asyncio.Queue()
+        in_flight = asyncio.Semaphore(self.max_in_flight_per_stream)
+        class_table = ClassNameTable()
+        tasks = set()
+        end_of_stream = object()
 
-        async for request in request_iterator:
-            print(f"SERVER: Received frame {request.frame_id}")
+        async def handle(request):
+            try:
+                # Crops of one frame are batched like frames of different streams
+                results = await asyncio.gather(*(self.scheduler.submit(frame)
+                                                 for frame in _request_frames(request)))
+            except Exception as e:
+                # The client times this frame out; keep the rest of the stream alive
+                self.metrics.inference_errors.inc()
+                self.log.event("inference_failed", logging.WARNING, frame_id=request.frame_id, error=repr(e))
+                in_flight.release()
+                return
+            # The slot is released once the result has been yielded
+            await completed.put((request, _to_frame_coordinates(request, results)))
 
-            loop = asyncio.get_running_loop()
-            internal = await loop.run_in_executor(None, self.cloud_model.detect, request.frame)
-            result = self.__convert_internal_dr_to_rpc_dr(internal, request.frame_id)
+        async def read_requests():
+            try:
+                async for request in request_iterator:
+                    self.metrics.frames_received.inc()
+                    self.log.event("frame_received", logging.DEBUG, frame_id=request.frame_id)
+                    await in_flight.acquire()
+                    task = asyncio.create_task(handle(request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            finally:
+                await completed.put(end_of_stream)
 
-            yield result
+        reader = asyncio.create_task(read_requests())
+        self.active_streams += 1
+        try:
+            while True:
+                item = await completed.get()
+                if item is end_of_stream:
+                    break
+                # Encoded in send order so class-table updates reach the client first
+                result = self._convert(item[1], item[0], class_table)
+                yield result
+                in_flight.release()
+                self.metrics.results_sent.inc()
+                self.log.event("result_sent", logging.DEBUG, frame_id=result.frame_id)
+        finally:
+            self.active_streams -= 1
+            lifetime = time.monotonic() - opened
+            self.metrics.stream_lifetime_seconds.observe(lifetime)
+            logger.info(f"event=stream_closed peer={context.peer()} seconds={lifetime:.1f}")
+            reader.cancel()
+            for task in list(tasks):
+                task.cancel()
+            try:
+                # Collect the reader's outcome so a failed read is not reported as never retrieved
+                await reader
+            except (asyncio.CancelledError, grpc.aio.AioRpcError):
+                pass
 
-            print(f"SERVER: Sent result for frame {request.frame_id}")
+    def _convert(self, detection_result: InternalDetectionResult, request: DetectionRequest,
+                 class_table: ClassNameTable) -> DetectionResult:
+        if request.result_version == RESULT_V2:
+            return self.__convert_internal_dr_to_packed_rpc_dr(detection_result, request.frame_id, class_table)
+        return self.__convert_internal_dr_to_rpc_dr(detection_result, request.frame_id)
+
+    def __convert_internal_dr_to_packed_rpc_dr(self, detection_result: InternalDetectionResult, frame_id: int,
+                                               class_table: ClassNameTable) -> DetectionResult:
+        boxes = []
+        confidences = []
+        class_ids = []
+        for detection in detection_result.detections:
+            boxes.extend(detection.bbox[:4])
+            confidences.append(detection.confidence)
+            class_ids.append(class_table.id_for(detection.class_name, detection.class_id))
+        class_names, class_table_ids = class_table.take_update()
+        return DetectionResult(frame_id=frame_id,
+                               boxes=boxes,
+                               confidences=confidences,
+                               class_ids=class_ids,
+                               class_names=class_names,
+                               class_table_ids=class_table_ids,
+                               result_version=RESULT_V2)
 
     def __convert_internal_dr_to_rpc_dr(self, detection_result: InternalDetectionResult, frame_id: int) -> DetectionResult:
         detections = []
@@ -0,0 +1,213 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from gRPC.CloudRoute_pb2 import Region
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """
+    How a frame is packed for upload on the cloud path.
+
+    Frames wider than `max_width` are downscaled (None keeps the source size),
+    `jpeg_quality` re-encodes at that quality (None forwards the sender's JPEG
+    when there is one) and `roi` uploads only padded crops around the regions
+    the caller passes in instead of the whole frame.
+    """
+    name: str
+    max_width: Optional[int] = None
+    jpeg_quality: Optional[int] = None
+    roi: bool = False
+    roi_padding: float = 0.2
+    # Crops covering more than this share of the frame are not worth it
+    roi_max_area: float = 0.6
+    # Every n-th frame goes up whole so objects outside the regions are found
+    roi_refresh_interval: int = 10
+
+
+PROFILES = {
+    "full": EncodingProfile("full"),
+    "balanced": EncodingProfile("balanced", max_width=480, jpeg_quality=70),
+    "low": EncodingProfile("low", max_width=320, jpeg_quality=50, roi=True),
+}
+
+# Profiles the adaptive policy moves between, best quality first
+LADDER = ("full", "balanced", "low")
+
+
+def get_profile(profile) -> EncodingProfile:
+    if isinstance(profile, EncodingProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown encoding profile: {profile}")
+    return PROFILES[profile]
+
+
+def encode_jpeg(image, quality: Optional[int] = None) -> bytes:
+    params = [] if quality is None else [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    ok, encoded = cv2.imencode(".jpg", image, params)
+    if not ok:
+        raise Exception("Failed to encode frame")
+    return encoded.tobytes()
+
+
+def _downscale(image, max_width: Optional[int]):
+    """Returns the image to upload and the original pixels per uploaded pixel."""
+    width = image.shape[1]
+    if max_width is None or width <= max_width:
+        return image, 1.0
+    height = max(1, round(image.shape[0] * max_width / width))
+    return cv2.resize(image, (max_width, height), interpolation=cv2.INTER_AREA), width / max_width
+
+
+def roi_rects(boxes: Sequence[Sequence[float]], shape, padding: float) -> List[List[int]]:
+    """Pad and clip boxes, then merge overlapping ones so no object is split across crops."""
+    height, width = shape[:2]
+    rects = []
+    for x1, y1, x2, y2 in boxes:
+        pad_x = (x2 - x1) * padding
+        pad_y = (y2 - y1) * padding
+        rect = [max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y)),
+                min(width, int(np.ceil(x2 + pad_x))), min(height, int(np.ceil(y2 + pad_y)))]
+        if rect[2] > rect[0] and rect[3] > rect[1]:
+            rects.append(rect)
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+def encode_frame(frame, profile: EncodingProfile, encoded_frame=None,
+                 rois=None) -> Tuple[bytes, float, List[Region]]:
+    """
+    Encode a frame for a DetectionRequest. Returns (frame bytes, scale, regions);
+    when regions are returned the frame bytes are empty.
+    """
+    if profile.roi and rois is not None and len(rois):
+        rects = roi_rects(rois, frame.shape, profile.roi_padding)
+        area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+        if rects and area <= profile.roi_max_area * frame.shape[0] * frame.shape[1]:
+            regions = []
+            for x1, y1, x2, y2 in rects:
+                crop, scale = _downscale(frame[y1:y2, x1:x2], profile.max_width)
+                regions.append(Region(frame=encode_jpeg(crop, profile.jpeg_quality), x=x1, y=y1, scale=scale))
+            return b"", 1.0, regions
+
+    if encoded_frame is not None and profile.max_width is None and profile.jpeg_quality is None:
+        # Forward the source JPEG unchanged
+        return bytes(encoded_frame), 1.0, []
+    image, scale = _downscale(frame, profile.max_width)
+    return encode_jpeg(image, profile.jpeg_quality), scale, []
+
+
+class AdaptiveProfilePolicy:
+    """
+    Chooses a profile from LADDER from the link's measured round-trip time
+    (EWMA) and upload throughput. Steps to a lighter profile when RTT rises
+    above `high_rtt_ms` or throughput falls below `min_throughput_kbps`, and
+    back up after `patience` consecutive samples under `low_rtt_ms`.
+    `limit` keeps it above profiles the server cannot decode.
+    """
+
+    def __init__(self,
+                 ladder: Sequence[str] = LADDER,
+                 start: str = "full",
+                 high_rtt_ms: float = 250,
+                 low_rtt_ms: float = 100,
+                 min_throughput_kbps: Optional[float] = None,
+                 patience: int = 20,
+                 min_samples: int = 5,
+                 alpha: float = 0.2):
+        self.ladder = [get_profile(p) for p in ladder]
+        self.index = [p.name for p in self.ladder].index(start)
+        self.max_index = len(self.ladder) - 1
+        self.high_rtt = high_rtt_ms / 1000
+        self.low_rtt = low_rtt_ms / 1000
+        self.min_throughput = min_throughput_kbps * 1000 / 8 if min_throughput_kbps else None
+        self.patience = patience
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.rtt = None
+        self.throughput = None
+        self.switches = 0
+        self._good = 0
+        self._samples = 0
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Policy for the CLOUD_ENCODING config section, None unless adaptive."""
+        config = config or {}
+        if not config.get("adaptive", False):
+            return None
+        return cls(
+            start=config.get("profile", "full"),
+            high_rtt_ms=float(config.get("high_rtt_ms", 250)),
+            low_rtt_ms=float(config.get("low_rtt_ms", 100)),
+            min_throughput_kbps=config.get("min_throughput_kbps"),
+            patience=int(config.get("patience", 20)),
+        )
+
+    @property
+    def profile(self) -> EncodingProfile:
+        return self.ladder[self.index]
+
+    def _ewma(self, current, sample):
+        return sample if current is None else self.alpha * sample + (1 - self.alpha) * current
+
+    def observe(self, rtt: float, payload_bytes: int):
+        self.rtt = self._ewma(self.rtt, rtt)
+        self.throughput = self._ewma(self.throughput, payload_bytes / max(rtt, 1e-6))
+        self._samples += 1
+
+        slow = self.rtt > self.high_rtt or (self.min_throughput is not None and self.throughput < self.min_throughput)
+        if slow and self._samples >= self.min_samples and self.index < self.max_index:
+            self._switch(self.index + 1)
+            return
+        self._good = self._good + 1 if self.rtt < self.low_rtt else 0
+        if self._good >= self.patience and self.index > 0:
+            self._switch(self.index - 1)
+
+    def limit(self, usable: Callable[[EncodingProfile], bool]):
+        """
+        Only step down as far as the profiles `usable` accepts, moving up
+        straight away if the current one is no longer usable.
+        """
+        max_index = 0
+        while max_index + 1 < len(self.ladder) and usable(self.ladder[max_index + 1]):
+            max_index += 1
+        self.max_index = max_index
+        if self.index > max_index:
+            self._switch(max_index)
+
+    def _switch(self, index):
+        link = "" if self.rtt is None else f" (rtt {self.rtt * 1000:.0f}ms, {self.throughput * 8 / 1000:.0f}kbps)"
+        logger.info(f"Cloud encoding profile {self.profile.name} -> {self.ladder[index].name}{link}")
+        self.index = index
+        self.switches += 1
+        self._good = 0
+        self._samples = 0
+
+    def stats(self) -> dict:
+        return {
+            "profile": self.profile.name,
+            "rtt_ms": self.rtt * 1000 if self.rtt is not None else None,
+            "throughput_kbps": self.throughput * 8 / 1000 if self.throughput is not None else None,
+            "switches": self.switches,
+        }
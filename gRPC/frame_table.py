@@ -0,0 +1,108 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+@dataclass
+class FrameEntry:
+    frame_id: int
+    sent_at: float
+    frame: Any = None
+    response: Any = None
+    event: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class FrameTable:
+    """
+    Fixed-size ring of in-flight frames indexed by frame_id % capacity.
+
+    A new frame overwrites whatever still occupies its slot, and entries older
+    than `ttl` seconds are dropped, so late or timed-out frames can no longer
+    leak memory or Event objects. Counts evictions, timeouts and responses
+    that arrive after their entry is gone.
+    """
+
+    def __init__(self, capacity: int = 64, ttl: float = 2.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._slots: list[Optional[FrameEntry]] = [None] * capacity
+        self.evictions = 0
+        self.timeouts = 0
+        self.late_arrivals = 0
+
+    def _slot(self, frame_id):
+        return frame_id % self.capacity
+
+    def _get(self, frame_id) -> Optional[FrameEntry]:
+        entry = self._slots[self._slot(frame_id)]
+        if entry is None or entry.frame_id != frame_id:
+            return None
+        return entry
+
+    def _drop(self, entry: FrameEntry):
+        self._slots[self._slot(entry.frame_id)] = None
+        # Wake anyone still waiting so they see the miss immediately
+        entry.event.set()
+
+    def _expire(self, now):
+        for entry in self._slots:
+            if entry is not None and entry.response is None and now - entry.sent_at > self.ttl:
+                self._drop(entry)
+                self.evictions += 1
+
+    def add(self, frame_id, frame=None) -> FrameEntry:
+        now = time.monotonic()
+        self._expire(now)
+        old = self._slots[self._slot(frame_id)]
+        if old is not None:
+            self._drop(old)
+            self.evictions += 1
+        entry = FrameEntry(frame_id=frame_id, sent_at=now, frame=frame)
+        self._slots[self._slot(frame_id)] = entry
+        return entry
+
+    def complete(self, frame_id, response) -> bool:
+        """Attach a response to its frame. Returns False for late arrivals."""
+        entry = self._get(frame_id)
+        if entry is None or time.monotonic() - entry.sent_at > self.ttl:
+            if entry is not None:
+                self._drop(entry)
+                self.evictions += 1
+            self.late_arrivals += 1
+            return False
+        entry.response = response
+        entry.event.set()
+        return True
+
+    async def wait(self, frame_id, timeout):
+        """Wait for a frame's response and release its slot. None on timeout or eviction."""
+        entry = self._get(frame_id)
+        if entry is None:
+            return None
+        try:
+            await asyncio.wait_for(entry.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+        if self._get(frame_id) is entry:
+            self._slots[self._slot(frame_id)] = None
+        if entry.response is None:
+            return None
+        return entry.response, entry.frame
+
+    def clear(self):
+        for entry in self._slots:
+            if entry is not None:
+                self._drop(entry)
+
+    def __len__(self):
+        return sum(entry is not None for entry in self._slots)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self),
+            "capacity": self.capacity,
+            "evictions": self.evictions,
+            "timeouts": self.timeouts,
+            "late_arrivals": self.late_arrivals,
+        }
@@ -1,8 +1,12 @@
 import grpc
 import asyncio
 from gRPC.CloudRoute_pb2_grpc import CloudRouteStub
-from gRPC.CloudRoute_pb2 import DetectionRequest
-import cv2
+from gRPC.CloudRoute_pb2 import DetectionRequest, LoadRequest
+from gRPC.frame_table import FrameTable
+from gRPC.encoding_profile import PROFILES, AdaptiveProfilePolicy, EncodingProfile, encode_frame, get_profile
+from gRPC.transport import TransportProfile
+from typing import Optional, Union
+from time import monotonic
 import logging
 import base64
 logger = logging.getLogger(__name__)
@@ -18,8 +22,10 @@ def normalize_address(addr: str) -> str:
     return addr
 
 class GRPCClient:
-    def __init__(self, server, cert_path):
+    def __init__(self, server, cert_path, transport: Optional[TransportProfile] = None):
         self.server = normalize_address(server)
+        # Must match the server's profile so keepalive pings are accepted
+        self.transport = transport if transport is not None else TransportProfile()
         der_bytes = base64.b64decode(cert_path)
         pem = (
                 b"-----BEGIN CERTIFICATE-----\n" +
@@ -34,7 +40,9 @@ class GRPCClient:
     async def connect(self):
         logger.info(f"Connecting to gRPC at {self.server}...")
         try:
-            self.channel = grpc.aio.secure_channel(self.server, self.credentials)
+            self.channel = grpc.aio.secure_channel(self.server, self.credentials,
+                                                   options=self.transport.channel_options(),
+                                                   compression=self.transport.grpc_compression)
             self.stub = CloudRouteStub(self.channel)
 
             # WAIT FOR TLS handshake + TCP ready
@@ -48,30 +56,118 @@ class GRPCClient:
             raise
 
 class CloudClient(GRPCClient):
-    def __init__(self, server, cert_path, loop=None):
-        super().__init__(server, cert_path)
-        self.loop = loop if loop else asyncio.get_running_loop()
+    def __init__(self, server, cert_path, frame_capacity=64, frame_ttl=2.0, keep_frames=False, result_version=2,
+                 profile: Union[str, EncodingProfile] = "full", policy: Optional[AdaptiveProfilePolicy] = None,
+                 load_interval=1.0, max_queue_per_replica=16, max_latency_ms=500,
+                 transport: Optional[TransportProfile] = None):
+        super().__init__(server, cert_path, transport)
         self.send_queue = asyncio.Queue(maxsize=30)
-        self.frame_buffer = {}
-        self.processed_frames = {}
-        self.frame_events = {}
+        # In-flight frames; a copy of the frame is only kept when asked for
+        self.frames = FrameTable(capacity=frame_capacity, ttl=frame_ttl)
+        self.keep_frames = keep_frames
+        # Servers that predate v2 ignore the field and keep answering with v1
+        self.result_version = result_version
+        # Class table of the current stream (v2 results): (class name, server class id) per entry
+        self.class_table = []
+        # Fixed upload profile, unless a policy picks one from the measured link
+        self.fixed_profile = get_profile(profile)
+        self.policy = policy
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        # Latest GetLoad report; servers without the RPC simply never fill it
+        self.load_interval = load_interval
+        self.max_queue_per_replica = max_queue_per_replica
+        self.max_latency = max_latency_ms / 1000
+        self.load = None
+        self._load_at = 0.0
+        self._load_task = None
+        # Downscaled frames and ROI crops are only sent once GetLoad says the server decodes them
+        self.supports_scale = False
+        self.supports_regions = False
+        if self.policy is not None:
+            self.policy.limit(self.supports)
 
-    async def send_frame(self, frame, frame_id):
+    @property
+    def profile(self) -> EncodingProfile:
+        profile = self.policy.profile if self.policy is not None else self.fixed_profile
+        return profile if self.supports(profile) else PROFILES["full"]
+
+    def supports(self, profile: EncodingProfile) -> bool:
+        """True if the server has advertised what frames sent with `profile` need."""
+        if profile.max_width is not None and not self.supports_scale:
+            return False
+        return not profile.roi or self.supports_regions
+
+    def _set_capabilities(self, supports_scale: bool, supports_regions: bool):
+        if (supports_scale, supports_regions) == (self.supports_scale, self.supports_regions):
+            return
+        self.supports_scale = supports_scale
+        self.supports_regions = supports_regions
+        logger.info(f"{self.server} capabilities: scale={supports_scale} regions={supports_regions}")
+        if self.policy is not None:
+            self.policy.limit(self.supports)
+
+    @property
+    def overloaded(self) -> bool:
+        """True while the server's last load report says it cannot keep up."""
+        if self.load is None or monotonic() - self._load_at > 3 * self.load_interval:
+            return False
+        if self.load.available_replicas <= 0:
+            return True
+        if self.load.queue_depth > self.max_queue_per_replica * self.load.available_replicas:
+            return True
+        return self.load.inference_latency_ms / 1000 > self.max_latency
+
+    async def _poll_load(self):
+        while True:
+            try:
+                self.load = await self.stub.GetLoad(LoadRequest(), timeout=self.load_interval)
+                self._load_at = monotonic()
+                self._set_capabilities(self.load.supports_scale, self.load.supports_regions)
+            except grpc.aio.AioRpcError as e:
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                    logger.info(f"{self.server} does not report load, uploading full frames")
+                    return
+                logger.debug(f"GetLoad failed: {e.code()}")
+            await asyncio.sleep(self.load_interval)
+
+    def _stop_load_polling(self):
+        if self._load_task is not None:
+            self._load_task.cancel()
+            self._load_task = None
+        self.load = None
+        # The next server may be an older build
+        self._set_capabilities(False, False)
+
+    async def send_frame(self, frame, frame_id, encoded_frame=None, rois=None) -> int:
+        """
+        Queue a frame for the cloud. `rois` are boxes (x1, y1, x2, y2) worth
+        looking at; profiles with ROI upload send crops around them instead
+        of the whole frame. Returns the number of image bytes queued.
+        """
         if not self.connected.is_set():
             raise Exception("Connection lost")
-        self.frame_buffer[frame_id] = frame.copy()
-        ok, encoded = cv2.imencode(".jpg", frame)
-        if not ok:
-            raise Exception("Failed to encode frame")
+        profile = self.profile
+        self.frames_sent += 1
+        if profile.roi and self.frames_sent % profile.roi_refresh_interval == 0:
+            rois = None
+        payload, scale, regions = encode_frame(frame, profile, encoded_frame, rois)
+        size = len(payload) + sum(len(region.frame) for region in regions)
+        self.bytes_sent += size
+        self.frames.add(frame_id, frame.copy() if self.keep_frames else None)
         await self.send_queue.put(
             DetectionRequest(
-                frame=encoded.tobytes(),
+                frame=payload,
                 width=frame.shape[1],
                 height=frame.shape[0],
-                frame_id=frame_id
+                frame_id=frame_id,
+                result_version=self.result_version,
+                scale=scale,
+                regions=regions
             )
         )
-    
+        return size
+
     async def _request_stream(self):
         while True:
             req = await self.send_queue.get()
@@ -86,40 +182,72 @@ class CloudClient(GRPCClient):
                 logger.info("Starting FULLY ASYNC CloudRouteStream...")
                 request_stream = self._request_stream()
                 responses = self.stub.CloudRouteStream(request_stream)
+                self.class_table = []
+                if self.load_interval:
+                    self._load_task = asyncio.create_task(self._poll_load())
                 async for response in responses:
-                    if response.frame_id not in self.frame_buffer:
-                        logger.warning("Missing frame %s", response.frame_id)
-                        continue
-                    frame = self.frame_buffer.pop(response.frame_id)
-                    self.processed_frames[response.frame_id] = (response, frame)
-                    if response.frame_id in self.frame_events:
-                        self.frame_events[response.frame_id].set()
+                    if response.class_names:
+                        self._update_class_table(response)
+                    if not self.frames.complete(response.frame_id, response):
+                        logger.debug("Late result for frame %s", response.frame_id)
+                logger.warning("CloudRouteStream ended by the server")
             except Exception as e:
                 logger.error(f"CloudClient error: {e}")
+            finally:
+                # Failed or ended cleanly, this connection's poller and channel go with the stream
+                self._stop_load_polling()
                 self.connected.clear()
+                if self.channel is not None:
+                    await self.channel.close()
+            if self.running:
                 await self.clear_queue()
                 logger.info("Reconnecting in 2 seconds...")
                 await asyncio.sleep(2)
                 
+    def _update_class_table(self, response):
+        # Servers predating class_table_ids send names only
+        ids = list(response.class_table_ids) or [-1] * len(response.class_names)
+        self.class_table = list(zip(response.class_names, ids))
+
     async def get_processed_frame(self, frame_id, timeout=0.2):
-        if frame_id in self.processed_frames:
-            return self.processed_frames[frame_id]
+        """
+        Returns (response, frame, class_table) or None. frame is None unless
+        keep_frames is set; class_table is the stream's (class name, class id)
+        table for v2 results.
+        """
+        result = await self.frames.wait(frame_id, timeout)
+        if result is None:
+            return None
+        response, frame = result
+        return response, frame, self.class_table
 
-        # Create event if necessary
-        if frame_id not in self.frame_events:
-            self.frame_events[frame_id] = asyncio.Event()
+    async def request(self, frame, frame_id, timeout=1, encoded_frame=None, rois=None):
+        """Send a frame and wait for its result, None on timeout."""
+        started = monotonic()
+        size = await self.send_frame(frame, frame_id, encoded_frame, rois)
+        result = await self.get_processed_frame(frame_id=frame_id, timeout=timeout)
+        if result is not None and self.policy is not None:
+            self.policy.observe(monotonic() - started, size)
+        return result
 
-        try:
-            await asyncio.wait_for(self.frame_events[frame_id].wait(), timeout)
-        except asyncio.TimeoutError:
-            return None
+    async def wait_connected(self):
+        await self.connected.wait()
 
-        return self.processed_frames.get(frame_id)
+    def stats(self):
+        stats = self.frames.stats()
+        stats["profile"] = self.profile.name
+        stats["bytes_per_frame"] = self.bytes_sent / self.frames_sent if self.frames_sent else 0.0
+        if self.policy is not None:
+            stats.update(self.policy.stats())
+        if self.load is not None:
+            stats["server_queue_depth"] = self.load.queue_depth
+            stats["server_latency_ms"] = self.load.inference_latency_ms
+            stats["overloaded"] = self.overloaded
+        return stats
 
     async def clear_queue(self):
         await self._clear_asyncio_queue()
-        self.frame_buffer.clear()
-        self.processed_frames.clear()
+        self.frames.clear()
 
     async def _clear_asyncio_queue(self):
         while not self.send_queue.empty():
@@ -131,6 +259,7 @@ class CloudClient(GRPCClient):
 
     async def stop(self):
         self.running = False
+        self._stop_load_polling()
         if self.channel:
             await self.channel.close()
         self.connected.clear()
@@ -0,0 +1,286 @@
+"""
+Headless load generator for the CloudRoute server.
+
+Opens M concurrent CloudRouteStream streams (or issues unary CloudRoute
+calls), replays frames from a directory or a synthetic generator at a target
+rate per stream and reports throughput and latency percentiles per stream and
+overall. Typical run against a local server with the test certificate:
+
+    python -m gRPC.load_test --streams 8 --fps 15 --duration 30 --frames ./clips
+"""
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import grpc
+import numpy as np
+
+from gRPC.CloudRoute_pb2 import DetectionRequest
+from gRPC.CloudRoute_pb2_grpc import CloudRouteStub
+from gRPC.transport import PROFILES as TRANSPORT_PROFILES, get_transport
+
+Frame = Tuple[bytes, int, int]
+
+
+def load_frames(directory: str) -> List[Frame]:
+    """JPEG/PNG files of a directory, in name order, as (bytes, width, height)."""
+    frames = []
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() not in (".jpg", ".jpeg", ".png"):
+            continue
+        data = path.read_bytes()
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        frames.append((data, image.shape[1], image.shape[0]))
+    if not frames:
+        raise SystemExit(f"No images found in {directory}")
+    return frames
+
+
+def synthetic_frames(count: int, width: int, height: int, quality: int = 80) -> List[Frame]:
+    """Noise with a few moving rectangles, so JPEG sizes look like real footage."""
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        image = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+        for k in range(3):
+            x = (i * (5 + k * 3) + k * width // 3) % max(1, width - 80)
+            y = height // 4 + k * height // 6
+            cv2.rectangle(image, (x, y), (x + 80, y + 120), (40 + 70 * k, 200, 255 - 60 * k), -1)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        frames.append((encoded.tobytes(), width, height))
+    return frames
+
+
+@dataclass
+class StreamStats:
+    name: str
+    sent: int = 0
+    received: int = 0
+    dropped: int = 0
+    errors: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+    def summary(self, duration: float) -> dict:
+        latencies = np.asarray(self.latencies) * 1000
+        percentiles = np.percentile(latencies, [50, 90, 99]) if len(latencies) else [float("nan")] * 3
+        return {
+            "stream": self.name,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "throughput_fps": self.received / duration if duration else 0.0,
+            "p50_ms": float(percentiles[0]),
+            "p90_ms": float(percentiles[1]),
+            "p99_ms": float(percentiles[2]),
+            "max_ms": float(latencies.max()) if len(latencies) else float("nan"),
+        }
+
+
+def _request(frames: List[Frame], frame_id: int, result_version: int) -> DetectionRequest:
+    data, width, height = frames[frame_id % len(frames)]
+    return DetectionRequest(frame=data, width=width, height=height, frame_id=frame_id,
+                            result_version=result_version)
+
+
+async def _paced(fps: float, duration: float):
+    """Yields tick numbers on a fixed schedule; a slow consumer does not shift later ticks."""
+    start = time.monotonic()
+    tick = 0
+    while True:
+        due = start + tick / fps
+        if due - start >= duration:
+            return
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield tick
+        tick += 1
+
+
+def _expire(sent_at: dict, timeout: float) -> int:
+    """Forgets frames unanswered for `timeout` seconds; returns how many."""
+    cutoff = time.monotonic() - timeout
+    expired = 0
+    # Insertion order is send order, so the oldest frames come first
+    for frame_id, started in list(sent_at.items()):
+        if started > cutoff:
+            break
+        del sent_at[frame_id]
+        expired += 1
+    return expired
+
+
+async def run_stream(stub: CloudRouteStub, stats: StreamStats, frames: List[Frame], fps: float,
+                     duration: float, window: int, result_version: int, frame_offset: int,
+                     timeout: float = 5.0):
+    """
+    One CloudRouteStream; frames are dropped, as on the Pi, while `window` are
+    unanswered. Frames unanswered for `timeout` seconds count as errors and
+    free their place in the window; their results are ignored if they come.
+    """
+    outgoing = asyncio.Queue()
+    sent_at = {}
+    done = object()
+
+    async def requests():
+        while True:
+            request = await outgoing.get()
+            if request is done:
+                return
+            yield request
+
+    async def send():
+        async for tick in _paced(fps, duration):
+            stats.errors += _expire(sent_at, timeout)
+            if len(sent_at) >= window:
+                stats.dropped += 1
+                continue
+            frame_id = frame_offset + tick
+            sent_at[frame_id] = time.monotonic()
+            stats.sent += 1
+            await outgoing.put(_request(frames, frame_id, result_version))
+        # Give outstanding frames until their timeout to come back before closing
+        while sent_at:
+            stats.errors += _expire(sent_at, timeout)
+            await asyncio.sleep(0.01)
+        await outgoing.put(done)
+
+    sender = asyncio.create_task(send())
+    try:
+        async for response in stub.CloudRouteStream(requests()):
+            started = sent_at.pop(response.frame_id, None)
+            if started is not None:
+                stats.received += 1
+                stats.latencies.append(time.monotonic() - started)
+    except grpc.aio.AioRpcError as e:
+        stats.errors += 1
+        print(f"{stats.name}: stream failed: {e.code()} {e.details()}")
+    finally:
+        sender.cancel()
+
+
+async def run_unary(stub: CloudRouteStub, stats: StreamStats, frames: List[Frame], fps: float,
+                    duration: float, window: int, result_version: int, frame_offset: int,
+                    timeout: float = 5.0):
+    """Unary CloudRoute calls at the target rate, at most `window` outstanding."""
+    outstanding = set()
+
+    async def call(frame_id):
+        started = time.monotonic()
+        try:
+            await stub.CloudRoute(_request(frames, frame_id, result_version), timeout=timeout)
+        except grpc.aio.AioRpcError:
+            stats.errors += 1
+            return
+        stats.received += 1
+        stats.latencies.append(time.monotonic() - started)
+
+    async for tick in _paced(fps, duration):
+        if len(outstanding) >= window:
+            stats.dropped += 1
+            continue
+        stats.sent += 1
+        task = asyncio.create_task(call(frame_offset + tick))
+        outstanding.add(task)
+        task.add_done_callback(outstanding.discard)
+    if outstanding:
+        await asyncio.wait(outstanding, timeout=timeout + 1)
+
+
+def _channel(args):
+    # Same channel settings as the Pi's CloudClient on this profile
+    transport = get_transport(args.transport)
+    options = transport.channel_options()
+    if args.insecure:
+        return grpc.aio.insecure_channel(args.server, options=options, compression=transport.grpc_compression)
+    with open(args.cert, "rb") as f:
+        credentials = grpc.ssl_channel_credentials(root_certificates=f.read())
+    if args.target_name:
+        options.append(("grpc.ssl_target_name_override", args.target_name))
+    return grpc.aio.secure_channel(args.server, credentials, options=options,
+                                   compression=transport.grpc_compression)
+
+
+def _print_report(rows: List[dict]):
+    header = f"{'stream':>10} {'sent':>7} {'recv':>7} {'drop':>6} {'err':>4} {'fps':>8} " \
+             f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['stream']:>10} {row['sent']:>7} {row['received']:>7} {row['dropped']:>6} {row['errors']:>4} "
+              f"{row['throughput_fps']:>8.1f} {row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+
+
+async def run(args) -> List[dict]:
+    frames = load_frames(args.frames) if args.frames else \
+        synthetic_frames(args.synthetic_count, args.width, args.height)
+    runner = run_unary if args.unary else run_stream
+    streams = [StreamStats(name=f"s{i}") for i in range(args.streams)]
+
+    async with _channel(args) as channel:
+        await asyncio.wait_for(channel.channel_ready(), timeout=10)
+        stub = CloudRouteStub(channel)
+        started = time.monotonic()
+        await asyncio.gather(*(
+            runner(stub, stats, frames, args.fps, args.duration, args.window, args.result_version,
+                   frame_offset=i * 1_000_000, timeout=args.timeout)
+            for i, stats in enumerate(streams)
+        ))
+        elapsed = time.monotonic() - started
+
+    rows = [stats.summary(elapsed) for stats in streams]
+    overall = StreamStats(name="overall",
+                          sent=sum(s.sent for s in streams),
+                          received=sum(s.received for s in streams),
+                          dropped=sum(s.dropped for s in streams),
+                          errors=sum(s.errors for s in streams),
+                          latencies=[l for s in streams for l in s.latencies])
+    rows.append(overall.summary(elapsed))
+    return rows
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load-test a CloudRoute gRPC server")
+    parser.add_argument("--server", default="localhost:50051", help="host:port (default: localhost:50051)")
+    parser.add_argument("--cert", default="gRPC/server.crt", help="Server certificate to trust")
+    parser.add_argument("--target-name", default=None, help="TLS name override when the cert CN differs")
+    parser.add_argument("--insecure", action="store_true", help="Plaintext channel, for local servers only")
+    parser.add_argument("--transport", choices=sorted(TRANSPORT_PROFILES), default="default",
+                        help="Channel profile; use the server's (default: default)")
+    parser.add_argument("--streams", type=int, default=4, help="Concurrent streams or unary callers (default: 4)")
+    parser.add_argument("--unary", action="store_true", help="Use unary CloudRoute calls instead of streams")
+    parser.add_argument("--fps", type=float, default=15, help="Target frames per second per stream (default: 15)")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to send for (default: 20)")
+    parser.add_argument("--window", type=int, default=8,
+                        help="Unanswered frames per stream before new ones are dropped (default: 8)")
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="Seconds before an unanswered frame counts as an error (default: 5)")
+    parser.add_argument("--result-version", type=int, default=2, help="DetectionResult encoding to ask for")
+    parser.add_argument("--frames", default=None, help="Directory of images to replay; synthetic if omitted")
+    parser.add_argument("--width", type=int, default=640, help="Synthetic frame width (default: 640)")
+    parser.add_argument("--height", type=int, default=480, help="Synthetic frame height (default: 480)")
+    parser.add_argument("--synthetic-count", type=int, default=60, help="Distinct synthetic frames (default: 60)")
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    rows = asyncio.run(run(args))
+    _print_report(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
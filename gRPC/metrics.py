@@ -0,0 +1,163 @@
+import asyncio
+import bisect
+import logging
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond queue waits up to multi-second stalls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LIFETIME_BUCKETS = (1, 5, 15, 60, 300, 900, 3600, 14400)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}",
+                f"# TYPE {self.name} counter",
+                f"{self.name} {self.value}"]
+
+
+class Gauge:
+    """Value read from a callback when the metrics are scraped."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}",
+                f"# TYPE {self.name} gauge",
+                f"{self.name} {self.read()}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class ServerMetrics:
+    """Counters and histograms of one CloudRoute server, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.frames_received = Counter("cloudroute_frames_received_total", "Frames received on all streams")
+        self.results_sent = Counter("cloudroute_results_sent_total", "Detection results sent")
+        self.inference_errors = Counter("cloudroute_inference_errors_total", "Frames whose inference failed")
+        self.streams_opened = Counter("cloudroute_streams_opened_total", "CloudRouteStream calls accepted")
+        self.inference_seconds = Histogram("cloudroute_inference_seconds", "Model time per batch")
+        self.queue_wait_seconds = Histogram("cloudroute_queue_wait_seconds", "Time a frame waited for its batch")
+        self.batch_size = Histogram("cloudroute_batch_size", "Frames per batch", BATCH_BUCKETS)
+        self.stream_lifetime_seconds = Histogram("cloudroute_stream_lifetime_seconds", "Duration of closed streams",
+                                                 LIFETIME_BUCKETS)
+        self._gauges: Dict[str, Gauge] = {}
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]):
+        self._gauges[name] = Gauge(name, help, read)
+
+    def render(self) -> str:
+        metrics = [self.frames_received, self.results_sent, self.inference_errors, self.streams_opened,
+                   self.inference_seconds, self.queue_wait_seconds, self.batch_size, self.stream_lifetime_seconds,
+                   *self._gauges.values()]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Minimal HTTP endpoint serving ServerMetrics at /metrics, on the server's own loop."""
+
+    def __init__(self, metrics: ServerMetrics, host: str = "127.0.0.1", port: int = 9100):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Metrics served on http://{self.host}:{self.port}/metrics")
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            # Drain the headers; the request has no body
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode(errors="replace").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self.metrics.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\n"
+                         f"Content-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+class SampledLog:
+    """
+    Structured `event=name key=value` log lines for hot paths. Each event name
+    is written at most once per `interval` seconds and carries the number of
+    lines suppressed since, so per-frame events cost a dict lookup instead of
+    synchronous stdout I/O.
+    """
+
+    def __init__(self, log: logging.Logger, interval: float = 5.0):
+        self.log = log
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def event(self, name: str, level: int = logging.INFO, **fields):
+        if not self.log.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self._last.get(name, float("-inf")) < self.interval:
+            self._suppressed[name] = self._suppressed.get(name, 0) + 1
+            return
+        self._last[name] = now
+        suppressed = self._suppressed.pop(name, 0)
+        if suppressed:
+            fields["suppressed"] = suppressed
+        self.log.log(level, " ".join([f"event={name}"] + [f"{k}={v}" for k, v in fields.items()]))
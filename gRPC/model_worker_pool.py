@@ -0,0 +1,292 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing import connection, shared_memory
+from typing import Callable, List
+
+import numpy as np
+
+from detection.dto.detection_types import DetectionResult
+from detection.model.detection_service import DetectionService
+
+logger = logging.getLogger(__name__)
+
+
+def _read_frames(shm, base, layout):
+    frames = []
+    for offset, length, shape, dtype in layout:
+        view = shm.buf[base + offset:base + offset + length]
+        if shape is None:
+            frames.append(bytes(view))
+        else:
+            frames.append(np.frombuffer(view, dtype=dtype).reshape(shape).copy())
+        view.release()
+    return frames
+
+
+def _replica_main(index, service_factory, torch_threads, shm_name, slot_size, requests, results):
+    """Entry point of one model replica process."""
+    if torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    service = service_factory()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            job = requests.get()
+            if job is None:
+                break
+            request_id, slot, layout, inline = job
+            try:
+                frames = inline if inline is not None else _read_frames(shm, slot * slot_size, layout)
+                results.send((request_id, service.detect_batch(frames), None))
+            except Exception as e:
+                results.send((request_id, None, repr(e)))
+    finally:
+        shm.close()
+
+
+class _Replica:
+    def __init__(self, index, slots):
+        self.index = index
+        self.process = None
+        self.requests = None
+        # Read end of the pipe only this replica writes results to
+        self.results = None
+        self.shm = None
+        self.free_slots = list(range(slots))
+        self.outstanding = {}
+        self.started_at = 0.0
+        # Consecutive crashes soon after starting, and when the next restart is due
+        self.crashes = 0
+        self.restart_at = None
+
+
+class ModelWorkerPool:
+    """
+    N model replicas in separate processes so inference is not limited by the
+    GIL. Every replica has its own request queue and a shared-memory region
+    split into `slots_per_replica` slots; a batch is copied into a free slot
+    and only its layout travels through the queue. Results come back over a
+    pipe per replica, so a replica killed mid-write cannot block the others.
+    Batches go to the replica with the fewest outstanding requests, and a
+    replica that dies is restarted.
+
+    Liveness is checked every `liveness_interval` seconds whether or not
+    results are flowing. A replica that keeps dying within `stable_seconds`
+    of starting is restarted after an exponential backoff from
+    `restart_backoff` up to `max_restart_backoff` seconds.
+    """
+
+    def __init__(self,
+                 service_factory: Callable[[], DetectionService],
+                 replicas: int = 2,
+                 torch_threads: int = 1,
+                 slots_per_replica: int = 2,
+                 slot_size: int = 8 * 1024 * 1024,
+                 liveness_interval: float = 1.0,
+                 restart_backoff: float = 1.0,
+                 max_restart_backoff: float = 60.0,
+                 stable_seconds: float = 30.0):
+        self.service_factory = service_factory
+        self.replicas = replicas
+        self.torch_threads = torch_threads
+        self.slots_per_replica = slots_per_replica
+        self.slot_size = slot_size
+        self.liveness_interval = liveness_interval
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.stable_seconds = stable_seconds
+        self._ctx = mp.get_context("spawn")
+        self._replicas = [_Replica(i, slots_per_replica) for i in range(replicas)]
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._slot_freed = None
+        self._loop = None
+        self._running = False
+        self._collector = None
+
+    def start(self):
+        self._running = True
+        for replica in self._replicas:
+            self._start_replica(replica)
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+        logger.info(f"Started {self.replicas} model replicas")
+
+    def _start_replica(self, replica: _Replica):
+        if replica.shm is None:
+            replica.shm = shared_memory.SharedMemory(create=True, size=self.slot_size * self.slots_per_replica)
+        if replica.results is not None:
+            replica.results.close()
+        replica.requests = self._ctx.Queue()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        replica.process = self._ctx.Process(
+            target=_replica_main,
+            args=(replica.index, self.service_factory, self.torch_threads, replica.shm.name,
+                  self.slot_size, replica.requests, writer),
+            daemon=True
+        )
+        replica.process.start()
+        # Only the replica holds the write end, so its exit shows up as EOF here
+        writer.close()
+        replica.results = reader
+        replica.started_at = time.monotonic()
+
+    @property
+    def available_replicas(self) -> int:
+        return sum(1 for r in self._replicas if r.process is not None and r.process.is_alive())
+
+    @property
+    def outstanding(self) -> int:
+        with self._lock:
+            return sum(len(r.outstanding) for r in self._replicas)
+
+    def _write_slot(self, replica: _Replica, slot, frames):
+        """Copy frames into a shared-memory slot; None if they do not fit."""
+        layout = []
+        base = slot * self.slot_size
+        offset = 0
+        for frame in frames:
+            if isinstance(frame, (bytes, bytearray, memoryview)):
+                data, shape, dtype = memoryview(frame).cast("B"), None, None
+            else:
+                frame = np.ascontiguousarray(frame)
+                data, shape, dtype = memoryview(frame).cast("B"), frame.shape, frame.dtype.str
+            if offset + len(data) > self.slot_size:
+                return None
+            replica.shm.buf[base + offset:base + offset + len(data)] = data
+            layout.append((offset, len(data), shape, dtype))
+            offset += len(data)
+        return layout
+
+    def _acquire(self):
+        """Pick the least-loaded live replica with a free slot."""
+        with self._lock:
+            candidates = [r for r in self._replicas
+                          if r.free_slots and r.process is not None and r.process.is_alive()]
+            if not candidates:
+                return None, None
+            replica = min(candidates, key=lambda r: len(r.outstanding))
+            return replica, replica.free_slots.pop()
+
+    async def detect_batch(self, frames) -> List[DetectionResult]:
+        loop = asyncio.get_running_loop()
+        if self._slot_freed is None:
+            self._loop = loop
+            self._slot_freed = asyncio.Condition()
+
+        async with self._slot_freed:
+            replica, slot = self._acquire()
+            while replica is None:
+                await self._slot_freed.wait()
+                replica, slot = self._acquire()
+
+        layout = self._write_slot(replica, slot, frames)
+        inline = None
+        if layout is None:
+            logger.warning(f"Batch larger than {self.slot_size} bytes, sending inline")
+            inline = [bytes(f) if isinstance(f, (bytes, bytearray)) else f for f in frames]
+
+        request_id = next(self._ids)
+        future = loop.create_future()
+        with self._lock:
+            replica.outstanding[request_id] = (future, slot)
+        replica.requests.put((request_id, slot, layout, inline))
+        return await future
+
+    def _resolve(self, future, results, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(results)
+
+    async def _notify_slot_freed(self):
+        async with self._slot_freed:
+            self._slot_freed.notify_all()
+
+    def _wake_waiters(self):
+        """Let detect_batch calls waiting for a replica look again; callable from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._notify_slot_freed(), self._loop)
+
+    def _finish(self, replica: _Replica, request_id, results, error):
+        with self._lock:
+            entry = replica.outstanding.pop(request_id, None)
+            if entry is None:
+                return
+            future, slot = entry
+            replica.free_slots.append(slot)
+        self._loop.call_soon_threadsafe(self._resolve, future, results, error)
+        self._wake_waiters()
+
+    def _collect_results(self):
+        next_check = time.monotonic() + self.liveness_interval
+        while self._running:
+            readers = {r.results: r for r in self._replicas if r.results is not None}
+            timeout = max(0.0, next_check - time.monotonic())
+            if not readers:
+                time.sleep(timeout)
+            for reader in connection.wait(list(readers), timeout) if readers else []:
+                replica = readers[reader]
+                try:
+                    request_id, results, error = reader.recv()
+                except (EOFError, OSError):
+                    # The replica exited; check right away instead of at the next interval
+                    reader.close()
+                    replica.results = None
+                    next_check = time.monotonic()
+                    continue
+                self._finish(replica, request_id, results, error)
+            # On a fixed interval, so a busy pool still notices a dead replica
+            if time.monotonic() >= next_check:
+                self._restart_dead_replicas()
+                next_check = time.monotonic() + self.liveness_interval
+
+    def _restart_dead_replicas(self):
+        now = time.monotonic()
+        for replica in self._replicas:
+            if not self._running or replica.process is None or replica.process.is_alive():
+                continue
+            if replica.restart_at is None:
+                # Fail its requests now so batch slots and stream permits are released
+                for request_id in list(replica.outstanding):
+                    self._finish(replica, request_id, None, "model replica died")
+                if now - replica.started_at < self.stable_seconds:
+                    replica.crashes += 1
+                else:
+                    replica.crashes = 0
+                delay = 0.0 if replica.crashes <= 1 else \
+                    min(self.max_restart_backoff, self.restart_backoff * 2 ** (replica.crashes - 2))
+                replica.restart_at = now + delay
+                logger.error(f"Model replica {replica.index} died (exit {replica.process.exitcode}), "
+                             f"restarting in {delay:.0f}s")
+            if now >= replica.restart_at:
+                replica.restart_at = None
+                self._start_replica(replica)
+                # Callers that found no live replica are waiting for this one
+                self._wake_waiters()
+
+    def stop(self):
+        self._running = False
+        for replica in self._replicas:
+            if replica.process is not None and replica.process.is_alive():
+                replica.requests.put(None)
+        for replica in self._replicas:
+            if replica.process is not None:
+                replica.process.join(timeout=5)
+            if replica.results is not None:
+                replica.results.close()
+                replica.results = None
+            if replica.shm is not None:
+                replica.shm.close()
+                replica.shm.unlink()
+                replica.shm = None
@@ -1,10 +1,23 @@
 import grpc
 import asyncio
+import argparse
+import logging
+from functools import partial
 from grpc import aio
 from .CloudRoute_pb2_grpc import add_CloudRouteServicer_to_server
 from .cloud_route_service import CloudRouteService
+from .model_worker_pool import ModelWorkerPool
+from .metrics import MetricsServer, ServerMetrics
+from .transport import PROFILES as TRANSPORT_PROFILES, TransportProfile
 from detection.model.yolo.yolo_detection import YOLODetectionService
 
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
 
 def load_server_credentials(cert_path, key_path):
     with open(cert_path, "rb") as f:
@@ -19,33 +32,97 @@ def load_server_credentials(cert_path, key_path):
     )
 
 
-async def serve():
-    print("🚀 Starting CloudRoute gRPC server (ASYNC)...")
+async def serve(max_batch_size=8, max_wait_ms=5, replicas=0, torch_threads=1, stream_in_flight=4,
+                metrics_port=9100, transport="default", compression=None):
+    logger.info("Starting CloudRoute gRPC server (ASYNC)...")
+
+    profile = TransportProfile.from_config({"profile": transport, "compression": compression})
+    logger.info(f"Transport profile {profile.name} (compression: {profile.compression or 'none'})")
 
     # ASYNC gRPC SERVER (REQUIRED FOR STREAMING)
-    server = aio.server()
+    server = aio.server(options=profile.server_options(),
+                        compression=profile.grpc_compression,
+                        maximum_concurrent_rpcs=profile.max_concurrent_rpcs)
 
-    # Load YOLO model
-    model = YOLODetectionService("yolo11n.pt")
+    # Load YOLO model in-process, or an optional pool of replicas in separate processes
+    model = None
+    worker_pool = None
+    if replicas == 0:
+        model = YOLODetectionService("yolo11n.pt")
+    else:
+        worker_pool = ModelWorkerPool(partial(YOLODetectionService, "yolo11n.pt"),
+                                      replicas=replicas,
+                                      torch_threads=torch_threads)
+        worker_pool.start()
 
     # Register service
+    metrics = ServerMetrics()
+    if worker_pool is not None:
+        metrics.gauge("cloudroute_available_replicas", "Model replicas able to take work",
+                      lambda: worker_pool.available_replicas)
     add_CloudRouteServicer_to_server(
-        CloudRouteService(cloud_model=model),
+        CloudRouteService(cloud_model=model,
+                          max_batch_size=max_batch_size,
+                          max_wait_ms=max_wait_ms,
+                          worker_pool=worker_pool,
+                          max_in_flight_per_stream=stream_in_flight,
+                          metrics=metrics),
         server
     )
 
+    # Local metrics endpoint
+    metrics_server = None
+    if metrics_port:
+        metrics_server = MetricsServer(metrics, port=metrics_port)
+        await metrics_server.start()
+
     # Load TLS
     creds = load_server_credentials("gRPC/server.crt", "gRPC/server.key")
-    print("🔒 Loaded TLS certificate and key")
+    logger.info("Loaded TLS certificate and key")
 
     port = server.add_secure_port("[::]:50051", creds)
-    print(f"📡 gRPC server bound to port {port}")
+    logger.info(f"gRPC server bound to port {port}")
 
     await server.start()
-    print("✅ gRPC server started successfully")
+    logger.info("gRPC server started successfully")
+
+    try:
+        await server.wait_for_termination()
+    finally:
+        if metrics_server is not None:
+            await metrics_server.stop()
+        if worker_pool is not None:
+            worker_pool.stop()
+
 
-    await server.wait_for_termination()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the CloudRoute gRPC server")
+    parser.add_argument("--max-batch-size", type=int, default=8,
+                        help="Most frames run through the model at once (default: 8)")
+    parser.add_argument("--max-wait-ms", type=float, default=5,
+                        help="Longest a frame waits for its batch to fill (default: 5)")
+    parser.add_argument("--replicas", type=int, default=0,
+                        help="Model replica processes; 0 runs the model in-process (default: 0)")
+    parser.add_argument("--torch-threads", type=int, default=1,
+                        help="Torch intra-op threads per replica (default: 1)")
+    parser.add_argument("--stream-in-flight", type=int, default=4,
+                        help="Requests of one stream processed concurrently (default: 4)")
+    parser.add_argument("--metrics-port", type=int, default=9100,
+                        help="Port of the local /metrics endpoint; 0 disables it (default: 9100)")
+    parser.add_argument("--transport", choices=sorted(TRANSPORT_PROFILES), default="default",
+                        help="Keepalive/message-size/concurrency profile; clients should use the same (default: default)")
+    parser.add_argument("--compression", choices=["gzip", "deflate"], default=None,
+                        help="Compress responses (default: off)")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(serve())
+    args = parse_args()
+    asyncio.run(serve(max_batch_size=args.max_batch_size,
+                      max_wait_ms=args.max_wait_ms,
+                      replicas=args.replicas,
+                      torch_threads=args.torch_threads,
+                      stream_in_flight=args.stream_in_flight,
+                      metrics_port=args.metrics_port,
+                      transport=args.transport,
+                      compression=args.compression))
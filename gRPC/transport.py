@@ -0,0 +1,84 @@
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import grpc
+
+_COMPRESSION = {
+    None: grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+
+
+@dataclass(frozen=True)
+class TransportProfile:
+    """
+    HTTP/2 and message settings shared by the CloudRoute server and its
+    clients, so keepalive pings the client sends are ones the server accepts
+    and message limits agree on both ends.
+
+    Compression is off by default: frames are already JPEG, so it only costs
+    CPU unless results dominate the traffic.
+    """
+    name: str = "default"
+    keepalive_time_ms: int = 20_000
+    keepalive_timeout_ms: int = 10_000
+    keepalive_permit_without_calls: bool = True
+    max_message_bytes: int = 16 * 1024 * 1024
+    # HTTP/2 streams per connection, and RPCs across the whole server
+    max_concurrent_streams: int = 100
+    max_concurrent_rpcs: Optional[int] = None
+    compression: Optional[str] = None
+
+    def __post_init__(self):
+        if self.compression not in _COMPRESSION:
+            raise ValueError(f"Unknown compression: {self.compression}")
+
+    @property
+    def grpc_compression(self) -> grpc.Compression:
+        return _COMPRESSION[self.compression]
+
+    def _common_options(self):
+        return [
+            ("grpc.max_send_message_length", self.max_message_bytes),
+            ("grpc.max_receive_message_length", self.max_message_bytes),
+            ("grpc.keepalive_time_ms", self.keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", self.keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", int(self.keepalive_permit_without_calls)),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+
+    def server_options(self):
+        return self._common_options() + [
+            # Accept client pings at this profile's rate, with slack for timer jitter
+            ("grpc.http2.min_ping_interval_without_data_ms", self.keepalive_time_ms // 2),
+            ("grpc.max_concurrent_streams", self.max_concurrent_streams),
+        ]
+
+    def channel_options(self):
+        return self._common_options()
+
+    @classmethod
+    def from_config(cls, config):
+        """A profile name, or a dict with `profile` plus fields to override."""
+        if config is None:
+            return PROFILES["default"]
+        if isinstance(config, str):
+            return get_transport(config)
+        overrides = {k: v for k, v in config.items() if k != "profile"}
+        return replace(get_transport(config.get("profile", "default")), **overrides)
+
+
+PROFILES = {
+    "default": TransportProfile(),
+    # Radio links stall for seconds; do not declare them dead too early
+    "cellular": TransportProfile(name="cellular", keepalive_time_ms=30_000, keepalive_timeout_ms=20_000),
+    "lan": TransportProfile(name="lan", keepalive_time_ms=10_000, keepalive_timeout_ms=5_000,
+                            max_concurrent_streams=1000),
+}
+
+
+def get_transport(name: str) -> TransportProfile:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown transport profile: {name}")
+    return PROFILES[name]
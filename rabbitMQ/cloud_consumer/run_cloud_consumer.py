@@ -1,11 +1,13 @@
 import os
 import sys
+import time
+import queue
 import logging
 import argparse
+import multiprocessing as mp
 import pika
 from pathlib import Path
 from detection.model.cloud_model.consumer.cloud_model_consumer import CloudModelConsumer
-from detection.model.rf_detr.rf_detection import RFDETRDetectionService
 
 """
 RF-DETR Consumer Service
@@ -29,7 +31,17 @@ Example:
 
     # Using command-line arguments
     python run_cloud_consumer.py --host rabbit.example.com --user user --password pass
+
+    # One consumer process per slice of the CPUs, restarted if it dies
+    python run_cloud_consumer.py --workers 4
 """
+
+# Restart delays of a worker that keeps dying soon after it starts (model load, broker down)
+RESTART_BACKOFF = 5.0
+MAX_RESTART_BACKOFF = 300.0
+# A worker that stayed up this long starts its crash count over
+STABLE_SECONDS = 60.0
+
 def parse_args():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(description='Run RF-DETR Consumer Service')
@@ -43,6 +55,20 @@ def parse_args():
                       help='RabbitMQ username (default: guest)')
     parser.add_argument('--password', default=os.getenv('RABBITMQ_PASS', 'guest'),
                       help='RabbitMQ password (default: guest)')
+    parser.add_argument('--max-batch-size', type=int, default=8,
+                      help='Most tasks per inference batch (default: 8)')
+    parser.add_argument('--max-wait-ms', type=float, default=5,
+                      help='Longest wait for a batch to fill, in ms (default: 5)')
+    parser.add_argument('--prefetch', type=int, default=None,
+                      help='Unacked tasks the broker delivers ahead (default: 2x batch size)')
+    parser.add_argument('--clock-skew-ms', type=float, default=None,
+                      help='Also enforce the absolute x-deadline with this much grace; needs NTP-synced clocks (default: off)')
+    parser.add_argument('--workers', type=int, default=0,
+                      help='Consumer processes to supervise; 0 runs one in this process (default: 0)')
+    parser.add_argument('--torch-threads', type=int, default=None,
+                      help='Torch threads per worker (default: CPUs divided by workers)')
+    parser.add_argument('--report-interval', type=float, default=30,
+                      help='Seconds between throughput reports in supervisor mode (default: 30)')
     parser.add_argument('--log-level', default='INFO',
                       choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
                       help='Logging level (default: INFO)')
@@ -59,6 +85,174 @@ def setup_logging(level='INFO'):
     )
     return logging.getLogger(__name__)
 
+def build_consumer(args, model_name):
+    """Load the model and create a consumer for it."""
+    # Imported here so the supervisor process does not load the model libraries
+    from detection.model.rf_detr.rf_detection import RFDETRDetectionService
+    detection_service = RFDETRDetectionService("rfdetr-nano")
+    return CloudModelConsumer(
+        user=args.user,
+        password=args.password,
+        host=args.host,
+        vhost=args.vhost,
+        detection_service=detection_service,
+        model_name=model_name,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        prefetch=args.prefetch,
+        clock_skew_ms=args.clock_skew_ms
+    )
+
+def worker_cpus(index, workers):
+    """The slice of this machine's CPUs worker `index` is pinned to."""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cpus) // workers)
+    start = (index * per_worker) % len(cpus)
+    return cpus[start:start + per_worker]
+
+def worker_main(index, args, model_name, cpus, torch_threads, stats_queue):
+    """Entry point of one consumer process in supervisor mode."""
+    logger = setup_logging(args.log_level)
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    if torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+    consumer = build_consumer(args, model_name)
+    try:
+        consumer.connect()
+    except pika.exceptions.AMQPConnectionError as e:
+        logger.error(f"Worker {index} failed to connect to RabbitMQ: {e!r}")
+        sys.exit(1)
+    logger.info(f"Worker {index} connected (cpus {cpus}, {torch_threads} torch threads)")
+
+    reported_at = time.monotonic()
+
+    def report():
+        # Timers drift, so each report says how many seconds its counts cover
+        nonlocal reported_at
+        now = time.monotonic()
+        stats_queue.put((index, consumer.stats(), now - reported_at))
+        reported_at = now
+        consumer.connection.call_later(args.report_interval, report)
+
+    consumer.connection.call_later(args.report_interval, report)
+    try:
+        consumer.start()
+    except KeyboardInterrupt:
+        pass
+
+def restart_delay(crashes):
+    """
+    Seconds before restarting a worker that died `crashes` times in a row
+    soon after starting: at once the first time, then exponentially longer.
+    """
+    if crashes <= 1:
+        return 0.0
+    return min(MAX_RESTART_BACKOFF, RESTART_BACKOFF * 2 ** (crashes - 2))
+
+class Throughput:
+    """
+    Worker reports of one supervisor interval. Each worker's fps is its
+    frames over the seconds its own reports cover, and the total is the sum
+    of those rates, so reports on drifting timers are not mixed up.
+    """
+
+    def __init__(self):
+        self.workers = {}
+
+    def add(self, index, stats, seconds):
+        frames, batches, stale, covered = self.workers.get(index, (0, 0, 0, 0.0))
+        self.workers[index] = (frames + stats["frames"], batches + stats["batches"],
+                               stale + stats["stale"], covered + seconds)
+
+    def fps(self, index):
+        frames, _, _, covered = self.workers[index]
+        return frames / covered if covered > 0 else 0.0
+
+    def summary(self, indices):
+        """One log line for the interval; starts the next one."""
+        per_worker = []
+        for index in indices:
+            if index not in self.workers:
+                per_worker.append(f"w{index} no report")
+                continue
+            frames, batches, stale, _ = self.workers[index]
+            per_worker.append(f"w{index} {self.fps(index):.1f} fps "
+                              f"(batch {frames / batches if batches else 0.0:.1f}, {stale} stale)")
+        total = sum(self.fps(index) for index in self.workers)
+        self.workers = {}
+        return f"Throughput {total:.1f} fps: {', '.join(per_worker)}"
+
+def supervise(args, model_name, logger):
+    """
+    Run `args.workers` consumer processes on the shared task queue, restart
+    any that die and log their throughput every report interval. A worker
+    that keeps dying soon after it starts is restarted with exponential
+    backoff, up to MAX_RESTART_BACKOFF seconds apart.
+    """
+    ctx = mp.get_context("spawn")
+    stats_queue = ctx.Queue()
+    processes = {}
+    started_at = {}
+    crashes = {index: 0 for index in range(args.workers)}
+    restart_at = {}
+
+    def start_worker(index):
+        cpus = worker_cpus(index, args.workers)
+        torch_threads = args.torch_threads or len(cpus)
+        process = ctx.Process(target=worker_main, name=f"{model_name}-worker-{index}",
+                              args=(index, args, model_name, cpus, torch_threads, stats_queue),
+                              daemon=True)
+        process.start()
+        processes[index] = process
+        started_at[index] = time.monotonic()
+
+    for index in range(args.workers):
+        start_worker(index)
+    logger.info(f"Started {args.workers} {model_name.upper()} workers")
+
+    throughput = Throughput()
+    next_report = time.monotonic() + args.report_interval
+    try:
+        while True:
+            try:
+                throughput.add(*stats_queue.get(timeout=1))
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for index, process in processes.items():
+                if process.is_alive():
+                    continue
+                if index not in restart_at:
+                    if now - started_at[index] < STABLE_SECONDS:
+                        crashes[index] += 1
+                    else:
+                        crashes[index] = 0
+                    delay = restart_delay(crashes[index])
+                    restart_at[index] = now + delay
+                    logger.error(f"Worker {index} died (exit {process.exitcode}), restarting in {delay:.0f}s")
+                if now >= restart_at[index]:
+                    del restart_at[index]
+                    start_worker(index)
+
+            # Workers report on their own timers; give the last of them a second to arrive
+            if now >= next_report + 1:
+                logger.info(throughput.summary(sorted(processes)))
+                next_report += args.report_interval
+    except KeyboardInterrupt:
+        logger.info("Shutting down workers...")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(timeout=5)
+
 def main():
     """Main function to run the RF-DETR consumer."""
     args = parse_args()
@@ -66,17 +260,13 @@ def main():
     model_name = "rf-detr"
     logger.info(f"Starting {model_name.upper()} Consumer Service")
     logger.info(f"Connecting to RabbitMQ at {args.host}:{args.port}{args.vhost} as {args.user}")
+    if args.workers > 0:
+        supervise(args, model_name, logger)
+        logger.info(f"{model_name.upper()} Consumer Service stopped")
+        return
     try:
-        detection_service = RFDETRDetectionService("rfdetr-nano")
         # Initialize and start consumer
-        consumer = CloudModelConsumer(
-            user=args.user,
-            password=args.password,
-            host=args.host,
-            vhost=args.vhost,
-            detection_service=detection_service,
-            model_name=model_name
-        )
+        consumer = build_consumer(args, model_name)
         
         # Connect to RabbitMQ
         consumer.connect()
@@ -0,0 +1,178 @@
+"""
+asyncio-native flavour of connection_manager: the same Producer, Consumer and
+ConnectionManager API, but the AMQP connection is a pika AsyncioConnection on
+the caller's event loop instead of a SelectConnection in its own thread. No
+thread hand-offs are left: deliveries go straight into the event queue and
+publishes are written from the loop.
+
+Swap the import to switch a process over:
+
+    from rabbitMQ.consumer.asyncio_connection_manager import ConnectionManager, Consumer, Producer
+"""
+import asyncio
+import logging
+import random
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from rabbitMQ.consumer import connection_manager, memory_broker
+
+log = logging.getLogger(__name__)
+
+
+def _resolve(future, result):
+    if future is not None and not future.done():
+        future.set_result(result)
+
+
+class Producer(connection_manager.Producer):
+    """
+    Publishes to one queue from the event loop. `publish` returns a future
+    that resolves to True once the message is handed to the connection, or
+    False if it was dropped from a full backlog; callers that do not await it
+    keep fire-and-forget behaviour. Messages published before the channel is
+    open, or while it is down, wait in the backlog and go out on (re)connect.
+    """
+
+    def publish(self, message_obj, expire_time=None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if len(self._outbound) == self._outbound.maxlen:
+            self.dropped += 1
+            _resolve(self._outbound.popleft()[2], False)
+        self._outbound.append((*self._encode(message_obj, expire_time), future))
+        self._wake()
+        return future
+
+    def _wake(self):
+        if self._drain_scheduled or self.channel is None:
+            return
+        self._drain_scheduled = True
+        asyncio.get_running_loop().call_soon(self._drain)
+
+    def _drain(self):
+        self._drain_scheduled = False
+        channel = self.channel
+        if channel is None or not channel.is_open:
+            return
+        for _ in range(self.batch_size):
+            try:
+                payload, properties, future = self._outbound.popleft()
+            except IndexError:
+                return
+            channel.basic_publish(
+                exchange="",
+                routing_key=self.queue_name,
+                body=payload,
+                properties=properties
+            )
+            self.published += 1
+            _resolve(future, True)
+        if self._outbound:
+            # Give the loop a turn between batches
+            self._wake()
+
+
+class Consumer(connection_manager.Consumer):
+    """
+    Consumes one queue on the event loop. Decoded messages go straight into
+    the event queue; acks are still batched into one basic_ack(multiple=True)
+    per loop pass or `ack_batch` deliveries.
+    """
+
+    def _schedule_flush(self, ch):
+        asyncio.get_running_loop().call_soon(self._flush)
+
+    def _hand_off(self, batch):
+        self._enqueue(batch)
+
+
+class ConnectionManager(connection_manager.ConnectionManager):
+    """
+    Keeps one AsyncioConnection open on `asyncio_loop` (the running loop when
+    not set). A lost or refused connection is retried after an exponential,
+    jittered backoff from `initial_backoff` up to `max_backoff` seconds; the
+    backoff resets once a connection opens.
+    """
+
+    def __init__(self, amqp_url, asyncio_loop=None, initial_backoff=1.0, max_backoff=30.0):
+        super().__init__(amqp_url, asyncio_loop)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._closed = None
+        self._opened = False
+        self._task = None
+
+    def connect(self):
+        if memory_broker.is_memory_url(self.amqp_url):
+            return memory_broker.asyncio_connection(
+                self.amqp_url,
+                on_open_callback=self.on_connection_open,
+                on_close_callback=self.on_connection_closed,
+                loop=self.asyncio_loop,
+            )
+        return AsyncioConnection(
+            pika.URLParameters(self.amqp_url),
+            on_open_callback=self.on_connection_open,
+            on_open_error_callback=self.on_connection_open_error,
+            on_close_callback=self.on_connection_closed,
+            custom_ioloop=self.asyncio_loop,
+        )
+
+    def on_connection_open(self, connection):
+        self._opened = True
+        super().on_connection_open(connection)
+
+    def on_connection_open_error(self, connection, error):
+        log.error(f"RabbitMQ connection failed: {error!r}")
+        _resolve(self._closed, error)
+
+    def on_connection_closed(self, connection, reason):
+        log.warning("Connection closed: %s", reason)
+        for producer in self.producers:
+            producer.detach()
+        _resolve(self._closed, reason)
+
+    async def run(self):
+        if self.asyncio_loop is None:
+            self.asyncio_loop = asyncio.get_running_loop()
+        backoff = self.initial_backoff
+        while True:
+            self._closed = self.asyncio_loop.create_future()
+            self._opened = False
+            try:
+                self.connection = self.connect()
+                await self._closed
+            except asyncio.CancelledError:
+                await self.close()
+                raise
+            except Exception as e:
+                log.error(f"RabbitMQ connection failed: {e}")
+            if self._opened:
+                backoff = self.initial_backoff
+            delay = backoff * random.uniform(0.5, 1.0)
+            log.info(f"Reconnecting in {delay:.1f} seconds...")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def run_in_background(self):
+        """Starts run() as a task on the loop; call from that loop."""
+        loop = self.asyncio_loop or asyncio.get_running_loop()
+        self._task = loop.create_task(self.run())
+        return self._task
+
+    async def close(self):
+        connection = self.connection
+        if connection is not None and not (connection.is_closing or connection.is_closed):
+            connection.close()
+            if self._closed is not None and not self._closed.done():
+                await asyncio.shield(self._closed)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,62 +1,200 @@
 import pika
 import logging
 import json
+import struct
 import threading
+from collections import deque
+from functools import partial
+from rabbitMQ.consumer import memory_broker
+from rabbitMQ.dtos.codec import JsonCodec, decode_message, get_codec
 log = logging.getLogger(__name__)
 
 
 class Producer:
-    def __init__(self, queue_name):
+    """
+    Publishes to one queue from any thread. `publish` only encodes the message
+    and appends it to an outbound deque; the pika ioloop thread is woken with
+    add_callback_threadsafe and drains up to `batch_size` messages per pass,
+    so pika is only ever touched from its own thread and one wakeup covers a
+    burst of messages. Messages published while the channel is down wait in
+    the deque (oldest dropped beyond `max_pending`) and go out on reconnect.
+
+    `codec` picks the body encoding (see rabbitMQ/dtos/codec.py); message
+    types it has no layout for are sent as JSON. The content type travels in
+    the message properties so consumers decode either.
+    """
+
+    def __init__(self, queue_name, batch_size=64, max_pending=1000, codec="json"):
         self.queue_name = queue_name
         self.channel = None
+        self.connection = None
+        self.batch_size = batch_size
+        self._outbound = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._drain_scheduled = False
+        self.codec = get_codec(codec)
+        self._json = JsonCodec()
+        self._properties = {}
+        self.published = 0
+        self.dropped = 0
 
     def get_queue(self):
         return self.queue_name
 
+    def attach(self, connection, channel):
+        """Called on the ioloop thread once the channel is open."""
+        with self._lock:
+            self.connection = connection
+            self.channel = channel
+            # A drain scheduled on the previous connection's ioloop will never run
+            self._drain_scheduled = False
+        if self._outbound:
+            self._wake()
+
+    def detach(self):
+        with self._lock:
+            self.channel = None
+            self._drain_scheduled = False
+
+    def _get_properties(self, expire_time, content_type):
+        properties = self._properties.get((expire_time, content_type))
+        if properties is None:
+            properties = self._properties[(expire_time, content_type)] = pika.BasicProperties(
+                content_type=content_type,
+                expiration=expire_time,  # Message expires after 60 seconds (60000 milliseconds)
+            )
+        return properties
+
+    def _encode(self, message_obj, expire_time):
+        codec = self.codec if self.codec.supports(type(message_obj)) else self._json
+        return codec.encode(message_obj), self._get_properties(expire_time, codec.content_type)
+
     def publish(self, message_obj, expire_time=None):
-        if self.channel is None:
+        if self.connection is None:
             log.error("Producer channel not ready yet!")
             return
 
-        properties = pika.BasicProperties()
-        if expire_time is not None:
-            properties = pika.BasicProperties(
-                expiration=expire_time,  # Message expires after 60 seconds (60000 milliseconds)
+        if len(self._outbound) == self._outbound.maxlen:
+            self.dropped += 1
+        self._outbound.append(self._encode(message_obj, expire_time))
+        self._wake()
+
+    def _wake(self):
+        with self._lock:
+            if self._drain_scheduled or self.channel is None:
+                # Channel is down; attach() drains the backlog on reconnect
+                return
+            self._drain_scheduled = True
+            connection = self.connection
+        try:
+            connection.ioloop.add_callback_threadsafe(partial(self._drain, connection))
+        except Exception as e:
+            # Connection is gone; attach() drains the backlog on reconnect
+            log.debug(f"Producer wakeup failed: {e}")
+            with self._lock:
+                if self.connection is connection:
+                    self._drain_scheduled = False
+
+    def _drain(self, connection):
+        # Runs on the ioloop thread
+        with self._lock:
+            if connection is not self.connection:
+                # Scheduled for a connection that has since been replaced
+                return
+            self._drain_scheduled = False
+        channel = self.channel
+        if channel is None or not channel.is_open:
+            return
+        for _ in range(self.batch_size):
+            try:
+                payload, properties = self._outbound.popleft()
+            except IndexError:
+                return
+            channel.basic_publish(
+                exchange="",
+                routing_key=self.queue_name,
+                body=payload,
+                properties=properties
             )
-        payload = json.dumps(message_obj.__dict__).encode()
-        self.channel.basic_publish(
-            exchange="",
-            routing_key=self.queue_name,
-            body=payload,
-            properties=properties
-        )
+            self.published += 1
+        if self._outbound:
+            # Let the ioloop flush this batch before the next one
+            self._wake()
 
 
 class Consumer:
-    def __init__(self, queue_name, event_queue, data_class):
+    """
+    Consumes one queue on the pika ioloop thread and hands messages to an
+    asyncio queue. The broker may have up to `prefetch` messages unacked.
+    Messages that arrive in the same ioloop pass, up to `ack_batch`, are
+    handed to the asyncio loop with a single call_soon_threadsafe and acked
+    with one basic_ack(multiple=True).
+    """
+
+    def __init__(self, queue_name, event_queue, data_class, prefetch=100, ack_batch=50):
         self.queue_name = queue_name
         self.event_queue = event_queue
         self.channel = None
         self.data_class = data_class
         self.asyncio_loop = None
+        self.prefetch = prefetch
+        self.ack_batch = ack_batch
+        self._batch = []
+        self._last_tag = None
+        self._unacked = 0
+        self._flush_scheduled = False
 
     def get_queue(self):
         return self.queue_name
 
+    def attach(self, channel):
+        """Called on the ioloop thread once the channel is open; tags of an old channel are void."""
+        self.channel = channel
+        self._batch = []
+        self._last_tag = None
+        self._unacked = 0
+        self._flush_scheduled = False
+
     def on_message(self, ch, method, props, body):
         try:
-            data = json.loads(body.decode())
-            msg = self.data_class(**data)
-
-            # Push into async queue safely
-            self.asyncio_loop.call_soon_threadsafe(
-                self.event_queue.put_nowait, msg
-            )
+            self._batch.append(decode_message(body, props.content_type, self.data_class))
         except json.decoder.JSONDecodeError:
             log.error("Failed to decode JSON, ignoring")
+        except (ValueError, TypeError, struct.error) as e:
+            log.error(f"Failed to decode {props.content_type} message, ignoring: {e}")
+
+        # Undecodable messages are acked too, as part of the batch
+        self._last_tag = method.delivery_tag
+        self._unacked += 1
+        if self._unacked >= self.ack_batch:
+            self._flush()
+        elif not self._flush_scheduled:
+            # Runs after the deliveries already read in this ioloop pass
+            self._flush_scheduled = True
+            self._schedule_flush(ch)
 
-        # Acknowledge
-        ch.basic_ack(method.delivery_tag)
+    def _schedule_flush(self, ch):
+        ch.connection.ioloop.add_callback_threadsafe(self._flush)
+
+    def _hand_off(self, batch):
+        # Push into async queue safely, one wakeup per batch
+        self.asyncio_loop.call_soon_threadsafe(self._enqueue, batch)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self._hand_off(batch)
+        if self._last_tag is not None and self.channel is not None and self.channel.is_open:
+            # Acknowledge everything up to the last delivery
+            self.channel.basic_ack(self._last_tag, multiple=True)
+        self._last_tag = None
+        self._unacked = 0
+
+    def _enqueue(self, batch):
+        # Runs on the asyncio loop
+        for msg in batch:
+            self.event_queue.put_nowait(msg)
 
 class ConnectionManager:
     def __init__(self, amqp_url, asyncio_loop=None):
@@ -73,6 +211,12 @@ class ConnectionManager:
         self.producers.append(producer)
 
     def connect(self):
+        if memory_broker.is_memory_url(self.amqp_url):
+            return memory_broker.select_connection(
+                self.amqp_url,
+                on_open_callback=self.on_connection_open,
+                on_close_callback=self.on_connection_closed,
+            )
         return pika.SelectConnection(
             pika.URLParameters(self.amqp_url),
             on_open_callback=self.on_connection_open,
@@ -97,17 +241,17 @@ class ConnectionManager:
 
     def on_producer_channel_open(self, channel, producer):
         log.info(f"Producer channel opened for queue: {producer.get_queue()}")
-        producer.channel = channel
 
         # Declare queue safely (idempotent)
         channel.queue_declare(
             queue=producer.get_queue(),
             durable=True
         )
+        producer.attach(channel.connection, channel)
 
     def on_consumer_channel_open(self, channel, consumer):
         log.info(f"Consumer channel opened for queue: {consumer.get_queue()}")
-        consumer.channel = channel
+        consumer.attach(channel)
 
         # Declare consumer queue
         channel.queue_declare(
@@ -115,6 +259,9 @@ class ConnectionManager:
             durable=True
         )
 
+        # Bound the unacked deliveries the broker pushes ahead
+        channel.basic_qos(prefetch_count=consumer.prefetch)
+
         channel.basic_consume(
             queue=consumer.get_queue(),
             on_message_callback=consumer.on_message,
@@ -123,6 +270,10 @@ class ConnectionManager:
 
     def on_connection_closed(self, connection, reason):
         log.warning("Connection closed: %s", reason)
+        for producer in self.producers:
+            producer.detach()
+        # Leave the ioloop so run() reconnects
+        connection.ioloop.stop()
 
     def run(self):
         while True:
@@ -0,0 +1,418 @@
+"""
+In-process stand-in for RabbitMQ, selected with a `memory://` URL wherever an
+AMQP URL is accepted (ConnectionManager, both flavours, CloudModelProducer
+and CloudModelConsumer through `amqp_url`). Every URL with the same host and
+path shares one broker in this process, so a producer and a consumer running
+in different threads or on one event loop talk to each other without any
+external service:
+
+    ConnectionManager("memory://local/")
+    CloudModelProducer(..., amqp_url="memory://local/")
+
+Only the subset of AMQP the repo uses is modelled: the default exchange,
+named and server-named exclusive queues, per-message TTL (`expiration`),
+reply-to/correlation-id RPC (properties pass through untouched), per-consumer
+prefetch, manual and multiple acks, and redelivery of unacked messages when a
+channel closes. Callbacks run on the owning connection's ioloop, never under
+the broker lock, so the threading model matches the real adapters.
+"""
+import asyncio
+import itertools
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from functools import partial
+from typing import Dict
+from urllib.parse import urlparse
+
+import pika
+from pika import frame, spec
+
+SCHEME = "memory"
+
+
+def is_memory_url(url: str) -> bool:
+    return urlparse(url).scheme == SCHEME
+
+
+class _Message:
+    __slots__ = ("body", "properties", "routing_key", "expires_at", "redelivered")
+
+    def __init__(self, body, properties, routing_key, expires_at):
+        self.body = body
+        self.properties = properties
+        self.routing_key = routing_key
+        self.expires_at = expires_at
+        self.redelivered = False
+
+
+class _Queue:
+    def __init__(self, name, owner=None):
+        self.name = name
+        # Connection of an exclusive queue; it is deleted when that connection closes
+        self.owner = owner
+        self.messages = deque()
+        self.consumers = []
+        self._next_consumer = 0
+
+    def next_consumer(self):
+        """Round-robin over consumers with prefetch room, None if all are full."""
+        for _ in range(len(self.consumers)):
+            consumer = self.consumers[self._next_consumer % len(self.consumers)]
+            self._next_consumer += 1
+            if consumer.has_room():
+                return consumer
+        return None
+
+
+class _Subscription:
+    def __init__(self, channel, queue, tag, callback, auto_ack, prefetch):
+        self.channel = channel
+        self.queue = queue
+        self.tag = tag
+        self.callback = callback
+        self.auto_ack = auto_ack
+        self.prefetch = prefetch
+        self.unacked = 0
+
+    def has_room(self):
+        return self.auto_ack or not self.prefetch or self.unacked < self.prefetch
+
+
+class MemoryBroker:
+    """Queues and routing shared by all memory connections to one URL."""
+
+    _brokers: Dict[str, "MemoryBroker"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.queues: Dict[str, _Queue] = {}
+        self.lock = threading.RLock()
+        self.counters = Counter()
+
+    @classmethod
+    def for_url(cls, url: str) -> "MemoryBroker":
+        parsed = urlparse(url)
+        key = f"{parsed.hostname or ''}{parsed.path or '/'}"
+        with cls._registry_lock:
+            if key not in cls._brokers:
+                cls._brokers[key] = cls()
+            return cls._brokers[key]
+
+    @classmethod
+    def reset(cls):
+        """Forget every broker; for tests and benchmarks that need a clean slate."""
+        with cls._registry_lock:
+            cls._brokers.clear()
+
+    def queue_declare(self, name, owner=None) -> _Queue:
+        with self.lock:
+            if not name:
+                name = f"amq.gen-{uuid.uuid4().hex}"
+            queue = self.queues.get(name)
+            if queue is None:
+                queue = self.queues[name] = _Queue(name, owner)
+            return queue
+
+    def publish(self, routing_key, body, properties):
+        expiration = properties.expiration if properties is not None else None
+        expires_at = self.clock() + int(expiration) / 1000 if expiration is not None else None
+        with self.lock:
+            queue = self.queues.get(routing_key)
+            if queue is None:
+                # The default exchange drops messages for queues that do not exist
+                self.counters["unroutable"] += 1
+                return
+            queue.messages.append(_Message(body, properties, routing_key, expires_at))
+            self.counters["published"] += 1
+            self._dispatch(queue)
+
+    def _dispatch(self, queue):
+        # Caller holds the lock
+        now = None
+        while queue.messages:
+            message = queue.messages[0]
+            if message.expires_at is not None:
+                now = now or self.clock()
+                if message.expires_at <= now:
+                    queue.messages.popleft()
+                    self.counters["expired"] += 1
+                    continue
+            consumer = queue.next_consumer()
+            if consumer is None:
+                return
+            queue.messages.popleft()
+            consumer.channel._deliver(consumer, message)
+            self.counters["delivered"] += 1
+
+    def redispatch(self, queue_name):
+        with self.lock:
+            queue = self.queues.get(queue_name)
+            if queue is not None:
+                self._dispatch(queue)
+
+    def delete_owned_queues(self, owner):
+        with self.lock:
+            for name in [name for name, queue in self.queues.items() if queue.owner is owner]:
+                del self.queues[name]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                **self.counters,
+                "queues": {name: len(queue.messages) for name, queue in self.queues.items()},
+            }
+
+
+class MemoryChannel:
+    """The pika channel methods the repo uses; returns are shaped like BlockingChannel's."""
+
+    def __init__(self, connection, channel_number):
+        self.connection = connection
+        self.channel_number = channel_number
+        self.broker = connection.broker
+        self.prefetch = 0
+        self.is_open = True
+        self._consumers: Dict[str, _Subscription] = {}
+        self._unacked = OrderedDict()
+        self._delivery_tags = itertools.count(1)
+        self._consuming = False
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    def _callback(self, callback, method):
+        if callback is not None:
+            self.connection.ioloop.add_callback_threadsafe(
+                partial(callback, frame.Method(self.channel_number, method)))
+        return frame.Method(self.channel_number, method)
+
+    def queue_declare(self, queue="", passive=False, durable=False, exclusive=False,
+                      auto_delete=False, arguments=None, callback=None):
+        declared = self.broker.queue_declare(queue, owner=self.connection if exclusive else None)
+        return self._callback(callback, spec.Queue.DeclareOk(declared.name, len(declared.messages),
+                                                             len(declared.consumers)))
+
+    def basic_qos(self, prefetch_size=0, prefetch_count=0, global_qos=False, callback=None):
+        self.prefetch = prefetch_count
+        return self._callback(callback, spec.Basic.QosOk())
+
+    def basic_consume(self, queue, on_message_callback, auto_ack=False, exclusive=False,
+                      consumer_tag=None, arguments=None, callback=None):
+        consumer_tag = consumer_tag or f"ctag-{uuid.uuid4().hex}"
+        with self.broker.lock:
+            declared = self.broker.queues.get(queue)
+            if declared is None:
+                raise pika.exceptions.ChannelClosedByBroker(404, f"NOT_FOUND - no queue '{queue}'")
+            subscription = _Subscription(self, queue, consumer_tag, on_message_callback, auto_ack, self.prefetch)
+            self._consumers[consumer_tag] = subscription
+            declared.consumers.append(subscription)
+            self.broker._dispatch(declared)
+        self._callback(callback, spec.Basic.ConsumeOk(consumer_tag))
+        return consumer_tag
+
+    def basic_cancel(self, consumer_tag="", callback=None):
+        with self.broker.lock:
+            subscription = self._consumers.pop(consumer_tag, None)
+            queue = self.broker.queues.get(subscription.queue) if subscription else None
+            if queue is not None:
+                queue.consumers.remove(subscription)
+        self._callback(callback, spec.Basic.CancelOk(consumer_tag))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if not self.is_open:
+            raise pika.exceptions.ChannelWrongStateError("Channel is closed.")
+        self.broker.publish(routing_key, body, properties)
+
+    def _deliver(self, subscription, message):
+        # Broker lock held: assign the tag now, run the callback on the ioloop
+        delivery_tag = next(self._delivery_tags)
+        if not subscription.auto_ack:
+            subscription.unacked += 1
+            self._unacked[delivery_tag] = (subscription, message)
+        method = spec.Basic.Deliver(subscription.tag, delivery_tag, message.redelivered, "", message.routing_key)
+        properties = message.properties or pika.BasicProperties()
+        self.connection.ioloop.add_callback_threadsafe(
+            partial(self._run_callback, subscription, method, properties, message.body))
+
+    def _run_callback(self, subscription, method, properties, body):
+        if self.is_open and self._consumers.get(subscription.tag) is subscription:
+            subscription.callback(self, method, properties, body)
+
+    def _settle(self, delivery_tag, multiple, requeue=None):
+        with self.broker.lock:
+            if multiple:
+                tags = [tag for tag in self._unacked if tag <= delivery_tag or delivery_tag == 0]
+            else:
+                tags = [delivery_tag] if delivery_tag in self._unacked else []
+            queues = set()
+            # Newest first, so requeued messages keep their order at the front
+            for tag in reversed(tags):
+                subscription, message = self._unacked.pop(tag)
+                subscription.unacked -= 1
+                queues.add(subscription.queue)
+                if requeue:
+                    message.redelivered = True
+                    queue = self.broker.queues.get(subscription.queue)
+                    if queue is not None:
+                        queue.messages.appendleft(message)
+                else:
+                    self.broker.counters["acked" if requeue is None else "rejected"] += 1
+            for name in queues:
+                self.broker.redispatch(name)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self._settle(delivery_tag, multiple)
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self._settle(delivery_tag, multiple, requeue=requeue)
+
+    def basic_reject(self, delivery_tag=0, requeue=True):
+        self._settle(delivery_tag, False, requeue=requeue)
+
+    def start_consuming(self):
+        """Blocking-style consume loop; returns after stop_consuming()."""
+        self._consuming = True
+        while self._consuming and self.is_open:
+            self.connection.process_data_events(time_limit=None)
+
+    def stop_consuming(self, consumer_tag=None):
+        self._consuming = False
+        self.connection.ioloop.wake()
+
+    def close(self, reply_code=0, reply_text="Normal shutdown"):
+        if not self.is_open:
+            return
+        with self.broker.lock:
+            for tag in list(self._consumers):
+                self.basic_cancel(tag)
+            # Unacked deliveries go back to the front of their queues
+            self._settle(0, True, requeue=True)
+            self.is_open = False
+
+
+class _IOLoop:
+    """Callback queue standing in for a SelectConnection/BlockingConnection ioloop."""
+
+    def __init__(self):
+        self._callbacks = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+
+    def add_callback_threadsafe(self, callback):
+        with self._condition:
+            self._callbacks.append(callback)
+            self._condition.notify()
+
+    def wake(self):
+        with self._condition:
+            self._condition.notify()
+
+    def poll(self, time_limit=0):
+        """Run queued callbacks, waiting up to `time_limit` (None: forever) for the first."""
+        with self._condition:
+            if not self._callbacks and time_limit != 0 and not self._stopping:
+                self._condition.wait(time_limit)
+            batch, self._callbacks = self._callbacks, deque()
+        for callback in batch:
+            callback()
+
+    def start(self):
+        self._stopping = False
+        while not self._stopping:
+            self.poll(time_limit=None)
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+
+class _AsyncioIOLoop:
+    """Runs connection callbacks on an asyncio loop, like AsyncioConnection does."""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def add_callback_threadsafe(self, callback):
+        self.loop.call_soon_threadsafe(callback)
+
+    def wake(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class MemoryConnection:
+    """One client connection; `ioloop` decides where its callbacks run."""
+
+    def __init__(self, broker, ioloop, on_open_callback=None, on_close_callback=None):
+        self.broker = broker
+        self.ioloop = ioloop
+        self.on_close_callback = on_close_callback
+        self.is_open = True
+        self.is_closing = False
+        self._channels = []
+        self._channel_numbers = itertools.count(1)
+        if on_open_callback is not None:
+            ioloop.add_callback_threadsafe(partial(on_open_callback, self))
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    def channel(self, channel_number=None, on_open_callback=None):
+        channel = MemoryChannel(self, channel_number or next(self._channel_numbers))
+        self._channels.append(channel)
+        if on_open_callback is not None:
+            self.ioloop.add_callback_threadsafe(partial(on_open_callback, channel))
+        return channel
+
+    def add_callback_threadsafe(self, callback):
+        self.ioloop.add_callback_threadsafe(callback)
+
+    def call_later(self, delay, callback):
+        timer = threading.Timer(delay, self.ioloop.add_callback_threadsafe, (callback,))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def remove_timeout(self, timer):
+        timer.cancel()
+
+    def process_data_events(self, time_limit=0):
+        self.ioloop.poll(time_limit)
+
+    def close(self, reply_code=200, reply_text="Normal shutdown"):
+        if not self.is_open:
+            return
+        for channel in self._channels:
+            channel.close()
+        self.broker.delete_owned_queues(self)
+        self.is_open = False
+        if self.on_close_callback is not None:
+            reason = pika.exceptions.ConnectionClosedByClient(reply_code, reply_text)
+            self.ioloop.add_callback_threadsafe(partial(self.on_close_callback, self, reason))
+        self.ioloop.wake()
+
+
+def select_connection(url, on_open_callback=None, on_close_callback=None) -> MemoryConnection:
+    """Stand-in for pika.SelectConnection; run it with connection.ioloop.start()."""
+    return MemoryConnection(MemoryBroker.for_url(url), _IOLoop(), on_open_callback, on_close_callback)
+
+
+def asyncio_connection(url, on_open_callback=None, on_close_callback=None, loop=None) -> MemoryConnection:
+    """Stand-in for pika's AsyncioConnection on `loop` (the running loop by default)."""
+    return MemoryConnection(MemoryBroker.for_url(url), _AsyncioIOLoop(loop or asyncio.get_running_loop()),
+                            on_open_callback, on_close_callback)
+
+
+def blocking_connection(url):
+    """pika.BlockingConnection for an AMQP URL, a MemoryConnection for a memory:// one."""
+    if is_memory_url(url):
+        return MemoryConnection(MemoryBroker.for_url(url), _IOLoop())
+    return pika.BlockingConnection(pika.URLParameters(url))
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Protocol
+
+from rabbitMQ.dtos.dto import SuspicionFrameMessage
+
+THRESHOLD_CROSSING = "threshold_crossing"
+SIGNIFICANT_CHANGE = "significant_change"
+KEYFRAME = "keyframe"
+RATE = "rate"
+TRAILING = "trailing"
+
+
+class MessageProducer(Protocol):
+    """What CoalescingPublisher needs from a producer; both connection_manager flavours fit."""
+
+    def publish(self, message_obj, expire_time=None): ...
+
+
+class CoalescingPublisher:
+    """
+    Publishes per-frame suspicion scores through a Producer at no more than
+    `max_rate_hz`, always sending the latest score. A score that crosses the
+    suspicion threshold or moves by at least `min_delta` since the last sent
+    one goes out immediately, and the current score is re-sent every
+    `keyframe_seconds` even when it has not changed so consumers that joined
+    late or dropped a message recover. When a score is coalesced, a trailing
+    send is scheduled on the running event loop for the end of the rate
+    interval, so the last score of a burst is never lost.
+    """
+
+    def __init__(self,
+                 producer: MessageProducer,
+                 threshold: float,
+                 max_rate_hz: float = 3.0,
+                 min_delta: float = 5.0,
+                 keyframe_seconds: float = 2.0,
+                 expire_time: str = "100",
+                 clock=time.monotonic):
+        self.producer = producer
+        self.threshold = threshold
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz else 0.0
+        self.min_delta = min_delta
+        self.keyframe_seconds = keyframe_seconds
+        self.expire_time = expire_time
+        self.clock = clock
+        self._last_score = None
+        self._last_sent_at = float("-inf")
+        # Latest coalesced score that differs from the last one sent
+        self._pending = None
+        self._trailing = None
+        self.received = 0
+        self.reasons = Counter()
+
+    @classmethod
+    def from_config(cls, producer: MessageProducer, threshold: float, config: dict):
+        config = config or {}
+        return cls(
+            producer,
+            threshold,
+            max_rate_hz=float(config.get("max_rate_hz", 3.0)),
+            min_delta=float(config.get("min_delta", 5.0)),
+            keyframe_seconds=float(config.get("keyframe_seconds", 2.0)),
+            expire_time=config.get("expire_time", "100"),
+        )
+
+    def _reason(self, score, now):
+        if self._last_score is None:
+            return KEYFRAME
+        if (self._last_score >= self.threshold) != (score >= self.threshold):
+            return THRESHOLD_CROSSING
+        if abs(score - self._last_score) >= self.min_delta:
+            return SIGNIFICANT_CHANGE
+        elapsed = now - self._last_sent_at
+        if elapsed >= self.keyframe_seconds:
+            return KEYFRAME
+        if score != self._last_score and elapsed >= self.min_interval:
+            return RATE
+        return None
+
+    def publish(self, score) -> bool:
+        """Offer the latest score; returns True if a message was sent."""
+        self.received += 1
+        now = self.clock()
+        reason = self._reason(score, now)
+        if reason is None:
+            self._pending = score if score != self._last_score else None
+            if self._pending is None:
+                self._cancel_trailing()
+            elif self._trailing is None:
+                self._schedule_trailing(now)
+            return False
+        self._send(score, reason, now)
+        return True
+
+    def _send(self, score, reason, now):
+        self._pending = None
+        self._cancel_trailing()
+        self.producer.publish(
+            message_obj=SuspicionFrameMessage(suspicion_score=score),
+            expire_time=self.expire_time
+        )
+        self._last_score = score
+        self._last_sent_at = now
+        self.reasons[reason] += 1
+
+    def _schedule_trailing(self, now):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop to flush from; the next offered score goes out instead
+            return
+        delay = max(self._last_sent_at + self.min_interval - now, 0.0)
+        self._trailing = loop.call_later(delay, self._flush_trailing)
+
+    def _flush_trailing(self):
+        self._trailing = None
+        if self._pending is not None:
+            self._send(self._pending, TRAILING, self.clock())
+
+    def _cancel_trailing(self):
+        if self._trailing is not None:
+            self._trailing.cancel()
+            self._trailing = None
+
+    def close(self):
+        """Drop a scheduled trailing send."""
+        self._pending = None
+        self._cancel_trailing()
+
+    def stats(self, reset: bool = True) -> dict:
+        sent = sum(self.reasons.values())
+        stats = {
+            "received": self.received,
+            "sent": sent,
+            "coalesced_ratio": 1 - sent / self.received if self.received else 0.0,
+            "reasons": dict(self.reasons),
+        }
+        if reset:
+            self.received = 0
+            self.reasons.clear()
+        return stats
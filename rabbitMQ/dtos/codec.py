@@ -0,0 +1,131 @@
+import json
+import struct
+from abc import ABC, abstractmethod
+from dataclasses import fields
+from operator import attrgetter
+from typing import Dict, Optional, Type
+
+from rabbitMQ.dtos.dto import RecordingStatusMessage, SuspicionFrameMessage
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_CONTENT_TYPE = "application/json"
+STRUCT_CONTENT_TYPE = "application/x-guardcar-struct"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class Codec(ABC):
+    """Turns DTOs into message bodies and back; content_type goes into the AMQP properties."""
+    name = None
+    content_type = None
+
+    def supports(self, data_class) -> bool:
+        return True
+
+    @abstractmethod
+    def encode(self, message_obj) -> bytes:
+        """Encode a DTO into a message body."""
+        pass
+
+    @abstractmethod
+    def decode(self, body: bytes, data_class):
+        """Decode a message body into an instance of data_class."""
+        pass
+
+
+class JsonCodec(Codec):
+    """Field-name keyed JSON; what every producer sent before codecs existed."""
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, message_obj) -> bytes:
+        return json.dumps(message_obj.__dict__).encode()
+
+    def decode(self, body: bytes, data_class):
+        return data_class(**json.loads(body.decode()))
+
+
+def _tuple_getter(data_class):
+    names = [f.name for f in fields(data_class)]
+    if len(names) == 1:
+        # attrgetter returns a bare value for a single name
+        getter = attrgetter(names[0])
+        return lambda obj: (getter(obj),)
+    return attrgetter(*names)
+
+
+class StructCodec(Codec):
+    """
+    Fixed binary layout for the high-rate DTOs: one type byte followed by the
+    fields in declaration order. Only types listed in LAYOUTS are supported.
+    Floats are stored as float32, so decoded values can differ from the
+    encoded ones by float32 rounding (about 7 significant digits).
+    """
+    name = "struct"
+    content_type = STRUCT_CONTENT_TYPE
+
+    # type id, struct layout of the fields
+    LAYOUTS: Dict[Type, tuple] = {
+        # The score is float32 on the wire: lossy, but far finer than a 0-100 score needs
+        SuspicionFrameMessage: (1, struct.Struct("<Bf")),
+        RecordingStatusMessage: (2, struct.Struct("<B?")),
+    }
+
+    def __init__(self):
+        # Field getters in declaration order; far cheaper than dataclasses.astuple
+        self._getters = {cls: _tuple_getter(cls) for cls in self.LAYOUTS}
+
+    def supports(self, data_class) -> bool:
+        return data_class in self.LAYOUTS
+
+    def encode(self, message_obj) -> bytes:
+        data_class = type(message_obj)
+        type_id, layout = self.LAYOUTS[data_class]
+        return layout.pack(type_id, *self._getters[data_class](message_obj))
+
+    def decode(self, body: bytes, data_class):
+        type_id, layout = self.LAYOUTS[data_class]
+        values = layout.unpack(body)
+        if values[0] != type_id:
+            raise ValueError(f"Body holds type {values[0]}, expected {data_class.__name__}")
+        return data_class(*values[1:])
+
+
+class MsgpackCodec(Codec):
+    """Fields as a msgpack array in declaration order; needs the optional msgpack package."""
+    name = "msgpack"
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("msgpack is not installed")
+
+    def encode(self, message_obj) -> bytes:
+        return msgpack.packb([getattr(message_obj, f.name) for f in fields(message_obj)])
+
+    def decode(self, body: bytes, data_class):
+        return data_class(*msgpack.unpackb(body))
+
+
+_CODECS = {codec.name: codec for codec in (JsonCodec, StructCodec, MsgpackCodec)}
+_BY_CONTENT_TYPE = {codec.content_type: codec for codec in _CODECS.values()}
+_instances: Dict[str, Codec] = {}
+
+
+def get_codec(name: str) -> Codec:
+    if name not in _CODECS:
+        raise ValueError(f"Unknown message codec: {name}")
+    if name not in _instances:
+        _instances[name] = _CODECS[name]()
+    return _instances[name]
+
+
+def decode_message(body: bytes, content_type: Optional[str], data_class):
+    """Decode with the codec named by the content type; messages without one are JSON."""
+    codec_class = _BY_CONTENT_TYPE.get(content_type or JSON_CONTENT_TYPE)
+    if codec_class is None:
+        raise ValueError(f"Unsupported content type: {content_type}")
+    return get_codec(codec_class.name).decode(body, data_class)
@@ -16,6 +16,8 @@ class CloudProviderConfigMessage:
     connection_ip: str
     server_certification: str
     delete: bool
+    # Relative share of frames when several cloud providers are active
+    weight: float = 1.0
 
 @dataclass
 class SuspicionConfigMessage:
@@ -0,0 +1,74 @@
+"""
+Round-trip cost of the RabbitMQ inference RPC with a no-op model, so only the
+broker path is measured, one request at a time and pipelined. Defaults to the
+in-process broker; pass an AMQP URL to measure a real one.
+
+    python -m rabbitMQ.examples.broker_benchmark [requests] [url]
+"""
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from detection.dto.detection_types import Detection, DetectionResult
+from detection.model.cloud_model.consumer.cloud_model_consumer import CloudModelConsumer
+from detection.model.cloud_model.producer.cloud_model_producer import CloudModelProducer
+from detection.model.detection_service import DetectionService
+
+MODEL_NAME = "benchmark"
+FRAME = bytes(40_000)  # about one 640x480 JPEG
+WINDOW = 8
+
+
+class NoopDetectionService(DetectionService):
+    def __init__(self):
+        super().__init__(model_path=None)
+
+    def load_model(self, model_path=None):
+        return None
+
+    def detect(self, frame) -> DetectionResult:
+        return DetectionResult(detections=[Detection(0, "person", 0.9, [10.0, 20.0, 110.0, 220.0])])
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    url = sys.argv[2] if len(sys.argv) > 2 else "memory://benchmark/"
+
+    consumer = CloudModelConsumer(None, None, None, None, NoopDetectionService(), MODEL_NAME, amqp_url=url)
+    consumer.connect()
+    threading.Thread(target=consumer.start, daemon=True).start()
+
+    producer = CloudModelProducer(None, None, None, None, MODEL_NAME, amqp_url=url, window=WINDOW)
+    for window in (1, WINDOW):
+        report(url, window, *run(producer, requests, window))
+    producer.close()
+
+
+def run(producer, requests, window):
+    """`requests` round trips with at most `window` outstanding; returns (elapsed, latencies)."""
+    latencies = []
+    outstanding = deque()
+    started = time.perf_counter()
+    for _ in range(requests):
+        if len(outstanding) >= window:
+            sent, future = outstanding.popleft()
+            future.result()
+            latencies.append(time.perf_counter() - sent)
+        outstanding.append((time.perf_counter(), producer.submit(FRAME, timeout=5)))
+    for sent, future in outstanding:
+        future.result()
+        latencies.append(time.perf_counter() - sent)
+    return time.perf_counter() - started, latencies
+
+
+def report(url, window, elapsed, latencies):
+    p50, p99 = np.percentile(np.asarray(latencies) * 1e6, [50, 99])
+    print(f"{url} window={window}: {len(latencies)} requests, {len(latencies) / elapsed:.0f} req/s, "
+          f"p50 {p50:.0f} us, p99 {p99:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
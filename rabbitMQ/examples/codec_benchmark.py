@@ -0,0 +1,51 @@
+"""
+Encode/decode cost and body size of every DTO under every message codec.
+
+    python -m rabbitMQ.examples.codec_benchmark [iterations]
+"""
+import sys
+import timeit
+
+from rabbitMQ.dtos.codec import get_codec
+from rabbitMQ.dtos.dto import (CloudProviderConfigMessage, RecordingStatusMessage, ResponseMessage,
+                               SuspicionConfigMessage, SuspicionFrameMessage)
+
+SAMPLES = [
+    SuspicionFrameMessage(suspicion_score=63.25),
+    RecordingStatusMessage(recording=True),
+    ResponseMessage(success=True, message="Added provider cloud-a", related_to="cloud"),
+    SuspicionConfigMessage(threshold=75, class_weights={"person": 1.6, "car": 1.0}),
+    CloudProviderConfigMessage(provider_name="cloud-a", connection_ip="10.0.0.5:50051",
+                               server_certification="MIIB" * 64, delete=False),
+]
+
+
+def available_codecs():
+    codecs = []
+    for name in ("json", "struct", "msgpack"):
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name}: not installed, skipped")
+    return codecs
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    codecs = available_codecs()
+    print(f"{'message':<28} {'codec':<8} {'bytes':>6} {'encode us':>10} {'decode us':>10}")
+    for sample in SAMPLES:
+        data_class = type(sample)
+        for codec in codecs:
+            if not codec.supports(data_class):
+                continue
+            body = codec.encode(sample)
+            assert codec.decode(body, data_class) == sample
+            encode = timeit.timeit(lambda: codec.encode(sample), number=iterations) / iterations
+            decode = timeit.timeit(lambda: codec.decode(body, data_class), number=iterations) / iterations
+            print(f"{data_class.__name__:<28} {codec.name:<8} {len(body):>6} "
+                  f"{encode * 1e6:>10.2f} {decode * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
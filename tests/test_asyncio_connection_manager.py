@@ -0,0 +1,66 @@
+import asyncio
+
+from rabbitMQ.consumer.asyncio_connection_manager import ConnectionManager, Consumer, Producer
+from rabbitMQ.consumer.memory_broker import MemoryBroker
+from rabbitMQ.dtos.dto import SuspicionFrameMessage
+
+
+async def wait_until(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.005)
+
+
+class TestAsyncioConnectionManager:
+    """Test cases for the event-loop AMQP connection manager over the memory:// broker."""
+
+    def test_round_trip_on_one_loop(self):
+        """Test that published messages reach a consumer's event queue without leaving the loop."""
+        async def scenario():
+            events = asyncio.Queue()
+            manager = ConnectionManager("memory://asyncio-round-trip/")
+            producer = Producer("scores", codec="struct")
+            consumer = Consumer("scores", events, SuspicionFrameMessage)
+            manager.add_producer(producer)
+            manager.add_consumer(consumer)
+            manager.run_in_background()
+            try:
+                sent = [producer.publish(SuspicionFrameMessage(suspicion_score=float(i))) for i in range(3)]
+                received = [await asyncio.wait_for(events.get(), 2) for _ in range(3)]
+                return await asyncio.gather(*sent), received
+            finally:
+                await manager.stop()
+
+        try:
+            sent, received = asyncio.run(scenario())
+        finally:
+            MemoryBroker.reset()
+        assert sent == [True, True, True]
+        assert [message.suspicion_score for message in received] == [0.0, 1.0, 2.0]
+
+    def test_reconnects_after_connection_loss(self):
+        """Test that a lost connection is reopened and publishing resumes."""
+        async def scenario():
+            events = asyncio.Queue()
+            manager = ConnectionManager("memory://asyncio-reconnect/", initial_backoff=0.01)
+            producer = Producer("scores")
+            manager.add_producer(producer)
+            manager.add_consumer(Consumer("scores", events, SuspicionFrameMessage))
+            manager.run_in_background()
+            try:
+                await wait_until(manager.is_ready)
+                first = manager.connection
+                first.close()
+                await wait_until(lambda: manager.connection is not first and manager.is_ready())
+                producer.publish(SuspicionFrameMessage(suspicion_score=5.0))
+                return await asyncio.wait_for(events.get(), 2)
+            finally:
+                await manager.stop()
+
+        try:
+            message = asyncio.run(scenario())
+        finally:
+            MemoryBroker.reset()
+        assert message.suspicion_score == 5.0
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from gRPC.batch_scheduler import BatchScheduler
+
+
+class RecordingModel:
+    """Echoes frames back and records batch sizes; frames equal to "bad" make the batch raise."""
+
+    def __init__(self, delay=0.0, short=False):
+        self.batches = []
+        self.delay = delay
+        self.short = short
+
+    async def detect_batch(self, frames):
+        self.batches.append(list(frames))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if "bad" in frames:
+            raise ValueError("undecodable frame")
+        results = [f"result-{frame}" for frame in frames]
+        return results[:-1] if self.short and len(frames) > 1 else results
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestBatchScheduler:
+    """Test cases for BatchScheduler dispatch and failure handling."""
+
+    def test_full_batch_dispatches_without_waiting(self):
+        """Test that a batch goes out as soon as max_batch_size frames are queued."""
+        model = RecordingModel()
+
+        async def scenario():
+            scheduler = BatchScheduler(model.detect_batch, max_batch_size=4, max_wait_ms=10_000)
+            started = time.monotonic()
+            results = await asyncio.gather(*(scheduler.submit(i) for i in range(4)))
+            elapsed = time.monotonic() - started
+            await scheduler.stop()
+            return results, elapsed
+
+        results, elapsed = run(scenario())
+        assert results == [f"result-{i}" for i in range(4)]
+        assert model.batches == [[0, 1, 2, 3]]
+        assert elapsed < 1
+
+    def test_partial_batch_dispatches_after_max_wait(self):
+        """Test that a lone frame is dispatched once max_wait_ms has passed."""
+        model = RecordingModel()
+
+        async def scenario():
+            scheduler = BatchScheduler(model.detect_batch, max_batch_size=8, max_wait_ms=50)
+            started = time.monotonic()
+            result = await scheduler.submit("a")
+            elapsed = time.monotonic() - started
+            await scheduler.stop()
+            return result, elapsed
+
+        result, elapsed = run(scenario())
+        assert result == "result-a"
+        assert model.batches == [["a"]]
+        assert 0.04 <= elapsed < 1
+
+    def test_bad_frame_fails_only_its_own_request(self):
+        """Test that a frame that breaks the batch does not fail the other streams' frames."""
+        model = RecordingModel()
+
+        async def scenario():
+            scheduler = BatchScheduler(model.detect_batch, max_batch_size=3, max_wait_ms=1000)
+            results = await asyncio.gather(scheduler.submit("a"), scheduler.submit("bad"),
+                                           scheduler.submit("c"), return_exceptions=True)
+            await scheduler.stop()
+            return results
+
+        good_a, bad, good_c = run(scenario())
+        assert good_a == "result-a"
+        assert good_c == "result-c"
+        assert isinstance(bad, ValueError)
+        assert model.batches[0] == ["a", "bad", "c"]
+
+    def test_short_result_list_does_not_hang_streams(self):
+        """Test that every future resolves when detect_batch returns fewer results than frames."""
+        model = RecordingModel(short=True)
+
+        async def scenario():
+            scheduler = BatchScheduler(model.detect_batch, max_batch_size=3, max_wait_ms=1000)
+            results = await asyncio.wait_for(
+                asyncio.gather(*(scheduler.submit(i) for i in range(3))), timeout=2)
+            await scheduler.stop()
+            return results
+
+        assert run(scenario()) == ["result-0", "result-1", "result-2"]
+
+    def test_sync_detect_batch_runs_in_executor(self):
+        """Test that a plain function is supported as detect_batch."""
+        async def scenario():
+            scheduler = BatchScheduler(lambda frames: [frame * 2 for frame in frames],
+                                       max_batch_size=2, max_wait_ms=10)
+            results = await asyncio.gather(scheduler.submit(1), scheduler.submit(2))
+            await scheduler.stop()
+            return results
+
+        assert run(scenario()) == [2, 4]
+
+    def test_failure_releases_batch_slot(self):
+        """Test that a failed single-frame batch does not hold the batch slot."""
+        model = RecordingModel()
+
+        async def scenario():
+            scheduler = BatchScheduler(model.detect_batch, max_batch_size=1, max_wait_ms=1)
+            with pytest.raises(ValueError):
+                await scheduler.submit("bad")
+            result = await asyncio.wait_for(scheduler.submit("ok"), timeout=2)
+            await scheduler.stop()
+            return result
+
+        assert run(scenario()) == "result-ok"
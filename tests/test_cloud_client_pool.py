@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+from gRPC.cloud_client_pool import WEIGHTED_ROUND_ROBIN, CloudClientPool
+
+
+class FakeClient:
+    """Stands in for CloudClient; answers with `result` or raises when `fail` is set."""
+
+    def __init__(self, name, fail=False, overloaded=False):
+        self.name = name
+        self.fail = fail
+        self.overloaded = overloaded
+        self.requests = 0
+        self.cleared = 0
+        self.connected = asyncio.Event()
+        self.connected.set()
+
+    async def request(self, frame, frame_id, timeout=1, encoded_frame=None, rois=None):
+        self.requests += 1
+        if self.fail:
+            raise Exception(f"{self.name} unreachable")
+        return f"{self.name}-{frame_id}"
+
+    def stats(self):
+        return {}
+
+    async def clear_queue(self):
+        self.cleared += 1
+
+    async def stop(self):
+        self.connected.clear()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def send(pool, count):
+    """Sends `count` frames, returning the answers and counting failures."""
+    answers, failures = [], 0
+    for frame_id in range(count):
+        try:
+            answers.append(await pool.request(None, frame_id))
+        except Exception:
+            failures += 1
+    return answers, failures
+
+
+class TestCloudClientPool:
+    """Test cases for CloudClientPool balancing, ejection and re-admission."""
+
+    def test_failing_member_is_ejected(self):
+        """Test that a member failing failure_threshold requests in a row stops getting frames."""
+        async def scenario():
+            pool = CloudClientPool(failure_threshold=2, ejection_seconds=60)
+            good, bad = FakeClient("good"), FakeClient("bad", fail=True)
+            pool.add("good", good)
+            pool.add("bad", bad)
+            await send(pool, 4)
+            requests_at_ejection = bad.requests
+            answers, failures = await send(pool, 10)
+            return pool, bad, requests_at_ejection, answers, failures
+
+        pool, bad, requests_at_ejection, answers, failures = run(scenario())
+        assert requests_at_ejection == 2
+        assert bad.requests == 2
+        assert failures == 0
+        assert all(answer.startswith("good") for answer in answers)
+        assert not pool.stats()["bad"]["available"]
+        assert pool.stats()["bad"]["ejections"] == 1
+
+    def test_failure_clears_only_the_failing_member(self):
+        """Test that a failed request drops the frames queued on its member and no other's."""
+        async def scenario():
+            pool = CloudClientPool(failure_threshold=5)
+            good, bad = FakeClient("good"), FakeClient("bad", fail=True)
+            pool.add("good", good)
+            pool.add("bad", bad)
+            await send(pool, 4)
+            return good, bad
+
+        good, bad = run(scenario())
+        assert bad.cleared == bad.requests == 2
+        assert good.cleared == 0
+
+    def test_ejected_member_is_readmitted_after_backoff(self):
+        """Test that an ejected member gets traffic again once its ejection passes and succeeds."""
+        async def scenario():
+            pool = CloudClientPool(failure_threshold=1, ejection_seconds=0.05)
+            flaky = FakeClient("flaky", fail=True)
+            pool.add("flaky", flaky)
+            _, failures = await send(pool, 1)
+            with pytest.raises(Exception):
+                await pool.request(None, 1)
+            flaky.fail = False
+            await asyncio.sleep(0.06)
+            answers, _ = await send(pool, 1)
+            return pool, failures, answers
+
+        pool, failures, answers = run(scenario())
+        assert failures == 1
+        assert answers == ["flaky-0"]
+        assert pool.members["flaky"].ejections == 0
+        assert pool.stats()["flaky"]["available"]
+
+    def test_ejection_backoff_grows(self):
+        """Test that repeated ejections double the ejection period up to the maximum."""
+        async def scenario():
+            pool = CloudClientPool(failure_threshold=1, ejection_seconds=10, max_ejection_seconds=25)
+            pool.add("bad", FakeClient("bad", fail=True))
+            member = pool.members["bad"]
+            periods = []
+            for _ in range(3):
+                member.ejected_until = 0.0
+                await send(pool, 1)
+                periods.append(member.ejected_until - time.monotonic())
+            return periods
+
+        periods = run(scenario())
+        assert periods == [pytest.approx(10, abs=0.5), pytest.approx(20, abs=0.5), pytest.approx(25, abs=0.5)]
+
+    def test_overloaded_member_is_skipped(self):
+        """Test that members reporting overload are skipped while another has headroom."""
+        async def scenario():
+            pool = CloudClientPool()
+            busy, idle = FakeClient("busy", overloaded=True), FakeClient("idle")
+            pool.add("busy", busy)
+            pool.add("idle", idle)
+            await send(pool, 6)
+            return pool, busy, idle
+
+        pool, busy, idle = run(scenario())
+        assert busy.requests == 0
+        assert idle.requests == 6
+        assert not pool.overloaded
+
+    def test_weighted_round_robin_follows_weights(self):
+        """Test that weighted round robin splits frames by weight."""
+        async def scenario():
+            pool = CloudClientPool(strategy=WEIGHTED_ROUND_ROBIN)
+            heavy, light = FakeClient("heavy"), FakeClient("light")
+            pool.add("heavy", heavy, weight=3)
+            pool.add("light", light, weight=1)
+            await send(pool, 8)
+            return heavy, light
+
+        heavy, light = run(scenario())
+        assert (heavy.requests, light.requests) == (6, 2)
@@ -0,0 +1,230 @@
+import logging
+import time
+from types import SimpleNamespace
+
+import pika
+
+from detection.dto.detection_types import DetectionResult
+from detection.model.cloud_model import DEADLINE_BUDGET_HEADER, DEADLINE_HEADER
+from detection.model.cloud_model.consumer import cloud_model_consumer
+from detection.model.cloud_model.consumer.cloud_model_consumer import CloudModelConsumer
+from detection.model.detection_service import DetectionService
+
+
+class EmptyDetectionService(DetectionService):
+    def __init__(self):
+        super().__init__(model_path=None)
+        self.frames = []
+
+    def load_model(self, model_path=None):
+        return None
+
+    def detect(self, frame) -> DetectionResult:
+        self.frames.append(frame)
+        return DetectionResult(detections=[])
+
+
+class BatchService(EmptyDetectionService):
+    """Records each detect_batch call; b"bad" frames fail, and `short` drops a result from batches."""
+
+    def __init__(self, short=False):
+        super().__init__()
+        self.batches = []
+        self.short = short
+
+    def detect(self, frame) -> DetectionResult:
+        if frame == b"bad":
+            raise ValueError("undecodable frame")
+        return super().detect(frame)
+
+    def detect_batch(self, frames):
+        self.batches.append(list(frames))
+        results = super().detect_batch(frames)
+        return results[:-1] if self.short and len(results) > 1 else results
+
+
+class FakeChannel:
+    def __init__(self, fail_for=()):
+        self.acked = []
+        self.nacked = []
+        self.published = []
+        self.fail_for = fail_for
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked.append(delivery_tag)
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.nacked.append((delivery_tag, multiple, requeue))
+
+    def basic_publish(self, exchange, routing_key, properties, body):
+        if properties.correlation_id in self.fail_for:
+            raise ConnectionError("publish failed")
+        self.published.append(properties.correlation_id)
+
+
+class FakeConnection:
+    """Holds the flush timer so tests fire it by hand."""
+
+    def __init__(self):
+        self.timer = None
+
+    def call_later(self, delay, callback):
+        self.timer = callback
+        return callback
+
+    def remove_timeout(self, timer):
+        self.timer = None
+
+
+def make_consumer(service=None, max_batch_size=1, **kwargs):
+    service = service or EmptyDetectionService()
+    consumer = CloudModelConsumer(None, None, None, None, service, "test", max_batch_size=max_batch_size, **kwargs)
+    consumer.connection = FakeConnection()
+    consumer.consume_channel = FakeChannel()
+    consumer.produce_channel = FakeChannel()
+    return consumer, service
+
+
+def deliver(consumer, tag, headers, body=b"frame"):
+    properties = pika.BasicProperties(reply_to="replies", correlation_id=str(tag), headers=headers)
+    consumer.on_message(None, SimpleNamespace(delivery_tag=tag), properties, body)
+
+
+class TestCloudModelConsumerBatching:
+    """Test cases for micro-batched inference and per-task replies."""
+
+    def test_full_batch_is_one_inference_and_one_ack(self):
+        """Test that max_batch_size tasks run in one detect_batch call and are acked together."""
+        consumer, service = make_consumer(BatchService(), max_batch_size=3)
+        for tag in (1, 2, 3):
+            deliver(consumer, tag, None)
+        assert len(service.batches) == 1
+        assert consumer.produce_channel.published == ["1", "2", "3"]
+        assert consumer.consume_channel.acked == [3]
+        assert consumer.stats() == {"batches": 1, "frames": 3, "avg_batch": 3.0, "stale": 0}
+
+    def test_partial_batch_runs_when_the_wait_ends(self):
+        """Test that fewer than max_batch_size tasks run once max_wait_ms passes."""
+        consumer, service = make_consumer(BatchService(), max_batch_size=4)
+        deliver(consumer, 1, None)
+        deliver(consumer, 2, None)
+        assert service.batches == []
+        consumer.connection.timer()
+        assert service.batches == [[b"frame", b"frame"]]
+        assert consumer.consume_channel.acked == [2]
+
+    def test_bad_frame_fails_only_its_task(self):
+        """Test that a failed batch is retried task by task and only the failing task is rejected."""
+        consumer, service = make_consumer(BatchService(), max_batch_size=3)
+        for tag, body in ((1, b"ok"), (2, b"bad"), (3, b"ok")):
+            deliver(consumer, tag, None, body)
+        assert consumer.produce_channel.published == ["1", "3"]
+        assert consumer.consume_channel.nacked == [(2, False, False)]
+        assert consumer.consume_channel.acked == [3]
+        assert consumer.stats()["frames"] == 2
+
+    def test_missing_result_is_not_paired_with_the_wrong_task(self):
+        """Test that a batch answered with too few results is retried task by task."""
+        consumer, service = make_consumer(BatchService(short=True), max_batch_size=2)
+        deliver(consumer, 1, None)
+        deliver(consumer, 2, None)
+        assert [len(batch) for batch in service.batches] == [2, 1, 1]
+        assert consumer.produce_channel.published == ["1", "2"]
+        assert consumer.consume_channel.nacked == []
+
+    def test_failed_reply_rejects_only_its_task(self):
+        """Test that a publish error part way through still settles every task of the batch."""
+        consumer, service = make_consumer(BatchService(), max_batch_size=3)
+        consumer.produce_channel.fail_for = ("2",)
+        for tag in (1, 2, 3):
+            deliver(consumer, tag, None)
+        assert consumer.produce_channel.published == ["1", "3"]
+        assert consumer.consume_channel.nacked == [(2, False, False)]
+        assert consumer.consume_channel.acked == [3]
+
+
+class TestCloudModelConsumerDeadlines:
+    """Test cases for dropping tasks past their deadline."""
+
+    def test_budget_is_counted_from_delivery(self):
+        """Test that a relative budget keeps a task fresh regardless of the wall clock."""
+        consumer, service = make_consumer()
+        deliver(consumer, 1, {DEADLINE_BUDGET_HEADER: 50})
+        assert service.frames == [b"frame"]
+        assert consumer.produce_channel.published == ["1"]
+        assert consumer.stats()["stale"] == 0
+
+    def test_expired_budget_is_dropped_before_inference(self):
+        """Test that a task whose budget ran out while batched is acked without inference."""
+        consumer, service = make_consumer()
+        consumer.max_batch_size = 2
+        consumer.connection = SimpleNamespace(call_later=lambda delay, callback: object(), remove_timeout=lambda timer: None)
+        deliver(consumer, 1, {DEADLINE_BUDGET_HEADER: 1})
+        time.sleep(0.01)
+        consumer._flush()
+        assert service.frames == []
+        assert consumer.consume_channel.acked == [1]
+        assert consumer.stats()["stale"] == 1
+
+    def test_absolute_deadline_allows_clock_skew(self):
+        """Test that an x-deadline slightly in the past is within the skew tolerance."""
+        consumer, service = make_consumer(clock_skew_ms=500)
+        deliver(consumer, 1, {DEADLINE_HEADER: int(time.time() * 1000) - 200})
+        deliver(consumer, 2, {DEADLINE_HEADER: int(time.time() * 1000) - 1000})
+        assert consumer.produce_channel.published == ["1"]
+        assert consumer.consume_channel.acked == [1, 2]
+        assert consumer.stats()["stale"] == 1
+
+    def test_absolute_deadline_is_ignored_without_clock_skew(self):
+        """Test that x-deadline is not trusted unless the clocks are declared synced."""
+        consumer, service = make_consumer()
+        deliver(consumer, 1, {DEADLINE_BUDGET_HEADER: 50, DEADLINE_HEADER: int(time.time() * 1000) - 60_000})
+        assert consumer.produce_channel.published == ["1"]
+
+    def test_earlier_of_budget_and_absolute_deadline_applies(self):
+        """Test that with synced clocks a passed x-deadline drops a task whose budget looks fresh."""
+        consumer, service = make_consumer(clock_skew_ms=0)
+        deliver(consumer, 1, {DEADLINE_BUDGET_HEADER: 50, DEADLINE_HEADER: int(time.time() * 1000) - 100})
+        assert service.frames == []
+        assert consumer.stats()["stale"] == 1
+
+    def test_stale_delivery_behind_a_pending_batch_is_acked_with_it(self):
+        """Test that a task stale on delivery is dropped, and acked only once the older tasks are."""
+        consumer, service = make_consumer(BatchService(), max_batch_size=3, clock_skew_ms=0)
+        deliver(consumer, 1, None)
+        deliver(consumer, 2, {DEADLINE_HEADER: int(time.time() * 1000) - 1000})
+        assert consumer.consume_channel.acked == []
+        consumer.connection.timer()
+        assert service.batches == [[b"frame"]]
+        assert consumer.produce_channel.published == ["1"]
+        assert consumer.consume_channel.acked == [2]
+        assert consumer.stats()["stale"] == 1
+
+    def test_tasks_without_deadline_never_go_stale(self):
+        """Test that tasks from producers that send no deadline are always run."""
+        consumer, service = make_consumer()
+        deliver(consumer, 1, None)
+        assert consumer.produce_channel.published == ["1"]
+
+    def test_task_without_deadline_is_kept_when_its_batch_mates_expire(self):
+        """Test that the check before inference drops expired tasks but never one without a deadline."""
+        consumer, service = make_consumer(BatchService(), max_batch_size=3)
+        deliver(consumer, 1, {DEADLINE_BUDGET_HEADER: 1})
+        deliver(consumer, 2, None, b"no deadline")
+        time.sleep(0.01)
+        consumer.connection.timer()
+        assert service.batches == [[b"no deadline"]]
+        assert consumer.produce_channel.published == ["2"]
+        assert consumer.consume_channel.acked == [2]
+        assert consumer.stats()["stale"] == 1
+
+    def test_high_stale_rate_logs_a_warning(self, caplog):
+        """Test that a window of mostly stale tasks logs one warning."""
+        consumer, service = make_consumer(clock_skew_ms=0)
+        stale = {DEADLINE_HEADER: int(time.time() * 1000) - 60_000}
+        with caplog.at_level(logging.WARNING, logger=cloud_model_consumer.logger.name):
+            for tag in range(1, cloud_model_consumer.STALE_WINDOW + 2):
+                deliver(consumer, tag, stale)
+        warnings = [record for record in caplog.records if "past their deadline" in record.message]
+        assert len(warnings) == 1
+        assert consumer.stats()["stale"] == cloud_model_consumer.STALE_WINDOW + 1
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pika
+import pytest
+
+from detection.model.cloud_model import DEADLINE_BUDGET_HEADER, DEADLINE_HEADER
+from detection.model.cloud_model.producer.cloud_model_producer import CloudModelProducer
+from rabbitMQ.consumer.memory_broker import MemoryBroker, blocking_connection
+
+MODEL_NAME = "test"
+TASK_QUEUE = f"{MODEL_NAME}-suspicion-task"
+
+
+class HeldWorker:
+    """Takes tasks off the task queue and answers only when told to."""
+
+    def __init__(self, url):
+        self.connection = blocking_connection(url)
+        self.channel = self.connection.channel()
+        self.channel.queue_declare(queue=TASK_QUEUE, durable=True)
+        self.channel.basic_consume(queue=TASK_QUEUE, on_message_callback=self._on_task, auto_ack=True)
+        self.tasks = []
+        self.thread = threading.Thread(target=self.channel.start_consuming, daemon=True)
+        self.thread.start()
+
+    def _on_task(self, ch, method, properties, body):
+        self.tasks.append((properties, body))
+
+    def wait_for_tasks(self, count, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while len(self.tasks) < count:
+            assert time.monotonic() < deadline, f"{len(self.tasks)} of {count} tasks arrived"
+            time.sleep(0.005)
+
+    def reply(self, index, body):
+        properties, _ = self.tasks[index]
+        self.channel.basic_publish(exchange="", routing_key=properties.reply_to, body=body,
+                                   properties=pika.BasicProperties(correlation_id=properties.correlation_id))
+
+    def stop(self):
+        self.connection.add_callback_threadsafe(self.channel.stop_consuming)
+        self.thread.join(timeout=2)
+
+
+@pytest.fixture
+def rpc(request):
+    """A producer and a held worker on a fresh memory:// broker; yields a factory."""
+    url = f"memory://{request.node.name}/"
+    started = []
+
+    def start(**producer_kwargs):
+        worker = HeldWorker(url)
+        producer = CloudModelProducer(None, None, None, None, MODEL_NAME, amqp_url=url, **producer_kwargs)
+        started.append((producer, worker))
+        return producer, worker
+
+    yield start
+    for producer, worker in started:
+        producer.close()
+        worker.stop()
+    MemoryBroker.reset()
+
+
+class TestCloudModelProducer:
+    """Test cases for pipelined requests, deadlines and late replies."""
+
+    def test_out_of_order_replies_resolve_their_own_requests(self, rpc):
+        """Test that several outstanding requests are matched to replies by correlation id."""
+        producer, worker = rpc(window=4)
+        futures = [producer.submit(f"frame-{i}".encode(), timeout=2) for i in range(4)]
+        worker.wait_for_tasks(4)
+        for index in reversed(range(4)):
+            worker.reply(index, b"result-" + worker.tasks[index][1])
+        assert [future.result(timeout=2) for future in futures] == [f"result-frame-{i}".encode() for i in range(4)]
+        assert producer.stats() == {"in_flight": 0, "completed": 4, "timed_out": 0, "late": 0}
+
+    def test_full_window_times_out_new_requests(self, rpc):
+        """Test that submit waits for a free slot only as long as the request's timeout."""
+        producer, worker = rpc(window=1)
+        first = producer.submit(b"first", timeout=2)
+        with pytest.raises(TimeoutError):
+            producer.submit(b"second", timeout=0.05)
+        worker.wait_for_tasks(1)
+        worker.reply(0, b"done")
+        assert first.result(timeout=2) == b"done"
+        assert producer.submit(b"third", timeout=2) is not None
+
+    def test_unanswered_request_times_out_and_late_reply_is_dropped(self, rpc):
+        """Test that a request fails at its deadline, frees its slot and ignores a later reply."""
+        producer, worker = rpc(window=1)
+        future = producer.submit(b"frame", timeout=0.05)
+        with pytest.raises(TimeoutError):
+            future.result(timeout=2)
+        worker.wait_for_tasks(1)
+        worker.reply(0, b"too late")
+        deadline = time.monotonic() + 2
+        while producer.stats()["late"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert producer.stats() == {"in_flight": 0, "completed": 0, "timed_out": 1, "late": 1}
+        # The slot came back, so the window is not stuck
+        assert producer.submit(b"next", timeout=0.05) is not None
+
+    def test_task_carries_its_remaining_budget(self, rpc):
+        """Test that tasks carry the rest of their timeout as expiration and deadline headers."""
+        producer, worker = rpc()
+        before = int(time.time() * 1000)
+        producer.submit(b"frame", timeout=1)
+        worker.wait_for_tasks(1)
+        properties, _ = worker.tasks[0]
+        budget = properties.headers[DEADLINE_BUDGET_HEADER]
+        assert 0 < budget <= 1000
+        assert int(properties.expiration) == budget
+        assert before + budget <= properties.headers[DEADLINE_HEADER] <= int(time.time() * 1000) + 1000
@@ -0,0 +1,117 @@
+import asyncio
+import gc
+
+import grpc
+
+from detection.dto.detection_types import Detection, DetectionResult
+from gRPC.CloudRoute_pb2 import DetectionRequest
+from gRPC.cloud_route_service import CloudRouteService
+
+
+class EchoModel:
+    """Answers every frame with one detection."""
+
+    def __init__(self):
+        self.frames = 0
+        self.batches = []
+
+    async def detect_batch(self, frames):
+        self.frames += len(frames)
+        self.batches.append(len(frames))
+        return [DetectionResult(detections=[Detection(0, "person", 0.9, [0.0, 0.0, 10.0, 10.0])]) for _ in frames]
+
+
+class FakeContext:
+    def peer(self):
+        return "ipv4:127.0.0.1:1"
+
+
+async def requests_then_hang(count):
+    """
+    Yields `count` requests, then waits for more; cancelling the wait fails the
+    read with AioRpcError, as grpc does when the call is torn down.
+    """
+    for frame_id in range(count):
+        yield DetectionRequest(frame=b"frame", width=640, height=480, frame_id=frame_id)
+    try:
+        await asyncio.Event().wait()
+    except asyncio.CancelledError:
+        raise grpc.aio.AioRpcError(grpc.StatusCode.CANCELLED, grpc.aio.Metadata(), grpc.aio.Metadata(),
+                                   details="call cancelled")
+
+
+class CountingRequests:
+    """Yields `count` requests, counting how many the service has read."""
+
+    def __init__(self, count):
+        self.count = count
+        self.read = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.read == self.count:
+            raise StopAsyncIteration
+        self.read += 1
+        return DetectionRequest(frame=b"frame", width=640, height=480, frame_id=self.read)
+
+
+class TestCloudRoute:
+    """Test cases for the unary CloudRoute call."""
+
+    def test_concurrent_calls_share_a_batch(self):
+        """Test that unary calls go through the batching queue instead of one model call each."""
+        async def scenario():
+            service = CloudRouteService(model, max_wait_ms=50)
+            requests = [DetectionRequest(frame=b"frame", width=640, height=480, frame_id=i) for i in range(4)]
+            return await asyncio.gather(*(service.CloudRoute(request, FakeContext()) for request in requests))
+
+        model = EchoModel()
+        results = asyncio.run(scenario())
+        assert [result.frame_id for result in results] == [0, 1, 2, 3]
+        assert all(result.detections[0].class_name == "person" for result in results)
+        assert model.batches == [4]
+
+
+class TestCloudRouteStream:
+    """Test cases for CloudRouteStream flow control and teardown."""
+
+    def test_slow_reader_stops_request_reading(self):
+        """Test that results the client has not taken yet count against the in-flight limit."""
+        async def scenario():
+            service = CloudRouteService(model, max_wait_ms=1, max_in_flight_per_stream=2)
+            stream = service.CloudRouteStream(requests, FakeContext())
+            await stream.__anext__()
+            # The client does not read for a while
+            await asyncio.sleep(0.1)
+            read_while_paused = requests.read
+            remaining = [result async for result in stream]
+            return read_while_paused, remaining
+
+        model, requests = EchoModel(), CountingRequests(20)
+        read_while_paused, remaining = asyncio.run(scenario())
+        # Two requests hold the slots; the reader waits with the third
+        assert read_while_paused == 3
+        assert len(remaining) == 19
+        assert model.frames == 20
+
+    def test_closed_stream_retrieves_reader_failure(self):
+        """Test that closing a stream collects the reader, leaving no 'Task exception was never retrieved'."""
+        errors = []
+
+        async def scenario():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            service = CloudRouteService(EchoModel(), max_wait_ms=1)
+            stream = service.CloudRouteStream(requests_then_hang(2), FakeContext())
+            first = await stream.__anext__()
+            await stream.aclose()
+            await asyncio.sleep(0.01)
+            gc.collect()
+            await asyncio.sleep(0)
+            return service, first
+
+        service, first = asyncio.run(scenario())
+        assert first.frame_id in (0, 1)
+        assert service.active_streams == 0
+        assert [context["message"] for context in errors] == []
@@ -0,0 +1,97 @@
+import struct
+
+import pytest
+
+from rabbitMQ.dtos.codec import (JSON_CONTENT_TYPE, STRUCT_CONTENT_TYPE, Codec, MsgpackCodec, StructCodec,
+                                 decode_message, get_codec)
+from rabbitMQ.dtos.dto import RecordingStatusMessage, ResponseMessage, SuspicionFrameMessage
+
+
+class TestStructCodec:
+    """Test cases for the fixed binary layout."""
+
+    def test_suspicion_frame_round_trip(self):
+        """Test that a suspicion score survives encoding at float32 precision."""
+        codec = StructCodec()
+        message = SuspicionFrameMessage(suspicion_score=42.5)
+        body = codec.encode(message)
+        assert len(body) == 5
+        assert codec.decode(body, SuspicionFrameMessage) == message
+
+    def test_float32_precision(self):
+        """Test that scores are stored as float32: rounded, within float32's relative precision."""
+        codec = StructCodec()
+        for score in (0.1, 33.3, 99.99):
+            decoded = codec.decode(codec.encode(SuspicionFrameMessage(suspicion_score=score)), SuspicionFrameMessage)
+            assert decoded.suspicion_score == struct.unpack("<f", struct.pack("<f", score))[0]
+            assert decoded.suspicion_score == pytest.approx(score, rel=2 ** -24)
+
+    def test_recording_status_round_trip(self):
+        """Test that single-field DTOs round trip."""
+        codec = StructCodec()
+        for recording in (True, False):
+            message = RecordingStatusMessage(recording=recording)
+            assert codec.decode(codec.encode(message), RecordingStatusMessage) == message
+
+    def test_wrong_type_byte_is_rejected(self):
+        """Test that a body of one DTO type is not decoded as another."""
+        codec = StructCodec()
+        body = struct.pack("<B?", 1, True)
+        with pytest.raises(ValueError):
+            codec.decode(body, RecordingStatusMessage)
+
+    def test_only_listed_types_are_supported(self):
+        """Test that DTOs without a layout are reported unsupported."""
+        codec = StructCodec()
+        assert codec.supports(SuspicionFrameMessage)
+        assert not codec.supports(ResponseMessage)
+
+
+class TestCodec:
+    """Test cases for the codec interface."""
+
+    def test_codec_must_implement_encode_and_decode(self):
+        """Test that a codec missing encode or decode cannot be instantiated."""
+        class EncodeOnly(Codec):
+            def encode(self, message_obj) -> bytes:
+                return b""
+
+        with pytest.raises(TypeError):
+            EncodeOnly()
+
+
+class TestMsgpackCodec:
+    """Test cases for the optional msgpack codec."""
+
+    def test_round_trip(self):
+        """Test that DTOs round trip through msgpack."""
+        pytest.importorskip("msgpack")
+        codec = MsgpackCodec()
+        for message in (SuspicionFrameMessage(suspicion_score=42.5),
+                        ResponseMessage(success=True, message="ok", related_to="cloud")):
+            assert codec.decode(codec.encode(message), type(message)) == message
+
+
+class TestDecodeMessage:
+    """Test cases for picking the decoder from the content type."""
+
+    def test_missing_content_type_is_json(self):
+        """Test that bodies from producers predating codecs decode as JSON."""
+        body = get_codec("json").encode(SuspicionFrameMessage(suspicion_score=7.0))
+        assert decode_message(body, None, SuspicionFrameMessage) == SuspicionFrameMessage(suspicion_score=7.0)
+        assert decode_message(body, JSON_CONTENT_TYPE, SuspicionFrameMessage).suspicion_score == 7.0
+
+    def test_struct_content_type(self):
+        """Test that struct bodies are decoded by content type."""
+        body = get_codec("struct").encode(RecordingStatusMessage(recording=True))
+        assert decode_message(body, STRUCT_CONTENT_TYPE, RecordingStatusMessage) == RecordingStatusMessage(True)
+
+    def test_unknown_content_type_is_rejected(self):
+        """Test that an unknown content type raises instead of guessing."""
+        with pytest.raises(ValueError):
+            decode_message(b"", "text/plain", SuspicionFrameMessage)
+
+    def test_unknown_codec_name_is_rejected(self):
+        """Test that asking for an unknown codec raises."""
+        with pytest.raises(ValueError):
+            get_codec("protobuf")
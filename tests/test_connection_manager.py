@@ -0,0 +1,168 @@
+from types import SimpleNamespace
+
+from rabbitMQ.consumer.connection_manager import Consumer, Producer
+from rabbitMQ.dtos.codec import JSON_CONTENT_TYPE, get_codec
+from rabbitMQ.dtos.dto import SuspicionFrameMessage
+
+
+class FakeIOLoop:
+    """Collects callbacks like pika's ioloop; a stopped loop accepts them silently and never runs them."""
+
+    def __init__(self):
+        self.callbacks = []
+        self.stopped = False
+
+    def add_callback_threadsafe(self, callback):
+        self.callbacks.append(callback)
+
+    def run(self):
+        while self.callbacks and not self.stopped:
+            self.callbacks.pop(0)()
+
+
+class FakeConnection:
+    def __init__(self):
+        self.ioloop = FakeIOLoop()
+
+
+class FakeChannel:
+    def __init__(self):
+        self.is_open = True
+        self.connection = FakeConnection()
+        self.published = []
+        self.acks = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append(body)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self.acks.append((delivery_tag, multiple))
+
+
+class FakeLoop:
+    """Records batches handed to the asyncio loop."""
+
+    def __init__(self):
+        self.calls = []
+
+    def call_soon_threadsafe(self, callback, *args):
+        self.calls.append(args)
+
+
+def publish(producer, count):
+    for i in range(count):
+        producer.publish(SuspicionFrameMessage(suspicion_score=float(i)))
+
+
+class TestProducer:
+    """Test cases for the threaded Producer's ioloop hand-off."""
+
+    def test_publish_drains_on_ioloop(self):
+        """Test that messages go out only when the ioloop runs, in one drain."""
+        producer = Producer("q")
+        connection, channel = FakeConnection(), FakeChannel()
+        producer.attach(connection, channel)
+
+        publish(producer, 3)
+        assert channel.published == []
+        assert len(connection.ioloop.callbacks) == 1
+
+        connection.ioloop.run()
+        assert len(channel.published) == 3
+        assert producer.published == 3
+
+    def test_publish_while_detached_goes_out_on_reconnect(self):
+        """Test that messages published between close and reconnect are sent on the new connection."""
+        producer = Producer("q")
+        old = FakeConnection()
+        producer.attach(old, FakeChannel())
+        old.ioloop.stopped = True
+        producer.detach()
+
+        publish(producer, 6)
+
+        new, channel = FakeConnection(), FakeChannel()
+        producer.attach(new, channel)
+        new.ioloop.run()
+        assert len(channel.published) == 6
+
+    def test_drain_lost_on_stopped_ioloop_does_not_block_reconnect(self):
+        """Test that a wakeup swallowed by a dead ioloop does not stall the producer."""
+        producer = Producer("q")
+        old = FakeConnection()
+        producer.attach(old, FakeChannel())
+        # The loop has stopped but the close callback has not run yet
+        old.ioloop.stopped = True
+        publish(producer, 2)
+        producer.detach()
+        publish(producer, 4)
+
+        new, channel = FakeConnection(), FakeChannel()
+        producer.attach(new, channel)
+        new.ioloop.run()
+        assert len(channel.published) == 6
+
+        # A late run of the old loop's drain must not disturb the new connection
+        old.ioloop.stopped = False
+        old.ioloop.run()
+        publish(producer, 1)
+        new.ioloop.run()
+        assert len(channel.published) == 7
+
+    def test_backlog_beyond_max_pending_drops_oldest(self):
+        """Test that the backlog is bounded while the channel is down."""
+        producer = Producer("q", max_pending=4)
+        producer.attach(FakeConnection(), FakeChannel())
+        producer.detach()
+
+        publish(producer, 6)
+        assert producer.dropped == 2
+
+        new, channel = FakeConnection(), FakeChannel()
+        producer.attach(new, channel)
+        new.ioloop.run()
+        assert len(channel.published) == 4
+
+
+def deliver(consumer, channel, tags, body=None):
+    body = body if body is not None else get_codec("json").encode(SuspicionFrameMessage(suspicion_score=1.0))
+    for tag in tags:
+        consumer.on_message(channel, SimpleNamespace(delivery_tag=tag),
+                            SimpleNamespace(content_type=JSON_CONTENT_TYPE), body)
+
+
+class TestConsumer:
+    """Test cases for the Consumer's batched hand-off and acks."""
+
+    def make_consumer(self, **kwargs):
+        consumer = Consumer("q", None, SuspicionFrameMessage, **kwargs)
+        consumer.asyncio_loop = FakeLoop()
+        channel = FakeChannel()
+        consumer.attach(channel)
+        return consumer, channel
+
+    def test_one_pass_is_one_hand_off_and_one_ack(self):
+        """Test that deliveries of one ioloop pass are handed off and acked together."""
+        consumer, channel = self.make_consumer()
+        deliver(consumer, channel, range(1, 6))
+        assert channel.acks == []
+        channel.connection.ioloop.run()
+        assert channel.acks == [(5, True)]
+        assert [len(batch) for (batch,) in consumer.asyncio_loop.calls] == [5]
+
+    def test_ack_batch_flushes_early(self):
+        """Test that reaching ack_batch flushes without waiting for the end of the pass."""
+        consumer, channel = self.make_consumer(ack_batch=3)
+        deliver(consumer, channel, range(1, 5))
+        assert channel.acks == [(3, True)]
+        channel.connection.ioloop.run()
+        assert channel.acks == [(3, True), (4, True)]
+
+    def test_undecodable_message_is_acked_but_not_handed_off(self):
+        """Test that a bad body is dropped from the batch and still acknowledged."""
+        consumer, channel = self.make_consumer()
+        deliver(consumer, channel, [1])
+        deliver(consumer, channel, [2], body=b"{not json")
+        channel.connection.ioloop.run()
+        assert channel.acks == [(2, True)]
+        assert [len(batch) for (batch,) in consumer.asyncio_loop.calls] == [1]
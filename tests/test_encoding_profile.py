@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+
+from gRPC.CloudRoute_pb2 import LoadReport
+from gRPC.encoding_profile import PROFILES, AdaptiveProfilePolicy, encode_frame
+from gRPC.grpc_client import CloudClient
+
+
+def slow_link(policy, samples=10):
+    for _ in range(samples):
+        policy.observe(rtt=1.0, payload_bytes=10_000)
+
+
+class TestAdaptiveProfilePolicy:
+    """Test cases for stepping between encoding profiles."""
+
+    def test_steps_down_on_a_slow_link(self):
+        """Test that a slow link moves the policy to the lightest profile."""
+        policy = AdaptiveProfilePolicy(min_samples=1)
+        slow_link(policy)
+        assert policy.profile.name == "low"
+
+    def test_limit_stops_step_downs(self):
+        """Test that step-downs stop at the last usable profile."""
+        policy = AdaptiveProfilePolicy(min_samples=1)
+        policy.limit(lambda profile: not profile.roi)
+        slow_link(policy)
+        assert policy.profile.name == "balanced"
+
+    def test_limit_moves_off_an_unusable_profile(self):
+        """Test that limiting below the current profile switches up at once."""
+        policy = AdaptiveProfilePolicy(start="low")
+        policy.limit(lambda profile: profile.name == "full")
+        assert policy.profile.name == "full"
+
+
+class TestCloudClientCapabilities:
+    """Test cases for only sending what the server advertises it decodes."""
+
+    def test_fixed_profile_falls_back_to_full(self):
+        """Test that a reduced profile uploads full frames until the server supports it."""
+        client = CloudClient("localhost:50051", "", profile="low", load_interval=0)
+        assert client.profile.name == "full"
+        client._set_capabilities(supports_scale=True, supports_regions=False)
+        assert client.profile.name == "full"
+        client._set_capabilities(supports_scale=True, supports_regions=True)
+        assert client.profile.name == "low"
+
+    def test_policy_is_clamped_until_capabilities_arrive(self):
+        """Test that the adaptive policy stays on full until GetLoad advertises scale and regions."""
+        policy = AdaptiveProfilePolicy(min_samples=1)
+        client = CloudClient("localhost:50051", "", policy=policy, load_interval=0)
+        slow_link(policy)
+        assert client.profile.name == "full"
+
+        report = LoadReport(supports_scale=True, supports_regions=True)
+        client._set_capabilities(report.supports_scale, report.supports_regions)
+        slow_link(policy)
+        assert client.profile.name == "low"
+
+    def test_lost_connection_forgets_capabilities(self):
+        """Test that capabilities are dropped with the connection, the next server may be older."""
+        client = CloudClient("localhost:50051", "", profile="balanced", load_interval=0)
+        client._set_capabilities(supports_scale=True, supports_regions=True)
+        client._stop_load_polling()
+        assert client.profile.name == "full"
+
+
+class TestEncodeFrame:
+    """Test cases for what a frame is uploaded as."""
+
+    def test_full_profile_forwards_the_source_jpeg(self):
+        """Test that the sender's JPEG goes out byte for byte instead of being re-encoded."""
+        frame = np.zeros((48, 64, 3), np.uint8)
+        source = cv2.imencode(".jpg", frame)[1].tobytes()
+        payload, scale, regions = encode_frame(frame, PROFILES["full"], encoded_frame=source)
+        assert (payload, scale, regions) == (source, 1.0, [])
+
+    def test_downscaling_profile_re_encodes(self):
+        """Test that a profile that changes the image does not forward the source JPEG."""
+        frame = np.zeros((480, 960, 3), np.uint8)
+        source = cv2.imencode(".jpg", frame)[1].tobytes()
+        payload, scale, _ = encode_frame(frame, PROFILES["balanced"], encoded_frame=source)
+        assert payload != source
+        assert scale == 2.0
+        assert cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR).shape == (240, 480, 3)
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from gRPC.frame_table import FrameTable
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestFrameTable:
+    """Test cases for FrameTable ring eviction and TTL expiry."""
+
+    def test_completed_frame_is_returned_and_released(self):
+        """Test that a response is handed to the waiter and frees the slot."""
+        async def scenario():
+            table = FrameTable(capacity=4, ttl=1.0)
+            table.add(1, frame="frame-1")
+            assert table.complete(1, "response-1")
+            return table, await table.wait(1, timeout=0.1)
+
+        table, result = run(scenario())
+        assert result == ("response-1", "frame-1")
+        assert len(table) == 0
+
+    def test_new_frame_evicts_the_one_in_its_slot(self):
+        """Test that a frame_id wrapping onto an occupied slot evicts the old frame."""
+        async def scenario():
+            table = FrameTable(capacity=4, ttl=10.0)
+            old = table.add(1)
+            table.add(5)
+            return table, old
+
+        table, old = run(scenario())
+        assert old.event.is_set()
+        assert table.evictions == 1
+        assert len(table) == 1
+        assert not table.complete(1, "late")
+        assert table.late_arrivals == 1
+
+    def test_waiter_on_evicted_frame_returns_immediately(self):
+        """Test that eviction wakes a waiter, which sees a miss instead of timing out."""
+        async def scenario():
+            table = FrameTable(capacity=4, ttl=10.0)
+            table.add(1)
+            waiter = asyncio.create_task(table.wait(1, timeout=5))
+            await asyncio.sleep(0)
+            started = time.monotonic()
+            table.add(5)
+            return await waiter, time.monotonic() - started
+
+        result, waited = run(scenario())
+        assert result is None
+        assert waited < 1
+
+    def test_frames_past_ttl_expire_on_add(self):
+        """Test that unanswered frames older than the TTL are dropped by the next add."""
+        async def scenario():
+            table = FrameTable(capacity=8, ttl=0.01)
+            table.add(1)
+            table.add(2)
+            await asyncio.sleep(0.02)
+            table.add(3)
+            return table
+
+        table = run(scenario())
+        assert table.evictions == 2
+        assert len(table) == 1
+
+    def test_response_after_ttl_is_late(self):
+        """Test that a response arriving after the TTL is counted late and not delivered."""
+        async def scenario():
+            table = FrameTable(capacity=4, ttl=0.01)
+            table.add(1)
+            await asyncio.sleep(0.02)
+            return table, table.complete(1, "response"), await table.wait(1, timeout=0.01)
+
+        table, completed, result = run(scenario())
+        assert not completed
+        assert result is None
+        assert table.late_arrivals == 1
+        assert len(table) == 0
+
+    def test_wait_timeout_is_counted(self):
+        """Test that a wait without a response times out and releases the slot."""
+        async def scenario():
+            table = FrameTable(capacity=4, ttl=10.0)
+            table.add(1)
+            return table, await table.wait(1, timeout=0.01)
+
+        table, result = run(scenario())
+        assert result is None
+        assert table.timeouts == 1
+        assert len(table) == 0
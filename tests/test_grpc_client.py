@@ -0,0 +1,83 @@
+import asyncio
+
+import grpc
+
+from gRPC.CloudRoute_pb2 import DetectionResult, LoadReport
+from gRPC.grpc_client import CloudClient
+
+
+class FakeChannel:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeStub:
+    """Reports load until cancelled; the stream answers `results` then ends or fails."""
+
+    def __init__(self, client, results, error=None):
+        self.client = client
+        self.results = results
+        self.error = error
+        self.load_calls = 0
+
+    async def GetLoad(self, request, timeout=None):
+        self.load_calls += 1
+        return LoadReport(available_replicas=1, supports_scale=True, supports_regions=True)
+
+    def CloudRouteStream(self, request_iterator):
+        async def responses():
+            # Let the load poller report once before the stream goes away
+            await asyncio.sleep(0.01)
+            for result in self.results:
+                yield result
+            # Only this connection is under test
+            self.client.running = False
+            if self.error is not None:
+                raise self.error
+        return responses()
+
+
+def run_one_connection(results, error=None):
+    """Runs CloudClient.start over one fake connection; returns the client, its channel and its poller."""
+    client = CloudClient("localhost:50051", "", load_interval=0.005)
+    channel = FakeChannel()
+
+    async def connect():
+        client.channel = channel
+        client.stub = FakeStub(client, results, error)
+        client.connected.set()
+
+    client.connect = connect
+
+    async def scenario():
+        await asyncio.wait_for(client.start(), 2)
+        await asyncio.sleep(0)
+        # Whatever start() left running, such as the closed connection's load poller
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    leftover = asyncio.run(scenario())
+    return client, channel, leftover
+
+
+class TestCloudClientStart:
+    """Test cases for tearing down one connection of CloudClient.start."""
+
+    def test_stream_ended_by_server_releases_the_connection(self):
+        """Test that a cleanly ended stream stops load polling and closes its channel."""
+        client, channel, leftover = run_one_connection([DetectionResult(frame_id=1)])
+        assert channel.closed
+        assert client._load_task is None
+        assert leftover == []
+        assert not client.connected.is_set()
+        assert (client.supports_scale, client.supports_regions) == (False, False)
+
+    def test_failed_stream_releases_the_connection(self):
+        """Test that a stream failing with an RPC error releases the same resources."""
+        error = grpc.aio.AioRpcError(grpc.StatusCode.UNAVAILABLE, grpc.aio.Metadata(), grpc.aio.Metadata())
+        client, channel, leftover = run_one_connection([], error)
+        assert channel.closed
+        assert client._load_task is None
+        assert leftover == []
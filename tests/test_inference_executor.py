@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from detection.dto.detection_types import DetectionResult
+from detection.model.detection_service import DetectionService
+from detection.processing.inference_executor import InferenceExecutor
+
+
+class ThreadRecordingService(DetectionService):
+    """Records which threads call it; a second concurrent caller fails the call."""
+
+    def __init__(self):
+        super().__init__(model_path=None)
+        self.threads = set()
+        self._busy = threading.Lock()
+
+    def load_model(self, model_path=None):
+        return None
+
+    def detect(self, frame) -> DetectionResult:
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("model used from two threads at once")
+        try:
+            self.threads.add(threading.get_ident())
+            time.sleep(0.01)
+            return DetectionResult(detections=[])
+        finally:
+            self._busy.release()
+
+
+class TestInferenceExecutor:
+    """Test cases for thread-safety of the thread inference executor."""
+
+    def test_thread_workers_need_a_service_factory(self):
+        """Test that several thread workers cannot share one detection service."""
+        with pytest.raises(ValueError):
+            InferenceExecutor(detection_service=ThreadRecordingService(), kind="thread", workers=2)
+
+    def test_each_thread_worker_gets_its_own_model(self):
+        """Test that concurrent requests on several thread workers never share a model."""
+        services = []
+
+        def factory():
+            services.append(ThreadRecordingService())
+            return services[-1]
+
+        executor = InferenceExecutor(kind="thread", workers=3, service_factory=factory)
+
+        async def scenario():
+            return await asyncio.gather(*(executor.detect(b"frame") for _ in range(12)))
+
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            executor.shutdown(wait=True)
+        assert len(results) == 12
+        assert 1 < len(services) <= 3
+        assert all(len(service.threads) == 1 for service in services if service.threads)
+
+    def test_single_thread_worker_uses_the_given_service(self):
+        """Test that one thread worker runs the shared detection service."""
+        service = ThreadRecordingService()
+        executor = InferenceExecutor(detection_service=service, kind="thread", workers=1)
+        try:
+            asyncio.run(executor.detect(b"frame"))
+        finally:
+            executor.shutdown(wait=True)
+        assert len(service.threads) == 1
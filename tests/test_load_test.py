@@ -0,0 +1,38 @@
+import asyncio
+
+from gRPC.CloudRoute_pb2 import DetectionResult
+from gRPC.load_test import StreamStats, run_stream, synthetic_frames
+
+
+class LossyStub:
+    """CloudRouteStream that never answers odd frame ids."""
+
+    def CloudRouteStream(self, requests):
+        async def responses():
+            async for request in requests:
+                if request.frame_id % 2 == 0:
+                    yield DetectionResult(frame_id=request.frame_id)
+        return responses()
+
+
+class TestRunStream:
+    """Test cases for the load generator's stream runner."""
+
+    def test_unanswered_frames_expire_as_errors(self):
+        """Test that frames without a result count as errors after the timeout and free the window."""
+        stats = StreamStats(name="s0")
+        frames = synthetic_frames(2, 64, 48)
+
+        async def scenario():
+            await asyncio.wait_for(
+                run_stream(LossyStub(), stats, frames, fps=100, duration=0.2, window=2,
+                           result_version=2, frame_offset=0, timeout=0.03),
+                timeout=2
+            )
+
+        asyncio.run(scenario())
+        assert stats.sent == stats.received + stats.errors
+        assert stats.errors >= stats.sent // 2 - 1
+        assert stats.received > 0
+        # Expired frames leave the window, so sending does not stall behind them
+        assert stats.sent > 4
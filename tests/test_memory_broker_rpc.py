@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from detection.dto.detection_types import Detection, DetectionResult
+from detection.model.cloud_model.consumer.cloud_model_consumer import CloudModelConsumer
+from detection.model.cloud_model.producer.cloud_model_producer import CloudModelProducer
+from detection.model.detection_service import DetectionService
+from rabbitMQ.consumer.memory_broker import MemoryBroker
+
+MODEL_NAME = "test"
+
+
+class SlowDetectionService(DetectionService):
+    """Answers every frame with one detection after `delay` seconds per batch."""
+
+    def __init__(self, delay=0.0):
+        super().__init__(model_path=None)
+        self.delay = delay
+        self.frames = []
+
+    def load_model(self, model_path=None):
+        return None
+
+    def detect(self, frame) -> DetectionResult:
+        return DetectionResult(detections=[Detection(0, "person", 0.9, [10.0, 20.0, 110.0, 220.0])])
+
+    def detect_batch(self, frames):
+        self.frames.extend(frames)
+        time.sleep(self.delay)
+        return [self.detect(frame) for frame in frames]
+
+
+@pytest.fixture
+def rpc(request):
+    """A consumer thread and a producer on a fresh memory:// broker; yields a factory."""
+    url = f"memory://{request.node.name}/"
+    started = []
+
+    def start(detection_service, **consumer_kwargs):
+        consumer = CloudModelConsumer(None, None, None, None, detection_service, MODEL_NAME,
+                                      amqp_url=url, **consumer_kwargs)
+        consumer.connect()
+        thread = threading.Thread(target=consumer.start, daemon=True)
+        thread.start()
+        producer = CloudModelProducer(None, None, None, None, MODEL_NAME, amqp_url=url)
+        started.append((consumer, thread, producer))
+        return consumer, producer, MemoryBroker.for_url(url)
+
+    yield start
+    for consumer, thread, producer in started:
+        producer.close()
+        consumer.connection.add_callback_threadsafe(consumer.consume_channel.stop_consuming)
+        thread.join(timeout=2)
+    MemoryBroker.reset()
+
+
+class TestMemoryBrokerRPC:
+    """Test cases for the producer/consumer inference RPC over the memory:// broker."""
+
+    def test_round_trip(self, rpc):
+        """Test that frames are answered with the detection service's result."""
+        consumer, producer, broker = rpc(SlowDetectionService())
+        futures = [producer.submit(f"frame-{i}".encode(), timeout=2) for i in range(5)]
+        bodies = [future.result(timeout=3) for future in futures]
+        assert all(b'"person"' in body for body in bodies)
+        assert producer.stats()["completed"] == 5
+        assert broker.stats()["queues"][f"{MODEL_NAME}-suspicion-task"] == 0
+
+    def test_broker_expires_tasks_waiting_in_the_queue(self, rpc):
+        """Test that a task queued behind a slow one expires in the broker and times out."""
+        service = SlowDetectionService(delay=0.2)
+        consumer, producer, broker = rpc(service, max_batch_size=1, prefetch=1)
+        slow = producer.submit(b"slow", timeout=2)
+        time.sleep(0.05)
+        with pytest.raises(TimeoutError):
+            producer.submit(b"expired", timeout=0.05).result(timeout=2)
+        slow.result(timeout=2)
+        time.sleep(0.05)
+        assert service.frames == [b"slow"]
+        assert broker.stats()["expired"] == 1
+        assert producer.stats()["timed_out"] == 1
+
+    def test_worker_drops_prefetched_tasks_past_their_deadline(self, rpc):
+        """Test that a task prefetched behind a slow batch is dropped without inference."""
+        service = SlowDetectionService(delay=0.2)
+        consumer, producer, broker = rpc(service, max_batch_size=1, prefetch=2, clock_skew_ms=0)
+        slow = producer.submit(b"slow", timeout=2)
+        time.sleep(0.05)
+        with pytest.raises(TimeoutError):
+            producer.submit(b"stale", timeout=0.05).result(timeout=2)
+        slow.result(timeout=2)
+        time.sleep(0.05)
+        assert service.frames == [b"slow"]
+        assert consumer.stats(reset=False)["stale"] == 1
+        assert broker.stats()["queues"][f"{MODEL_NAME}-suspicion-task"] == 0
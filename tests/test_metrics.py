@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+from gRPC.metrics import Histogram, MetricsServer, SampledLog, ServerMetrics
+
+
+class TestHistogram:
+    """Test cases for Prometheus histogram rendering."""
+
+    def test_buckets_are_cumulative(self):
+        """Test that bucket lines count every observation at or below their bound."""
+        histogram = Histogram("h", "help", buckets=(1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        lines = histogram.render()
+        assert 'h_bucket{le="1"} 2' in lines
+        assert 'h_bucket{le="5"} 3' in lines
+        assert 'h_bucket{le="+Inf"} 4' in lines
+        assert "h_sum 14.5" in lines
+        assert "h_count 4" in lines
+
+
+class TestSampledLog:
+    """Test cases for sampled hot-path logging."""
+
+    def test_repeated_event_is_suppressed_and_counted(self, caplog):
+        """Test that an event logs once per interval and reports how many lines it skipped."""
+        log = SampledLog(logging.getLogger("sampled"), interval=60)
+        with caplog.at_level(logging.INFO, logger="sampled"):
+            for frame_id in range(3):
+                log.event("frame_received", frame_id=frame_id)
+            log._last["frame_received"] = float("-inf")
+            log.event("frame_received", frame_id=3)
+        assert [record.getMessage() for record in caplog.records] == [
+            "event=frame_received frame_id=0",
+            "event=frame_received frame_id=3 suppressed=2",
+        ]
+
+    def test_disabled_level_is_not_counted(self, caplog):
+        """Test that events below the logger's level are skipped without being counted."""
+        log = SampledLog(logging.getLogger("sampled"), interval=0)
+        with caplog.at_level(logging.INFO, logger="sampled"):
+            log.event("result_sent", logging.DEBUG, frame_id=1)
+        assert caplog.records == []
+        assert log._suppressed == {}
+
+
+class TestMetricsServer:
+    """Test cases for the /metrics endpoint."""
+
+    def test_serves_metrics_and_404(self):
+        """Test that /metrics returns the rendered metrics and other paths return 404."""
+        async def get(port, path):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+
+        async def scenario():
+            metrics = ServerMetrics()
+            metrics.frames_received.inc(3)
+            metrics.gauge("cloudroute_queue_depth", "Frames waiting for a batch", lambda: 7)
+            server = MetricsServer(metrics, port=0)
+            await server.start()
+            port = server._server.sockets[0].getsockname()[1]
+            try:
+                return await get(port, "/metrics"), await get(port, "/other")
+            finally:
+                await server.stop()
+
+        found, missing = asyncio.run(scenario())
+        assert found.startswith("HTTP/1.1 200 OK")
+        assert "cloudroute_frames_received_total 3" in found
+        assert "cloudroute_queue_depth 7" in found
+        assert missing.startswith("HTTP/1.1 404 Not Found")
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from detection.dto.detection_types import Detection, DetectionResult
+from detection.model.detection_service import DetectionService
+from gRPC.model_worker_pool import ModelWorkerPool
+
+
+class SizeService(DetectionService):
+    """Reports each frame's byte size as the box width; b"fail" frames raise. Runs in the replicas."""
+
+    def __init__(self):
+        super().__init__(model_path=None)
+
+    def load_model(self, model_path=None):
+        return None
+
+    def detect(self, frame) -> DetectionResult:
+        if isinstance(frame, bytes) and frame == b"fail":
+            raise ValueError("undecodable frame")
+        size = len(frame) if isinstance(frame, bytes) else frame.nbytes
+        return DetectionResult(detections=[Detection(0, "person", 0.9, [0.0, 0.0, float(size), 1.0])])
+
+
+def widths(results):
+    return [result.detections[0].bbox[2] for result in results]
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("liveness_interval", 0.05)
+        pool = ModelWorkerPool(SizeService, **kwargs)
+        pool.start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop()
+
+
+class TestModelWorkerPool:
+    """Test cases for ModelWorkerPool dispatch, failures and replica restarts."""
+
+    def test_frames_round_trip_through_shared_memory(self, make_pool):
+        """Test that byte and array frames reach a replica intact."""
+        pool = make_pool(replicas=1)
+
+        async def scenario():
+            return await pool.detect_batch([b"abc", np.zeros((4, 5, 3), np.uint8)])
+
+        assert widths(asyncio.run(scenario())) == [3.0, 60.0]
+
+    def test_oversized_batch_is_sent_inline(self, make_pool):
+        """Test that a batch larger than a slot still gets answered."""
+        pool = make_pool(replicas=1, slot_size=16)
+
+        async def scenario():
+            return await pool.detect_batch([bytes(100)])
+
+        assert widths(asyncio.run(scenario())) == [100.0]
+
+    def test_concurrent_batches_wait_for_free_slots(self, make_pool):
+        """Test that more concurrent batches than slots all complete."""
+        pool = make_pool(replicas=2, slots_per_replica=1)
+
+        async def scenario():
+            return await asyncio.gather(*(pool.detect_batch([bytes(i + 1)]) for i in range(8)))
+
+        results = asyncio.run(scenario())
+        assert [widths(r) for r in results] == [[float(i + 1)] for i in range(8)]
+        assert pool.outstanding == 0
+
+    def test_replica_error_fails_only_that_batch(self, make_pool):
+        """Test that an exception in the model fails its batch with RuntimeError."""
+        pool = make_pool(replicas=1)
+
+        async def scenario():
+            return await asyncio.gather(pool.detect_batch([b"fail"]), pool.detect_batch([b"ok"]),
+                                        return_exceptions=True)
+
+        failed, ok = asyncio.run(scenario())
+        assert isinstance(failed, RuntimeError)
+        assert widths(ok) == [2.0]
+
+    def test_dead_replica_is_restarted(self, make_pool):
+        """Test that a killed replica is replaced and serves again."""
+        pool = make_pool(replicas=1)
+
+        async def scenario():
+            await pool.detect_batch([b"warm"])
+            first = pool._replicas[0].process
+            first.kill()
+            await asyncio.to_thread(wait_until, lambda: pool._replicas[0].process is not first)
+            return await asyncio.wait_for(pool.detect_batch([b"again"]), timeout=10)
+
+        assert widths(asyncio.run(scenario())) == [5.0]
+
+    def test_waiting_batch_finishes_after_every_replica_restarts(self, make_pool):
+        """Test that a batch waiting while all replicas are down completes once one is back."""
+        pool = make_pool(replicas=2, restart_backoff=0.5, stable_seconds=60)
+
+        async def scenario():
+            await pool.detect_batch([b"warm"])
+            for _ in range(2):
+                # The second crash in a row is restarted only after the backoff
+                processes = [replica.process for replica in pool._replicas]
+                for process in processes:
+                    process.kill()
+                await asyncio.to_thread(wait_until, lambda: all(
+                    replica.restart_at is not None or (replica.process is not process and replica.process.is_alive())
+                    for replica, process in zip(pool._replicas, processes)))
+            assert pool.available_replicas == 0
+            return await asyncio.wait_for(pool.detect_batch([b"pending"]), timeout=10)
+
+        assert widths(asyncio.run(scenario())) == [7.0]
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from circuitbreaker import CircuitBreakerMonitor
+
+from detection.dto.detection_types import Detection, DetectionResult
+from detection.model.detection_service import DetectionService
+from detection.processing.processors.cascade_processor import CascadeProcessor
+from detection.processing.processors.rpc_processor import RESULT_V2, RPCProcessor, _convert_rpc_dr_to_internal_dr
+from gRPC import CloudRoute_pb2 as pb
+from gRPC.cloud_client_pool import CloudClientPool
+from gRPC.cloud_route_service import ClassNameTable, CloudRouteService
+from gRPC.grpc_client import CloudClient
+
+FRAME = np.zeros((48, 64, 3), np.uint8)
+
+
+class LocalService(DetectionService):
+    """Finds one car; records the thread it ran on."""
+
+    def __init__(self):
+        super().__init__(model_path=None)
+        self.threads = []
+
+    def load_model(self, model_path=None):
+        return None
+
+    def get_classes(self):
+        return {"person": 0, "car": 2}
+
+    def detect(self, frame) -> DetectionResult:
+        self.threads.append(threading.current_thread())
+        return DetectionResult(detections=[Detection(2, "car", 0.9, [1.0, 2.0, 3.0, 4.0])])
+
+
+class FakeCloudClient:
+    """Answers with one v1 person detection, or raises when `fail` is set."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.overloaded = False
+        self.requests = []
+        self.cleared = 0
+        self.connected = asyncio.Event()
+        self.connected.set()
+
+    def stats(self):
+        return {}
+
+    async def request(self, frame, frame_id, timeout=1, encoded_frame=None, rois=None):
+        self.requests.append(SimpleNamespace(frame_id=frame_id, encoded_frame=encoded_frame, rois=rois,
+                                             loop=asyncio.get_running_loop()))
+        if self.fail:
+            raise ConnectionError("cloud unreachable")
+        response = pb.DetectionResult(frame_id=frame_id, detections=[
+            pb.Detection(class_id=7, class_name="Person", confidence=0.8, x1=10, y1=20, x2=30, y2=40)])
+        return response, 0, ()
+
+    async def clear_queue(self):
+        self.cleared += 1
+
+    async def wait_connected(self):
+        pass
+
+
+class FakeTracking:
+    """Passes detections through; the score is the number of detections."""
+
+    def __init__(self):
+        self.detections = []
+        self.last_seen = {}
+
+    def process_detections(self, detections, frame_shape):
+        self.detections.append(detections)
+        return float(len(detections)), SimpleNamespace(xyxy=np.array([d.bbox for d in detections]),
+                                                       tracker_id=None)
+
+
+@pytest.fixture(autouse=True)
+def closed_breaker():
+    """The cloud breaker is shared by every processor; start each test with it closed."""
+    CircuitBreakerMonitor.get("RPCProcessor._cloud_result").reset()
+    yield
+    CircuitBreakerMonitor.get("RPCProcessor._cloud_result").reset()
+
+
+def make_rpc_processor(client):
+    local, tracking = LocalService(), FakeTracking()
+    return RPCProcessor(local, client, tracking), local, tracking
+
+
+class TestRPCProcessor:
+    """Test cases for cloud detection with local fallback on one event loop."""
+
+    def test_cloud_call_runs_on_the_callers_loop(self):
+        """Test that the cloud client is awaited directly and its classes are mapped to local ids."""
+        client = FakeCloudClient()
+        processor, local, tracking = make_rpc_processor(client)
+
+        async def scenario():
+            return asyncio.get_running_loop(), await processor.process(FRAME, 1)
+
+        loop, (score, _) = asyncio.run(scenario())
+        assert client.requests[0].loop is loop
+        assert local.threads == []
+        detection = tracking.detections[0][0]
+        assert (detection.class_id, detection.class_name, detection.bbox) == (0, "Person", [10, 20, 30, 40])
+        assert score == 1.0
+
+    def test_cloud_failure_falls_back_to_local_off_the_loop(self):
+        """Test that a failed cloud call clears the client and runs the local model in a worker thread."""
+        client = FakeCloudClient(fail=True)
+        processor, local, tracking = make_rpc_processor(client)
+
+        asyncio.run(processor.process(FRAME, 1))
+        assert client.cleared == 1
+        assert tracking.detections[0][0].class_name == "car"
+        assert local.threads and local.threads[0] is not threading.main_thread()
+
+    def test_sender_jpeg_is_forwarded_to_the_cloud(self):
+        """Test that the JPEG a frame was decoded from reaches the cloud client unchanged."""
+        client = FakeCloudClient()
+        processor, _, _ = make_rpc_processor(client)
+
+        asyncio.run(processor.process(FRAME, 1, encoded_frame=b"source-jpeg"))
+        assert client.requests[0].encoded_frame == b"source-jpeg"
+
+
+def make_pool(*clients):
+    pool = CloudClientPool(failure_threshold=5)
+    for index, client in enumerate(clients):
+        pool.add(f"server-{index}", client)
+    return pool
+
+
+class TestCloudFailureWithPool:
+    """Test cases for cloud failures when the processors use a CloudClientPool."""
+
+    def test_cascade_failure_clears_only_the_failing_member(self):
+        """Test that a failed offload leaves the queues of the healthy pool members alone."""
+        good, bad = FakeCloudClient(), FakeCloudClient(fail=True)
+        local, tracking = LocalService(), FakeTracking()
+        # Every frame is ambiguous, so every frame is offloaded
+        processor = CascadeProcessor(local, make_pool(good, bad), tracking, uncertain_low=0.0, uncertain_high=1.0)
+
+        async def scenario():
+            for frame_id in range(4):
+                await processor.process(FRAME, frame_id)
+
+        asyncio.run(scenario())
+        assert (len(good.requests), len(bad.requests)) == (2, 2)
+        assert bad.cleared == 2
+        assert good.cleared == 0
+        assert processor.stats()["cloud_failures"] == 2
+
+    def test_rpc_fallback_clears_only_the_failing_member(self):
+        """Test that falling back to the local model does not clear the whole pool."""
+        good, bad = FakeCloudClient(), FakeCloudClient(fail=True)
+        processor, _, _ = make_rpc_processor(make_pool(good, bad))
+
+        async def scenario():
+            for frame_id in range(2):
+                await processor.process(FRAME, frame_id)
+
+        asyncio.run(scenario())
+        assert (bad.cleared, good.cleared) == (1, 0)
+
+
+class TestResultDecoding:
+    """Test cases for decoding v1 and packed v2 cloud results."""
+
+    def test_v2_decodes_like_v1(self):
+        """Test that a v2 result keeps the server's class ids, names, scores and boxes like v1."""
+        server_result = DetectionResult(detections=[Detection(0, "person", 0.75, [1.0, 2.0, 3.0, 4.0]),
+                                                    Detection(15, "cat", 0.5, [5.0, 6.0, 7.0, 8.0])])
+        service = CloudRouteService(cloud_model=SimpleNamespace(detect_batch=None))
+        v1 = service._convert(server_result, pb.DetectionRequest(frame_id=3), ClassNameTable())
+        v2 = service._convert(server_result, pb.DetectionRequest(frame_id=3, result_version=RESULT_V2),
+                              ClassNameTable())
+        client = CloudClient("localhost:50051", "", load_interval=0)
+        client._update_class_table(v2)
+
+        decoded_v1 = _convert_rpc_dr_to_internal_dr(v1)
+        decoded_v2 = _convert_rpc_dr_to_internal_dr(v2, client.class_table)
+        assert decoded_v2 == decoded_v1
+        assert [d.class_id for d in decoded_v2.detections] == [0, 15]
+
+    def test_v2_table_sent_once_per_stream(self):
+        """Test that later v2 results of a stream reuse the table sent with the first one."""
+        service = CloudRouteService(cloud_model=SimpleNamespace(detect_batch=None))
+        table = ClassNameTable()
+        request = pb.DetectionRequest(result_version=RESULT_V2)
+        first = service._convert(DetectionResult(detections=[Detection(15, "cat", 0.5, [0.0, 0.0, 1.0, 1.0])]),
+                                 request, table)
+        second = service._convert(DetectionResult(detections=[Detection(15, "cat", 0.5, [0.0, 0.0, 1.0, 1.0])]),
+                                  request, table)
+        client = CloudClient("localhost:50051", "", load_interval=0)
+        client._update_class_table(first)
+        assert (list(second.class_names), list(second.class_table_ids)) == ([], [])
+        assert _convert_rpc_dr_to_internal_dr(second, client.class_table).detections[0].class_id == 15
@@ -0,0 +1,40 @@
+import pytest
+
+from rabbitMQ.cloud_consumer.run_cloud_consumer import MAX_RESTART_BACKOFF, RESTART_BACKOFF, Throughput, restart_delay
+
+
+def stats(frames, batches=1, stale=0):
+    return {"frames": frames, "batches": batches, "stale": stale}
+
+
+class TestRestartDelay:
+    """Test cases for restarting workers that keep dying."""
+
+    def test_backoff_grows_to_the_maximum(self):
+        """Test that the first crash restarts at once and later ones back off exponentially."""
+        delays = [restart_delay(crashes) for crashes in range(1, 12)]
+        assert delays[:4] == [0.0, RESTART_BACKOFF, 2 * RESTART_BACKOFF, 4 * RESTART_BACKOFF]
+        assert delays[-1] == MAX_RESTART_BACKOFF
+        assert delays == sorted(delays)
+
+
+class TestThroughput:
+    """Test cases for combining worker reports into one throughput line."""
+
+    def test_each_report_is_divided_by_its_own_window(self):
+        """Test that workers reporting over different windows get their own rates."""
+        throughput = Throughput()
+        throughput.add(0, stats(300), 30.0)
+        throughput.add(1, stats(450), 45.0)
+        assert throughput.fps(0) == pytest.approx(10.0)
+        assert throughput.fps(1) == pytest.approx(10.0)
+        assert throughput.summary([0, 1]).startswith("Throughput 20.0 fps")
+
+    def test_reports_of_one_interval_accumulate(self):
+        """Test that two reports of a worker in one interval add up frames and seconds."""
+        throughput = Throughput()
+        throughput.add(0, stats(100, batches=10), 10.0)
+        throughput.add(0, stats(200, batches=10, stale=3), 30.0)
+        line = throughput.summary([0, 1])
+        assert line == "Throughput 7.5 fps: w0 7.5 fps (batch 15.0, 3 stale), w1 no report"
+        assert throughput.summary([0]) == "Throughput 0.0 fps: w0 no report"
@@ -0,0 +1,142 @@
+import asyncio
+
+from rabbitMQ.consumer.telemetry_publisher import (KEYFRAME, RATE, SIGNIFICANT_CHANGE, THRESHOLD_CROSSING,
+                                                  TRAILING, CoalescingPublisher)
+
+
+class FakeProducer:
+    def __init__(self):
+        self.scores = []
+
+    def publish(self, message_obj, expire_time=None):
+        self.scores.append(message_obj.suspicion_score)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_publisher(**kwargs):
+    producer, clock = FakeProducer(), FakeClock()
+    publisher = CoalescingPublisher(producer, threshold=50, max_rate_hz=2.0, min_delta=10,
+                                    keyframe_seconds=5.0, clock=clock, **kwargs)
+    return publisher, producer, clock
+
+
+class TestCoalescingPublisher:
+    """Test cases for coalescing per-frame suspicion scores."""
+
+    def test_first_score_is_sent(self):
+        """Test that the first score goes out as a keyframe."""
+        publisher, producer, clock = make_publisher()
+        assert publisher.publish(10)
+        assert producer.scores == [10]
+        assert publisher.stats()["reasons"] == {KEYFRAME: 1}
+
+    def test_small_changes_are_rate_limited(self):
+        """Test that small changes inside the rate interval are coalesced."""
+        publisher, producer, clock = make_publisher()
+        publisher.publish(10)
+        for score in (11, 12, 13):
+            clock.now += 0.1
+            assert not publisher.publish(score)
+        clock.now += 0.3
+        assert publisher.publish(14)
+        assert producer.scores == [10, 14]
+        assert publisher.reasons[RATE] == 1
+
+    def test_threshold_crossing_is_sent_immediately(self):
+        """Test that crossing the threshold bypasses the rate limit."""
+        publisher, producer, clock = make_publisher()
+        publisher.publish(45)
+        clock.now += 0.01
+        assert publisher.publish(51)
+        assert publisher.reasons[THRESHOLD_CROSSING] == 1
+
+    def test_significant_change_is_sent_immediately(self):
+        """Test that a change of at least min_delta bypasses the rate limit."""
+        publisher, producer, clock = make_publisher()
+        publisher.publish(10)
+        clock.now += 0.01
+        assert publisher.publish(25)
+        assert publisher.reasons[SIGNIFICANT_CHANGE] == 1
+
+    def test_unchanged_score_is_resent_as_keyframe(self):
+        """Test that a steady score is re-sent every keyframe_seconds only."""
+        publisher, producer, clock = make_publisher()
+        publisher.publish(10)
+        clock.now += 1.0
+        assert not publisher.publish(10)
+        clock.now += 4.0
+        assert publisher.publish(10)
+        assert producer.scores == [10, 10]
+
+    def test_stats_report_coalescing(self):
+        """Test that stats count received and sent scores and reset."""
+        publisher, producer, clock = make_publisher()
+        for score in (10, 11, 12, 13):
+            publisher.publish(score)
+        stats = publisher.stats()
+        assert (stats["received"], stats["sent"], stats["coalesced_ratio"]) == (4, 1, 0.75)
+        assert publisher.stats()["received"] == 0
+
+
+def run_with_publisher(scenario, **kwargs):
+    """Runs scenario(publisher) on an event loop with a 20 Hz publisher on the real clock."""
+    producer = FakeProducer()
+    publisher = CoalescingPublisher(producer, threshold=50, max_rate_hz=20.0, min_delta=10,
+                                    keyframe_seconds=5.0, **kwargs)
+    asyncio.run(scenario(publisher))
+    return publisher, producer
+
+
+class TestCoalescingPublisherTrailingSend:
+    """Test cases for the trailing send of the last coalesced score."""
+
+    def test_last_coalesced_score_is_sent(self):
+        """Test that the final score of a burst goes out at the end of the rate interval."""
+        async def scenario(publisher):
+            for score in (10, 11, 12, 13):
+                publisher.publish(score)
+            await asyncio.sleep(0.1)
+
+        publisher, producer = run_with_publisher(scenario)
+        assert producer.scores == [10, 13]
+        assert publisher.reasons[TRAILING] == 1
+
+    def test_trailing_send_is_dropped_when_score_returns(self):
+        """Test that nothing trails when the latest score equals the last one sent."""
+        async def scenario(publisher):
+            for score in (10, 12, 10):
+                publisher.publish(score)
+            await asyncio.sleep(0.1)
+
+        publisher, producer = run_with_publisher(scenario)
+        assert producer.scores == [10]
+
+    def test_immediate_send_replaces_trailing_send(self):
+        """Test that a score sent right away cancels the scheduled trailing send."""
+        async def scenario(publisher):
+            publisher.publish(10)
+            publisher.publish(12)
+            publisher.publish(30)
+            await asyncio.sleep(0.1)
+
+        publisher, producer = run_with_publisher(scenario)
+        assert producer.scores == [10, 30]
+        assert TRAILING not in publisher.reasons
+
+    def test_close_drops_trailing_send(self):
+        """Test that close cancels a scheduled trailing send."""
+        async def scenario(publisher):
+            publisher.publish(10)
+            publisher.publish(12)
+            publisher.close()
+            await asyncio.sleep(0.1)
+
+        publisher, producer = run_with_publisher(scenario)
+        assert producer.scores == [10]
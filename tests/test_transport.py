@@ -0,0 +1,31 @@
+import grpc
+import pytest
+
+from gRPC.transport import PROFILES, TransportProfile
+
+
+class TestTransportProfile:
+    """Test cases for the shared server/client transport settings."""
+
+    def test_from_config(self):
+        """Test that a name picks a profile and a dict overrides its fields."""
+        assert TransportProfile.from_config(None) is PROFILES["default"]
+        assert TransportProfile.from_config("cellular") is PROFILES["cellular"]
+        profile = TransportProfile.from_config({"profile": "lan", "compression": "gzip"})
+        assert (profile.name, profile.keepalive_time_ms) == ("lan", 10_000)
+        assert profile.grpc_compression == grpc.Compression.Gzip
+
+    def test_unknown_names_are_rejected(self):
+        """Test that unknown profiles and compression algorithms raise."""
+        with pytest.raises(ValueError):
+            TransportProfile.from_config("satellite")
+        with pytest.raises(ValueError):
+            TransportProfile(compression="brotli")
+
+    def test_server_accepts_the_client_ping_rate(self):
+        """Test that the server allows pings at least as often as clients of the profile send them."""
+        for profile in PROFILES.values():
+            client = dict(profile.channel_options())
+            server = dict(profile.server_options())
+            assert server["grpc.http2.min_ping_interval_without_data_ms"] <= client["grpc.keepalive_time_ms"]
+            assert server["grpc.max_receive_message_length"] == client["grpc.max_send_message_length"]